@@ -77,6 +77,8 @@ class Publisher:
 
         self._stderr = ErrorOutput()
 
+        self._diagnostics_path = None
+
     def set_reader(self, reader_name, parser, parser_name):
         """Set `self.reader` by name."""
         reader_class = readers.get_reader_class(reader_name)
@@ -213,9 +215,16 @@ class Publisher:
                     argv, usage, description, settings_spec, config_section,
                     **(settings_overrides or {}))
             self.set_io()
+            diagnostics = self.open_diagnostics()
+            if diagnostics:
+                diagnostics.start_phase('read')
             self.document = self.reader.read(self.source, self.parser,
                                              self.settings)
+            if diagnostics:
+                diagnostics.start_phase('transform')
             self.apply_transforms()
+            if diagnostics:
+                diagnostics.start_phase('write')
             output = self.writer.write(self.document, self.destination)
             self.writer.assemble_parts()
         except SystemExit, error:
@@ -225,11 +234,13 @@ class Publisher:
             if not self.settings:       # exception too early to report nicely
                 raise
             if self.settings.traceback: # Propagate exceptions?
+                self.close_diagnostics()
                 self.debugging_dumps()
                 raise
             self.report_Exception(error)
             exit = True
             exit_status = 1
+        self.close_diagnostics()
         self.debugging_dumps()
         if (enable_exit_status and self.document
             and (self.document.reporter.max_level
@@ -239,6 +250,35 @@ class Publisher:
             sys.exit(exit_status)
         return output
 
+    def open_diagnostics(self):
+        """
+        Return the `DiagnosticsLog` for the "diagnostics_log" setting
+        (opening it, if the setting is a file name) and start a document.
+        """
+        diagnostics = getattr(self.settings, 'diagnostics_log', None)
+        if not diagnostics:
+            return None
+        if isinstance(diagnostics, basestring):
+            from docutils.utils.diagnostics import DiagnosticsLog
+            self._diagnostics_path = diagnostics
+            diagnostics = DiagnosticsLog(diagnostics)
+            self.settings.diagnostics_log = diagnostics
+        diagnostics.start_document(self.source.source_path)
+        return diagnostics
+
+    def close_diagnostics(self):
+        diagnostics = getattr(self.settings, 'diagnostics_log', None)
+        if not diagnostics or isinstance(diagnostics, basestring):
+            return
+        if diagnostics.document is not None:
+            diagnostics.end_document(self.document
+                                     and self.document.reporter.max_level)
+        if self._diagnostics_path is not None:
+            # opened by this publisher:
+            diagnostics.close()
+            self.settings.diagnostics_log = self._diagnostics_path
+            self._diagnostics_path = None
+
     def debugging_dumps(self):
         if not self.document:
             return
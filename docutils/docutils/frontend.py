@@ -457,6 +457,9 @@ class OptionParser(optparse.OptionParser, docutils.SettingsSpec):
           ['--no-debug'], {'action': 'store_false', 'dest': 'debug'}),
          ('Send the output of system messages to <file>.',
           ['--warnings'], {'dest': 'warning_stream', 'metavar': '<file>'}),
+         ('Append reported system messages and processing times to <file> '
+          '(as JSON lines).',
+          ['--diagnostics-log'], {'metavar': '<file>'}),
          ('Enable Python tracebacks when Docutils is halted.',
           ['--traceback'], {'action': 'store_true', 'default': None,
                             'validator': validate_boolean}),
@@ -530,7 +533,7 @@ class OptionParser(optparse.OptionParser, docutils.SettingsSpec):
                          '_config_files': None}
     """Defaults for settings that don't have command-line option equivalents."""
 
-    relative_path_settings = ('warning_stream',)
+    relative_path_settings = ('warning_stream', 'diagnostics_log')
 
     config_section = 'general'
 
@@ -13,6 +13,7 @@ import sys
 import os
 import re
 import codecs
+import mmap
 from docutils import TransformSpec
 from docutils._compat import b
 from docutils.utils.error_reporting import locale_encoding, ErrorString, ErrorOutput
@@ -132,17 +133,24 @@ class Input(TransformSpec):
     The first bytes of input data are checked against the start_bytes strings.
     A match indicates the given encoding."""
 
+    coding_slug_range = 4096
+    """Number of bytes at the start of input data searched for an encoding
+    declaration."""
+
     def determine_encoding_from_data(self, data):
         """
         Try to determine the encoding of `data` by looking *in* `data`.
         Check for a byte order mark (BOM) or an encoding declaration.
+
+        Only the first bytes are examined; `data` may be any object
+        supporting slicing (e.g. a memory map).
         """
         # check for a byte order mark:
         for start_bytes, encoding in self.byte_order_marks:
-            if data.startswith(start_bytes):
+            if data[:len(start_bytes)] == start_bytes:
                 return encoding
         # check for an encoding declaration pattern in first 2 lines of file:
-        for line in data.splitlines()[:2]:
+        for line in data[:self.coding_slug_range].splitlines()[:2]:
             match = self.coding_slug.search(line)
             if match:
                 return match.group(1).decode('ascii')
@@ -222,6 +230,8 @@ class FileInput(Input):
         Input.__init__(self, source, source_path, encoding, error_handler)
         self.autoclose = autoclose
         self._stderr = ErrorOutput()
+        self._map = False
+        """Read the file via a memory map?"""
 
         if source is None:
             if source_path:
@@ -236,6 +246,9 @@ class FileInput(Input):
                     self.source = open(source_path, mode, **kwargs)
                 except IOError, error:
                     raise InputError(error.errno, error.strerror, source_path)
+                # In Python 2, the file is read as bytes; decode directly
+                # from a memory map instead of reading a copy:
+                self._map = mode == 'rU' and sys.version_info < (3,0)
             else:
                 self.source = sys.stdin
         elif (sys.version_info >= (3,0) and
@@ -254,9 +267,14 @@ class FileInput(Input):
         """
         Read and decode a single file and return the data (Unicode string).
         """
+        data = None
         try: # In Python < 2.5, try...except has to be nested in try...finally.
             try:
-                if self.source is sys.stdin and sys.version_info >= (3,0):
+                if self._map:
+                    data = self.read_mapped()
+                if data is not None:
+                    pass
+                elif self.source is sys.stdin and sys.version_info >= (3,0):
                     # read as binary data to circumvent auto-decoding
                     data = self.source.buffer.read()
                     # normalize newlines
@@ -278,6 +296,25 @@ class FileInput(Input):
                 self.close()
         return self.decode(data)
 
+    def read_mapped(self):
+        """
+        Decode the file via a memory map.  Return the data (Unicode string,
+        with universal newlines) or None if the file cannot be mapped (e.g.
+        empty files or pipes).
+        """
+        try:
+            mapped = mmap.mmap(self.source.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError, mmap.error):
+            return None
+        try:
+            data = self.decode(mapped)
+        finally:
+            mapped.close()
+        if u'\r' in data:
+            data = data.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+        return data
+
     def readlines(self):
         """
         Return lines of a single file as list of Unicode strings.
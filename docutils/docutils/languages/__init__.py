@@ -18,6 +18,14 @@ if sys.version_info < (2,5):
     from docutils._compat import __import__
 
 _languages = {}
+"""Cache of imported language modules: module name -> module."""
+
+_language_codes = {}
+"""Cache of language lookups: language code -> module."""
+
+_labels = {}
+"""Cache of merged label tables: language module name -> labels.
+See `get_labels()`."""
 
 def get_language(language_code, reporter=None):
     """Return module with language localizations.
@@ -25,6 +33,14 @@ def get_language(language_code, reporter=None):
     `language_code` is a "BCP 47" language tag.
     If there is no matching module, warn and fall back to English.
     """
+    try:
+        return _language_codes[language_code]
+    except KeyError:
+        module = _import_language(language_code, reporter)
+        _language_codes[language_code] = module
+        return module
+
+def _import_language(language_code, reporter):
     # TODO: use a dummy module returning emtpy strings?, configurable?
     for tag in normalize_language_tag(language_code):
         tag = tag.replace('-','_') # '-' not valid in module names
@@ -46,3 +62,16 @@ def get_language(language_code, reporter=None):
     module = __import__('en', globals(), locals(), level=1)
     _languages[tag] = module # warn only one time!
     return module
+
+def get_labels(language_module):
+    """Return the labels of `language_module`, completed by English labels.
+
+    The merged dictionary is built once per language module and process.
+    """
+    try:
+        return _labels[language_module.__name__]
+    except KeyError:
+        labels = get_language('en').labels.copy()
+        labels.update(language_module.labels)
+        _labels[language_module.__name__] = labels
+        return labels
@@ -28,6 +28,10 @@ import re
 import warnings
 import types
 import unicodedata
+try:
+    from hashlib import md5
+except ImportError:                     # Python 2.4
+    from md5 import new as md5
 
 # ==============================
 #  Functional Node Base Classes
@@ -89,6 +93,24 @@ class Node(object):
         """Return a deep copy of self (also copying children)."""
         raise NotImplementedError
 
+    def structural_hash(self, memo=None):
+        """
+        Return a digest (hexadecimal string) of the node class, the
+        non-default attributes and (recursively) the children of this node.
+
+        Equal subtrees have equal digests, independent of their position
+        (`source` and `line` are not included) and across processes, so
+        the digest can be used to compare trees or as a cache key.
+
+        Elements are commonly changed in place (e.g. by
+        ``node['ids'].append(id)``), so digests are not memoized on the
+        nodes.  To avoid rehashing subtrees in repeated calls (e.g. for
+        nested nodes), pass the same dictionary `memo` to all calls made
+        while the tree is not changed: it stores the digests of elements.
+        Discard it (or clear it) after changing the tree.
+        """
+        raise NotImplementedError
+
     def setup_child(self, child):
         child.parent = self
         if self.document:
@@ -218,8 +240,8 @@ class Node(object):
 
         If `condition` is not None, the iterable contains only nodes
         for which ``condition(node)`` is true.  If `condition` is a
-        node class ``cls``, it is equivalent to a function consisting
-        of ``return isinstance(node, cls)``.
+        node class ``cls`` (or a tuple of node classes), it is equivalent
+        to a function consisting of ``return isinstance(node, cls)``.
 
         If ascend is true, assume siblings to be true as well.
 
@@ -248,11 +270,11 @@ class Node(object):
         if include_self and descend and not siblings:
             if condition is None:
                 return self._all_traverse()
-            elif isinstance(condition, (types.ClassType, type)):
+            elif isinstance(condition, (types.ClassType, type, tuple)):
                 return self._fast_traverse(condition)
         # Check if `condition` is a class (check for TypeType for Python
         # implementations that use only new-style classes, like PyPy).
-        if isinstance(condition, (types.ClassType, type)):
+        if isinstance(condition, (types.ClassType, type, tuple)):
             node_class = condition
             def condition(node, node_class=node_class):
                 return isinstance(node, node_class)
@@ -288,13 +310,38 @@ class Node(object):
         Parameter list is the same as of traverse.  Note that
         include_self defaults to 0, though.
         """
-        iterable = self.traverse(condition=condition,
-                                 include_self=include_self, descend=descend,
-                                 siblings=siblings, ascend=ascend)
-        try:
-            return iterable[0]
-        except IndexError:
-            return None
+        if ascend:
+            siblings = True
+        if isinstance(condition, (types.ClassType, type, tuple)):
+            node_class = condition
+            def condition(node, node_class=node_class):
+                return isinstance(node, node_class)
+        # Stop at the first match instead of collecting all nodes:
+        match = self._first_match(condition, include_self, descend)
+        if match is not None or not siblings:
+            return match
+        node = self
+        while node.parent:
+            index = node.parent.index(node)
+            for sibling in node.parent[index+1:]:
+                match = sibling._first_match(condition, True, descend)
+                if match is not None:
+                    return match
+            if not ascend:
+                break
+            node = node.parent
+        return None
+
+    def _first_match(self, condition, include_self, descend):
+        """Return the first node of `traverse()` without siblings, or None."""
+        if include_self and (condition is None or condition(self)):
+            return self
+        if descend:
+            for child in self.children:
+                match = child._first_match(condition, True, True)
+                if match is not None:
+                    return match
+        return None
 
 if sys.version_info < (3,):
     class reprunicode(unicode):
@@ -378,6 +425,11 @@ class Text(Node, reprunicode):
     def deepcopy(self):
         return self.copy()
 
+    def structural_hash(self, memo=None):
+        digest = md5('#text\0'.encode('ascii'))
+        digest.update(self.encode('utf-8'))
+        return digest.hexdigest()
+
     def pformat(self, indent='    ', level=0):
         result = []
         indent = indent * level
@@ -1008,6 +1060,25 @@ class Element(Node):
         copy.extend([child.deepcopy() for child in self.children])
         return copy
 
+    def structural_hash(self, memo=None):
+        if memo is not None:
+            # Keyed by id (nodes may define __hash__), the node is stored
+            # to keep its id from being reused:
+            node, digest = memo.get(id(self), (None, None))
+            if node is self:
+                return digest
+        digest = md5(self.__class__.__name__.encode('ascii'))
+        for name, value in self.attlist():
+            digest.update(('\0%s=%s' % (name, _hash_value(value))
+                          ).encode('ascii'))
+        digest.update('\0'.encode('ascii'))
+        for child in self.children:
+            digest.update(child.structural_hash(memo).encode('ascii'))
+        if memo is None:
+            return digest.hexdigest()
+        memo[id(self)] = (self, digest.hexdigest())
+        return memo[id(self)][1]
+
     def set_class(self, name):
         """Add a new class to the "classes" attribute."""
         warnings.warn('docutils.nodes.Element.set_class deprecated; '
@@ -1068,6 +1139,11 @@ class TextElement(Element):
     child_text_separator = ''
     """Separator for child nodes, used by `astext()` method."""
 
+    deferred_children = None
+    """Function returning the child nodes of an element whose inline markup
+    is parsed on first access (see the "lazy_inline" setting of the
+    reStructuredText parser), until it is called."""
+
     def __init__(self, rawsource='', text='', *children, **attributes):
         if text != '':
             textnode = Text(text)
@@ -1076,6 +1152,41 @@ class TextElement(Element):
         else:
             Element.__init__(self, rawsource, *children, **attributes)
 
+    deferred_node_classes = (Node,)
+    """Classes of the nodes that `deferred_children` may return."""
+
+    def _fast_traverse(self, cls):
+        if self.deferred_children is not None:
+            for node_class in self.deferred_node_classes:
+                if issubclass(node_class, cls):
+                    break
+            else:
+                # No deferred node can match; don't generate them.
+                if isinstance(self, cls):
+                    return [self]
+                return []
+        return Element._fast_traverse(self, cls)
+
+    def _get_children(self):
+        if self.deferred_children is not None:
+            # Generate the child nodes on first access:
+            generate = self.deferred_children
+            self.deferred_children = None
+            for child in generate():
+                self.setup_child(child)
+                self._children.append(child)
+        return self._children
+
+    def _set_children(self, children):
+        self._children = children
+
+    children = property(_get_children, _set_children, doc=
+        """List of child nodes (elements and/or `Text`).""")
+
+    def __getstate__(self):
+        self.children                   # generate deferred child nodes
+        return self.__dict__
+
 
 class FixedTextElement(TextElement):
 
@@ -1377,6 +1488,15 @@ class document(Root, Structural, Element):
     def has_name(self, name):
         return name in self.nameids
 
+    def get_target(self, name):
+        """
+        Return the node registered for the normalized reference `name`.
+
+        Return None for unknown names and for duplicate names (which cannot
+        be used as a unique reference).
+        """
+        return self.ids.get(self.nameids.get(name))
+
     # "note" here is an imperative verb: "take note of".
     def note_implicit_target(self, target, msgnode=None):
         id = self.set_id(target, msgnode)
@@ -1667,8 +1787,13 @@ class system_message(Special, BackLinkable, PreBibliographic, Element):
     ``document.reporter.info/warning/error/severe()`` instead.
     """
 
+    deferred_message = None
+    """Message text of a system message created with `defer=True`,
+    until its paragraph is generated."""
+
     def __init__(self, message=None, *children, **attributes):
-        if message:
+        defer = attributes.pop('defer', False)
+        if message and not defer:
             p = paragraph('', message)
             children = (p,) + children
         try:
@@ -1676,6 +1801,40 @@ class system_message(Special, BackLinkable, PreBibliographic, Element):
         except:
             print 'system_message: children=%r' % (children,)
             raise
+        if message and defer:
+            self.deferred_message = message
+
+    def _fast_traverse(self, cls):
+        if (self.deferred_message is not None
+            and not issubclass(paragraph, cls) and not issubclass(Text, cls)):
+            # The deferred paragraph cannot match; don't generate it.
+            result = []
+            if isinstance(self, cls):
+                result.append(self)
+            for child in self._children:
+                result.extend(child._fast_traverse(cls))
+            return result
+        return Element._fast_traverse(self, cls)
+
+    def append(self, item):
+        # Keep the message paragraph deferred (it is inserted in front).
+        self.setup_child(item)
+        self._children.append(item)
+
+    def _get_children(self):
+        if self.deferred_message is not None:
+            # Generate the message paragraph on first access:
+            p = paragraph('', self.deferred_message)
+            self.deferred_message = None
+            self._children.insert(0, p)
+            self.setup_child(p)
+        return self._children
+
+    def _set_children(self, children):
+        self._children = children
+
+    children = property(_get_children, _set_children, doc=
+        """List of child nodes (elements and/or `Text`).""")
 
     def astext(self):
         line = self.get('line', '')
@@ -2195,6 +2354,14 @@ def pseudo_quoteattr(value):
     """Quote attributes for pseudo-xml"""
     return '"%s"' % value
 
+def _hash_value(value):
+    """Return a byte string representing an attribute value for hashing."""
+    if isinstance(value, (list, tuple)):
+        return '[%s]' % ','.join([_hash_value(item) for item in value])
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return repr(value)
+
 # 
 #
 # Local Variables:
@@ -75,6 +75,7 @@ import docutils.statemachine
 from docutils.parsers.rst import states
 from docutils import frontend, nodes, Component
 from docutils.transforms import universal
+from docutils.utils import code_analyzer
 
 
 class Parser(docutils.parsers.Parser):
@@ -138,22 +139,39 @@ class Parser(docutils.parsers.Parser):
           ['--syntax-highlight'],
           {'choices': ['long', 'short', 'none'],
            'default': 'long', 'metavar': '<format>'}),
+         ('Store the results of parsing code with Pygments in <file> and '
+          'reuse them in subsequent runs.  Default: no cache file.',
+          ['--syntax-highlight-cache'],
+          {'metavar': '<file>', 'default': None}),
+         ('Parse the inline markup of paragraphs when their content is '
+          'first accessed, if it does not define or refer to targets.  '
+          'Default: parse while reading the document.',
+          ['--lazy-inline'],
+          {'action': 'store_true', 'validator': frontend.validate_boolean}),
          ('Change straight quotation marks to typographic form: '
           'one of "yes", "no", "alt[ernative]" (default "no").',
           ['--smart-quotes'],
           {'default': False, 'validator': frontend.validate_ternary}),
         ))
 
+    relative_path_settings = ('syntax_highlight_cache',)
+
     config_section = 'restructuredtext parser'
     config_section_dependencies = ('parsers',)
 
-    def __init__(self, rfc2822=False, inliner=None):
+    def __init__(self, rfc2822=False, inliner=None, skim=False):
         if rfc2822:
             self.initial_state = 'RFC2822Body'
         else:
             self.initial_state = 'Body'
         self.state_classes = states.state_classes
         self.inliner = inliner
+        self.skim = skim
+        """Only recognize the block structure: leave the inline markup of
+        paragraphs, directives (except "include", "role" and
+        "default-role") and substitution definitions unparsed until
+        `states.materialize()` is called (for tables of contents, heading
+        and target inventories)."""
 
     def get_transforms(self):
         return Component.get_transforms(self) + [
@@ -169,7 +187,14 @@ class Parser(docutils.parsers.Parser):
         inputlines = docutils.statemachine.string2lines(
               inputstring, tab_width=document.settings.tab_width,
               convert_whitespace=True)
-        self.statemachine.run(inputlines, document, inliner=self.inliner)
+        cache_path = getattr(document.settings, 'syntax_highlight_cache',
+                             None)
+        if cache_path:
+            code_analyzer.token_cache.load(cache_path)
+        self.statemachine.run(inputlines, document, inliner=self.inliner,
+                              skim=self.skim)
+        if cache_path:
+            code_analyzer.token_cache.save(cache_path)
         self.finish_parse()
 
 
@@ -223,6 +248,14 @@ class Directive(object):
       code must handle the case where content is required but not
       supplied (an empty content list will be supplied).
 
+    - `cacheable`: A boolean; True if the directive is "pure" and its
+      result may be cached (default: False).  The result of `run()`
+      must only depend on the directive name, arguments, options and
+      content, the context (state class), the settings listed in
+      `cache_settings`, and the files returned by `cache_files()`.
+      Side effects other than recording dependencies must be repeated
+      by `cache_replay()`.  See `directives.ResultCache` for details.
+
     Arguments are normally single whitespace-separated words.  The
     final argument may contain whitespace and/or newlines if
     `final_argument_whitespace` is True.
@@ -304,6 +337,18 @@ class Directive(object):
     has_content = False
     """May the directive have content?"""
 
+    cacheable = False
+    """May the result of the directive be cached?"""
+
+    cache_settings = ('language_code', 'tab_width', 'file_insertion_enabled',
+                      'raw_enabled', 'input_encoding',
+                      'input_encoding_error_handler', 'syntax_highlight',
+                      'pep_references', 'pep_base_url',
+                      'pep_file_url_template', 'rfc_references',
+                      'rfc_base_url', 'trim_footnote_reference_space')
+    """Names of the settings the result of a cacheable directive (including
+    nested parsing of its content) may depend on."""
+
     def __init__(self, name, arguments, options, content, lineno,
                  content_offset, block_text, state, state_machine):
         self.name = name
@@ -319,6 +364,23 @@ class Directive(object):
     def run(self):
         raise NotImplementedError('Must override run() is subclass.')
 
+    # Result caching (see `cacheable`):
+
+    def cache_files(self):
+        """
+        Return a list of the paths of files the result of `run()` depends
+        on (their modification times are part of the cache key), or None
+        if the result must not be cached.
+        """
+        return []
+
+    def cache_replay(self):
+        """
+        Repeat side effects of `run()` when a cached result is used
+        instead of running the directive.  Override in subclasses.
+        """
+        pass
+
     # Directive errors:
 
     def directive_error(self, level, message):
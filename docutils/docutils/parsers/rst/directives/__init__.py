@@ -10,10 +10,11 @@ __docformat__ = 'reStructuredText'
 
 import re
 import codecs
+import os
 import sys
 
 from docutils import nodes
-from docutils.parsers.rst.languages import en as _fallback_language_module
+from docutils.parsers.rst import languages
 if sys.version_info < (2,5):
     from docutils._compat import __import__
 
@@ -84,21 +85,23 @@ def directive(directive_name, language_module, document):
     msg_text = []
     if normname in _directives:
         return _directives[normname], messages
-    canonicalname = None
-    try:
-        canonicalname = language_module.directives[normname]
-    except AttributeError, error:
-        msg_text.append('Problem retrieving directive entry from language '
-                        'module %r: %s.' % (language_module, error))
-    except KeyError:
-        msg_text.append('No directive entry for "%s" in module "%s".'
-                        % (directive_name, language_module.__name__))
-    if not canonicalname:
-        try:
-            canonicalname = _fallback_language_module.directives[normname]
+    # single lookup in the precomputed (language + English) table:
+    table = languages.get_tables(language_module)[0]
+    canonicalname, fallback = table.get(normname, (None, True))
+    if fallback:
+        if not hasattr(language_module, 'directives'):
+            msg_text.append('Problem retrieving directive entry from '
+                            'language module %r: %s.' % (language_module,
+                            'no "directives" table'))
+        else:
+            msg_text.append('No directive entry for "%s" in module "%s".'
+                            % (directive_name, language_module.__name__))
+        if canonicalname:
             msg_text.append('Using English fallback for directive "%s".'
                             % directive_name)
-        except KeyError:
+            # report the fallback only once per language and name:
+            table[normname] = (canonicalname, False)
+        else:
             msg_text.append('Trying "%s" as canonical directive name.'
                             % directive_name)
             # The canonical name should be an English name, but just in case:
@@ -138,6 +141,204 @@ def register_directive(name, directive):
     """
     _directives[name] = directive
 
+
+class ResultCache(object):
+
+    """
+    Process-wide cache of the results of "cacheable" directives.
+
+    See `docutils.parsers.rst.Directive.cacheable` for the protocol.
+    Results are only stored if they are independent of the document:
+    results containing system messages, pending nodes, targets,
+    footnote/citation/substitution references, or elements with ids,
+    names or reference names are never cached, nor are results of runs
+    that changed the settings, the document attributes or the roles
+    defined by the document (e.g. nested "title", "role" or
+    "default-role" directives).  Cached results are returned as deep
+    copies with line numbers adjusted to the new directive position, if
+    none of the files they depend on (including files read by nested
+    directives) was modified.
+    """
+
+    uncacheable_node_classes = (nodes.system_message, nodes.problematic,
+                                nodes.pending, nodes.target,
+                                nodes.footnote_reference,
+                                nodes.citation_reference,
+                                nodes.substitution_reference,
+                                nodes.substitution_definition)
+
+    uncacheable_attributes = ('ids', 'names', 'dupnames', 'backrefs',
+                              'refname', 'refid', 'anonymous')
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        """Maximal number of cached results."""
+        self.results = {}
+        """Mapping of cache keys to (nodes, lineno, source, srcline,
+        dependencies, current_position) tuples.  `dependencies` are
+        (path, modification time) pairs."""
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, directive):
+        """
+        Return the cache key for `directive` (a `Directive` instance that
+        has not been run yet) or None, if its result must not be cached.
+        """
+        from docutils.parsers.rst import roles
+        files = directive.cache_files()
+        if files is None:
+            return None
+        settings = directive.state.document.settings
+        try:
+            mtimes = tuple([(path, os.path.getmtime(path))
+                            for path in files])
+            # The file modification times must come first (see `put()`).
+            key = (mtimes, directive.__class__, directive.name,
+                   tuple(directive.arguments),
+                   _freeze(directive.options),
+                   tuple(directive.content),
+                   directive.state.__class__,
+                   tuple([getattr(settings, name, None)
+                          for name in directive.cache_settings]),
+                   # interpreted text in nested parses:
+                   frozenset(roles.local_roles().items()))
+            hash(key)
+        except (OSError, TypeError):
+            # missing file (the directive reports it) or unhashable option
+            return None
+        return key
+
+    def get(self, key, directive):
+        """
+        Return a copy of the cached result for `key` or None.
+
+        Record the dependencies of the cached result and call
+        `directive.cache_replay()`.
+        """
+        try:
+            (result, lineno, source, srcline, dependencies,
+             current_position) = self.results[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        try:
+            for path, mtime in dependencies:
+                if os.path.getmtime(path) != mtime:
+                    raise OSError
+        except OSError:
+            # a file read by a nested directive changed
+            del self.results[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        new_source, new_srcline = directive.state_machine.get_source_and_line(
+            directive.lineno)
+        line_delta = directive.lineno - lineno
+        srcline_delta = (new_srcline or 0) - (srcline or 0)
+        def adjust(node_source, node_line):
+            if node_line is None:
+                return node_source, None
+            if node_source is None:
+                return None, node_line + line_delta
+            if node_source == source:
+                return new_source, node_line + srcline_delta
+            return node_source, node_line # e.g. included files
+        document = directive.state.document
+        # Restore the document position a nested parse would leave
+        # (used for nodes without line info):
+        document.current_source, document.current_line = adjust(
+            *current_position)
+        settings = document.settings
+        for path, mtime in dependencies:
+            settings.record_dependencies.add(path)
+        directive.cache_replay()
+        position = lambda node: adjust(node.source, node.line)
+        return [_copy_node(node, position) for node in result]
+
+    def context(self, document):
+        """
+        Return the parts of the parser state that a cacheable directive
+        must not change (compare before and after `run()`).
+        """
+        from docutils.parsers.rst import roles
+        attributes = {}
+        for name, value in document.attributes.items():
+            if isinstance(value, list):
+                value = value[:]
+            attributes[name] = value
+        return (document.settings.__dict__.copy(), attributes,
+                roles.local_roles())
+
+    def put(self, key, directive, result, dependencies, context=None):
+        """
+        Store a copy of `result`, if it is independent of the document.
+
+        `dependencies` are the files recorded during `run()`; `context` is
+        the result of `self.context()` before `run()`.
+        """
+        document = directive.state.document
+        if context is not None and self.context(document) != context:
+            return
+        for node in result:
+            for child in node.traverse():
+                if isinstance(child, self.uncacheable_node_classes):
+                    return
+                if isinstance(child, nodes.Element):
+                    for att in self.uncacheable_attributes:
+                        if child.get(att):
+                            return
+        if len(self.results) >= self.maxsize:
+            self.results.clear()
+        source, srcline = directive.state_machine.get_source_and_line(
+            directive.lineno)
+        # (`directive.cache_files()` may fail after `run()` changed
+        # the options)
+        mtimes = list(key[0])
+        try:
+            for path in dependencies:
+                mtimes.append((path, os.path.getmtime(path)))
+        except OSError:
+            return
+        keep = lambda node: (node.source, node.line)
+        current_position = (document.current_source, document.current_line)
+        dependencies = []
+        for item in mtimes:
+            if item not in dependencies:
+                dependencies.append(item)
+        self.results[key] = ([_copy_node(node, keep) for node in result],
+                             directive.lineno, source, srcline,
+                             tuple(dependencies), current_position)
+
+    def clear(self):
+        self.results.clear()
+        self.hits = self.misses = 0
+
+result_cache = ResultCache()
+"""The `ResultCache` used by the reStructuredText parser."""
+
+def _freeze(value):
+    """Return a hashable version of an option dictionary or value."""
+    if isinstance(value, dict):
+        items = [(key, _freeze(val)) for (key, val) in value.items()]
+        items.sort()
+        return tuple(items)
+    if isinstance(value, list):
+        return tuple([_freeze(val) for val in value])
+    return value
+
+def _copy_node(node, position):
+    """Return a deep copy of `node`, including source and line.
+
+    `position` is a function returning the (source, line) tuple for the
+    copy of a node.
+    """
+    copy = node.copy()
+    copy.source, copy.line = position(node)
+    if isinstance(node, nodes.Element):
+        copy.extend([_copy_node(child, position) for child in node.children])
+    return copy
+
 def flag(argument):
     """
     Check for a valid flag option (no argument) and return ``None``.
@@ -184,6 +184,7 @@ class MathBlock(Directive):
                    ## TODO: Add Sphinx' ``mathbase.py`` option 'nowrap'?
                    # 'nowrap': directives.flag,
     has_content = True
+    cacheable = True
 
     def run(self):
         set_classes(self.options)
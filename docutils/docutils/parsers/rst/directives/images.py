@@ -10,21 +10,11 @@ __docformat__ = 'reStructuredText'
 
 
 import sys
-import urllib
 from docutils import nodes, utils
 from docutils.parsers.rst import Directive
 from docutils.parsers.rst import directives, states
 from docutils.nodes import fully_normalize_name, whitespace_normalize_name
 from docutils.parsers.rst.roles import set_classes
-try: # check for the Python Imaging Library
-    import PIL.Image
-except ImportError:
-    try:  # sometimes PIL modules are put in PYTHONPATH's root
-        import Image
-        class PIL(object): pass  # dummy wrapper
-        PIL.Image = Image
-    except ImportError:
-        PIL = None
 
 class Image(Directive):
 
@@ -124,7 +114,14 @@ class Figure(Image):
             return [image_node]
         figure_node = nodes.figure('', image_node)
         if figwidth == 'image':
-            if PIL and self.state.document.settings.file_insertion_enabled:
+            if self.state.document.settings.file_insertion_enabled:
+                PIL = utils.get_PIL()
+            else:
+                PIL = None
+            if PIL:
+                # Do not import urllib at the top of the module: it takes
+                # some time to load and is only needed here.
+                import urllib
                 imagepath = urllib.url2pathname(image_node['uri'])
                 try:
                     img = PIL.Image.open(
@@ -50,10 +50,17 @@ class Include(Directive):
     standard_include_path = os.path.join(os.path.dirname(states.__file__),
                                          'include')
 
-    def run(self):
-        """Include a file as part of the content of this reST file."""
-        if not self.state.document.settings.file_insertion_enabled:
-            raise self.warning('"%s" directive disabled.' % self.name)
+    # Only literal and code includes are cacheable: parsed includes insert
+    # the file content into the state machine's input.
+    cacheable = True
+
+    def cache_files(self):
+        if 'literal' in self.options or 'code' in self.options:
+            return [self.include_path()]
+        return None
+
+    def include_path(self):
+        """Return the path of the included file."""
         source = self.state_machine.input_lines.source(
             self.lineno - self.state_machine.input_offset - 1)
         source_dir = os.path.dirname(os.path.abspath(source))
@@ -62,7 +69,13 @@ class Include(Directive):
             path = os.path.join(self.standard_include_path, path[1:-1])
         path = os.path.normpath(os.path.join(source_dir, path))
         path = utils.relative_path(None, path)
-        path = nodes.reprunicode(path)
+        return nodes.reprunicode(path)
+
+    def run(self):
+        """Include a file as part of the content of this reST file."""
+        if not self.state.document.settings.file_insertion_enabled:
+            raise self.warning('"%s" directive disabled.' % self.name)
+        path = self.include_path()
         encoding = self.options.get(
             'encoding', self.state.document.settings.input_encoding)
         e_handler=self.state.document.settings.input_encoding_error_handler
@@ -251,6 +264,7 @@ class Raw(Directive):
 class Replace(Directive):
 
     has_content = True
+    cacheable = True
 
     def run(self):
         if not isinstance(self.state, states.SubstitutionDef):
@@ -299,19 +313,14 @@ class Unicode(Directive):
 
     comment_pattern = re.compile(r'( |\n|^)\.\. ')
 
+    cacheable = True
+
     def run(self):
         if not isinstance(self.state, states.SubstitutionDef):
             raise self.error(
                 'Invalid context: the "%s" directive can only be used within '
                 'a substitution definition.' % self.name)
-        substitution_definition = self.state_machine.node
-        if 'trim' in self.options:
-            substitution_definition.attributes['ltrim'] = 1
-            substitution_definition.attributes['rtrim'] = 1
-        if 'ltrim' in self.options:
-            substitution_definition.attributes['ltrim'] = 1
-        if 'rtrim' in self.options:
-            substitution_definition.attributes['rtrim'] = 1
+        self.cache_replay()
         codes = self.comment_pattern.split(self.arguments[0])[0].split()
         element = nodes.Element()
         for code in codes:
@@ -323,6 +332,17 @@ class Unicode(Directive):
             element += nodes.Text(decoded)
         return element.children
 
+    def cache_replay(self):
+        """Set the trim options of the substitution definition."""
+        substitution_definition = self.state_machine.node
+        if 'trim' in self.options:
+            substitution_definition.attributes['ltrim'] = 1
+            substitution_definition.attributes['rtrim'] = 1
+        if 'ltrim' in self.options:
+            substitution_definition.attributes['ltrim'] = 1
+        if 'rtrim' in self.options:
+            substitution_definition.attributes['rtrim'] = 1
+
 
 class Class(Directive):
 
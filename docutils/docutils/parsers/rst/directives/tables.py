@@ -215,6 +215,23 @@ class CSVTable(Table):
         lineterminator = '\n'
         quoting = csv.QUOTE_MINIMAL
 
+    cacheable = True
+
+    def cache_files(self):
+        if 'url' in self.options:
+            return None # remote data may change any time
+        if 'file' in self.options:
+            return [self.csv_file_path()]
+        return []
+
+    def csv_file_path(self):
+        """Return the path of the CSV file given by the "file" option."""
+        source_dir = os.path.dirname(
+            os.path.abspath(self.state.document.current_source))
+        source = os.path.normpath(os.path.join(source_dir,
+                                               self.options['file']))
+        return utils.relative_path(None, source)
+
     def check_requirements(self):
         pass
 
@@ -290,11 +307,7 @@ class CSVTable(Table):
                       nodes.literal_block(self.block_text, self.block_text),
                       line=self.lineno)
                 raise SystemMessagePropagation(error)
-            source_dir = os.path.dirname(
-                os.path.abspath(self.state.document.current_source))
-            source = os.path.normpath(os.path.join(source_dir,
-                                                   self.options['file']))
-            source = utils.relative_path(None, source)
+            source = self.csv_file_path()
             try:
                 self.state.document.settings.record_dependencies.add(source)
                 csv_file = io.FileInput(source_path=source,
@@ -385,6 +398,7 @@ class ListTable(Table):
                                                  directives.positive_int_list),
                    'class': directives.class_option,
                    'name': directives.unchanged}
+    cacheable = True
 
     def run(self):
         if not self.content:
@@ -0,0 +1,357 @@
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Incremental re-parsing of edited reStructuredText documents.
+
+For live previews, an `IncrementalParser` keeps the transformed document
+of the last parse.  After an edit, only the changed top-level blocks
+(plus one unchanged block of context on each side) are parsed and
+transformed in a scratch document; the resulting nodes replace the old
+ones in place and the line numbers of the following nodes are shifted.
+
+Example::
+
+    parser = IncrementalParser(source_path='notes.txt')
+    document = parser.parse(text)
+    ...
+    document = parser.update(edited_text)
+
+Incremental updates are only done if the replaced and the new nodes are
+independent of the rest of the document.  `update()` falls back to a full
+parse if the edited region
+
+* contains (or contained) sections, transitions, targets, references by
+  name or ID, footnotes, citations, substitutions, pending transforms or
+  system messages,
+* is the start of the document (document title and bibliographic fields),
+* continues a construct from the unchanged text (e.g. a list item),
+
+or if the document uses directives that change the parser state for the
+rest of the document ("default-role", "role", "title", "header",
+"footer", "include").
+"""
+
+__docformat__ = 'reStructuredText'
+
+import re
+
+from docutils import frontend, nodes, statemachine, utils
+from docutils.parsers import rst
+from docutils.parsers.rst.directives import ResultCache
+from docutils.readers import standalone
+
+
+class IncrementalParser:
+
+    """
+    Parse a reStructuredText document and update it after edits.
+    """
+
+    context_directives = re.compile(
+        r'^ *\.\. +(default-role|role|title|header|footer|include) *::',
+        re.MULTILINE)
+    """Directives with effects beyond their own output."""
+
+    dependent_node_classes = ResultCache.uncacheable_node_classes + (
+        nodes.section, nodes.transition, nodes.footnote,
+        nodes.citation, nodes.decoration, nodes.docinfo)
+    """Nodes that depend on (or are used by) the rest of the document."""
+
+    dependent_attributes = ResultCache.uncacheable_attributes
+
+    adornment = re.compile(r'([!-/:-@[-`{-~])\1* *$')
+    """Section title adornment or transition."""
+
+    def __init__(self, settings=None, source_path='<string>',
+                 components=None):
+        """
+        :Parameters:
+            - `settings`: runtime settings (default: the defaults of the
+              rst parser and the standalone reader).
+            - `source_path`: path or description of the document source.
+            - `components`: components providing the transforms to apply
+              (default: the rst parser and the standalone reader; add a
+              writer to get its transforms as well).
+        """
+        self.parser = rst.Parser()
+        if components is None:
+            components = (standalone.Reader(parser=self.parser), self.parser)
+        self.components = components
+        if settings is None:
+            settings = frontend.OptionParser(
+                components=components).get_default_values()
+        self.settings = settings
+        self.source_path = source_path
+
+        self.document = None
+        """The transformed document of the last parse or update."""
+
+        self.lines = []
+        """The source lines of `self.document` (tabs expanded)."""
+
+        # Settings for parsing an edited region in a scratch document:
+        self.region_settings = settings.copy()
+        self.region_settings.warning_stream = ''
+        self.region_settings.halt_level = 5
+        for name in ('doctitle_xform', 'docinfo_xform', 'generator',
+                     'datestamp', 'source_link', 'source_url'):
+            setattr(self.region_settings, name, None)
+
+        self.full_parses = 0
+        self.incremental_updates = 0
+
+    def parse(self, text):
+        """Parse and transform `text` completely; return the document."""
+        self.document = self.parse_text(text, self.settings)
+        self.lines = self.split(text)
+        self.full_parses += 1
+        return self.document
+
+    def update(self, text):
+        """
+        Update `self.document` to the edited `text` and return it.
+
+        Re-parse only the edited region, if possible.
+        """
+        if self.document is None:
+            return self.parse(text)
+        lines = self.split(text)
+        if lines == self.lines:
+            return self.document
+        if not self.update_region(lines, text):
+            return self.parse(text)
+        self.lines = lines
+        self.incremental_updates += 1
+        return self.document
+
+    def split(self, text):
+        return statemachine.string2lines(
+            text, tab_width=self.settings.tab_width, convert_whitespace=True)
+
+    def parse_text(self, text, settings):
+        document = utils.new_document(self.source_path, settings)
+        self.parser.parse(text, document)
+        document.transformer.populate_from_components(self.components)
+        document.transformer.apply_transforms()
+        return document
+
+    def update_region(self, lines, text):
+        """
+        Replace the nodes of the edited region; return False if this is
+        not possible.
+        """
+        if (self.context_directives.search(text)
+            or self.context_directives.search('\n'.join(self.lines))):
+            return False
+        old_lines = self.lines
+        # common prefix and suffix:
+        size = min(len(lines), len(old_lines))
+        start = 0
+        while start < size and lines[start] == old_lines[start]:
+            start += 1
+        end = 0
+        while (end < size - start
+               and lines[-end - 1] == old_lines[-end - 1]):
+            end += 1
+        delta = len(lines) - len(old_lines)
+        # Extend the edit to block boundaries in the unchanged text and
+        # add one block of context on each side (section titles end the
+        # preceding construct and need no context):
+        region_start = self.block_start(old_lines, start, 2)
+        title = self.is_title(old_lines, region_start)
+        if (title and region_start + title < len(old_lines)
+            and not old_lines[region_start + title].strip()):
+            region_start = self.block_start(old_lines, start, 1)
+        region_end = self.block_end(old_lines, len(old_lines) - end, 1)
+        if (not self.is_title(old_lines, region_end)
+            or lines[region_end + delta - 1].strip()):
+            region_end = self.block_end(old_lines, len(old_lines) - end, 2)
+        if region_start == 0:
+            return False
+        position = self.find_position(region_start, region_end)
+        if position is None:
+            return False
+        parent, index = position
+        # Section content is parsed by a nested state machine (with
+        # slightly different line numbers):
+        nested = len(parent) and isinstance(parent[0], nodes.title)
+        last = region_end == len(old_lines)
+        old_nodes = self.parse_region(old_lines[region_start:region_end],
+                                      nested, last)
+        new_nodes = self.parse_region(lines[region_start:region_end + delta],
+                                      nested, last)
+        if (not old_nodes or new_nodes is None
+            or not self.matches(parent, index, old_nodes, region_start)):
+            return False
+        self.shift_lines(region_end, delta)
+        for node in new_nodes:
+            for child in node.traverse():
+                child.document = self.document
+                if child.line is not None:
+                    child.line += region_start
+        parent[index:index + len(old_nodes)] = new_nodes
+        return True
+
+    def block_start(self, lines, index, count):
+        """
+        Return the start of the `count`-th block (a non-indented line after
+        a blank line) at or before line `index`.
+        """
+        index = min(index, len(lines) - 1)
+        while index > 0:
+            if self.is_block_start(lines, index):
+                count -= 1
+                if not count:
+                    return index
+            index -= 1
+        return 0
+
+    def block_end(self, lines, index, count):
+        """
+        Return the start of the `count`-th block at or after line `index`.
+        """
+        index = max(index, 1)
+        while index < len(lines):
+            if self.is_block_start(lines, index):
+                count -= 1
+                if not count:
+                    return index
+            index += 1
+        return len(lines)
+
+    def is_block_start(self, lines, index):
+        return (lines[index] and lines[index][0] != ' '
+                and not lines[index - 1].strip())
+
+    def is_title(self, lines, index):
+        """
+        Return the number of lines of the section title or transition
+        starting at line `index` (0 if there is none).
+        """
+        lines = lines[index:index + 3] + ['', '', '']
+        if not self.adornment.match(lines[0]):
+            # title with underline:
+            if lines[0].strip() and self.adornment.match(lines[1]):
+                return 2
+        elif not lines[1].strip():
+            # transition:
+            if len(lines[0].strip()) >= 4:
+                return 1
+        elif self.adornment.match(lines[2]):
+            # title with overline:
+            return 3
+        return 0
+
+    def parse_region(self, lines, nested=False, last=False):
+        """
+        Parse and transform `lines` in a scratch document (in a section, if
+        `nested` is true).  Return the list of top-level nodes (with line
+        numbers relative to the region) or None if the result is not
+        independent of the rest of the document.
+
+        Unless `lines` is the `last` part of the document, an empty comment
+        stands in for the following block (constructs at the end of the
+        input get different line numbers), followed by blank lines: some
+        nodes get line numbers after their own lines (e.g. attributions),
+        which must not be beyond the end of the input.
+        """
+        prefix = suffix = []
+        if nested:
+            prefix = ['Region', '======', '']
+        if not last:
+            suffix = ['..'] + [''] * len(lines)
+        document = self.parse_text('\n'.join(prefix + lines + suffix),
+                                   self.region_settings)
+        container = document
+        if nested:
+            if len(document) != 1 or not isinstance(document[0],
+                                                     nodes.section):
+                return None
+            container = document[0]
+            del container[0]
+        if suffix:
+            if not container or not isinstance(container[-1], nodes.comment):
+                return None
+            del container[-1]
+        if (document.parse_messages or document.transform_messages
+            or document.substitution_defs or document.indirect_targets
+            or document.footnotes or document.autofootnotes
+            or document.symbol_footnotes or document.citations):
+            return None
+        for node in container.traverse(include_self=False):
+            if isinstance(node, self.dependent_node_classes):
+                return None
+            if isinstance(node, nodes.Element):
+                for att in self.dependent_attributes:
+                    if node.get(att):
+                        return None
+            if node.line is not None:
+                node.line -= len(prefix)
+        return container.children[:]
+
+    def find_position(self, region_start, region_end):
+        """
+        Return (parent, index) of the first node generated by the region
+        starting after line `region_start` or None if it cannot be found.
+        """
+        for node in self.document.traverse(nodes.Body):
+            if not isinstance(node.parent, (nodes.document, nodes.section)):
+                continue
+            line = self.first_line(node)
+            if line is not None and region_start < line <= region_end:
+                break
+        else:
+            return None
+        parent = node.parent
+        index = parent.index(node)
+        if isinstance(parent, nodes.document):
+            # The document title and docinfo transforms depend on the
+            # first elements of the document:
+            for sibling in parent[:index]:
+                if not isinstance(sibling, (nodes.PreBibliographic,
+                                            nodes.Invisible)):
+                    break
+            else:
+                return None
+        return parent, index
+
+    def first_line(self, node):
+        """Return the first line number in `node` (some nodes have none)."""
+        for child in node.traverse(nodes.Element):
+            if child.line is not None:
+                return child.line
+        return None
+
+    def matches(self, parent, index, old_nodes, region_start):
+        """
+        Are the nodes starting at `parent[index]` the same as the nodes
+        `old_nodes` of the old region (including line numbers)?
+        """
+        candidates = parent[index:index + len(old_nodes)]
+        if len(candidates) != len(old_nodes):
+            return False
+        for candidate, old_node in zip(candidates, old_nodes):
+            if candidate.pformat() != old_node.pformat():
+                return False
+            for old, new in zip(candidate.traverse(), old_node.traverse()):
+                if old.line is None and new.line is None:
+                    continue
+                if (old.line is None or new.line is None
+                    or old.line != new.line + region_start):
+                    return False
+        return True
+
+    def shift_lines(self, region_end, delta):
+        """Add `delta` to line numbers after line `region_end`."""
+        if not delta:
+            return
+        for node in self.document.traverse():
+            if (node.line is not None and node.line > region_end
+                and node.source in (self.source_path, None)):
+                node.line += delta
+            if (isinstance(node, nodes.system_message)
+                and node.get('line') is not None
+                and node['line'] > region_end
+                and node.get('source') in (self.source_path, None)):
+                node['line'] += delta
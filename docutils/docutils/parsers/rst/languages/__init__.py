@@ -19,8 +19,28 @@ if sys.version_info < (2,5):
     from docutils._compat import __import__
 
 _languages = {}
+"""Cache of imported language modules: module name -> module."""
+
+_language_codes = {}
+"""Cache of language lookups: language code -> module (or None)."""
+
+_tables = {}
+"""Cache of merged name tables: language module name -> (directives, roles).
+See `get_tables()`."""
 
 def get_language(language_code):
+    """Return module with reStructuredText language mappings or None.
+
+    `language_code` is a "BCP 47" language tag.
+    """
+    try:
+        return _language_codes[language_code]
+    except KeyError:
+        module = _import_language(language_code)
+        _language_codes[language_code] = module
+        return module
+
+def _import_language(language_code):
     for tag in normalize_language_tag(language_code):
         tag = tag.replace('-','_') # '-' not valid in module names
         if tag in _languages:
@@ -35,3 +55,33 @@ def get_language(language_code):
         _languages[tag] = module
         return module
     return None
+
+def get_tables(language_module):
+    """
+    Return the directive and role name tables of `language_module`, merged
+    with the English tables.
+
+    Return a 2-tuple of dictionaries ``(directives, roles)``, mapping
+    (lowercase) local names to ``(canonical name, fallback)`` tuples.
+    `fallback` is true for names found only in the English tables, until
+    the English fallback has been reported once (the directive and role
+    lookups then reset it, so the INFO message is not repeated).
+    The tables are built once per language module and process.
+    """
+    key = getattr(language_module, '__name__', None)
+    try:
+        return _tables[key]
+    except KeyError:
+        pass
+    english = get_language('en')
+    tables = []
+    for attribute in ('directives', 'roles'):
+        table = {}
+        for name, canonical in getattr(english, attribute).items():
+            table[name] = (canonical, True)
+        for name, canonical in getattr(language_module, attribute,
+                                       {}).items():
+            table[name] = (canonical, False)
+        tables.append(table)
+    _tables[key] = tables = tuple(tables)
+    return tables
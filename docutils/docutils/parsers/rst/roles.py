@@ -74,7 +74,7 @@ __docformat__ = 'reStructuredText'
 
 from docutils import nodes, utils
 from docutils.parsers.rst import directives
-from docutils.parsers.rst.languages import en as _fallback_language_module
+from docutils.parsers.rst import languages
 from docutils.utils.code_analyzer import Lexer, LexerError
 
 DEFAULT_INTERPRETED_ROLE = 'title-reference'
@@ -106,30 +106,32 @@ def role(role_name, language_module, lineno, reporter):
         return _roles[normname], messages
 
     if role_name:
-        canonicalname = None
-        try:
-            canonicalname = language_module.roles[normname]
-        except AttributeError, error:
-            msg_text.append('Problem retrieving role entry from language '
-                            'module %r: %s.' % (language_module, error))
-        except KeyError:
-            msg_text.append('No role entry for "%s" in module "%s".'
-                            % (role_name, language_module.__name__))
+        # single lookup in the precomputed (language + English) table:
+        table = languages.get_tables(language_module)[1]
+        canonicalname, fallback = table.get(normname, (None, True))
+        if fallback:
+            if not hasattr(language_module, 'roles'):
+                msg_text.append('Problem retrieving role entry from language '
+                                'module %r: %s.' % (language_module,
+                                'no "roles" table'))
+            else:
+                msg_text.append('No role entry for "%s" in module "%s".'
+                                % (role_name, language_module.__name__))
+            # If we didn't find it, try English as a fallback.
+            if canonicalname:
+                msg_text.append('Using English fallback for role "%s".'
+                                % role_name)
+                # report the fallback only once per language and name:
+                table[normname] = (canonicalname, False)
+            else:
+                msg_text.append('Trying "%s" as canonical role name.'
+                                % role_name)
+                # The canonical name should be an English name,
+                # but just in case:
+                canonicalname = normname
     else:
         canonicalname = DEFAULT_INTERPRETED_ROLE
 
-    # If we didn't find it, try English as a fallback.
-    if not canonicalname:
-        try:
-            canonicalname = _fallback_language_module.roles[normname]
-            msg_text.append('Using English fallback for role "%s".'
-                            % role_name)
-        except KeyError:
-            msg_text.append('Trying "%s" as canonical role name.'
-                            % role_name)
-            # The canonical name should be an English name, but just in case:
-            canonicalname = normname
-
     # Collect any messages that we generated.
     if msg_text:
         message = reporter.info('\n'.join(msg_text), line=lineno)
@@ -165,6 +167,16 @@ def register_local_role(name, role_fn):
     set_implicit_options(role_fn)
     _roles[name] = role_fn
 
+def local_roles():
+    """
+    Return a dictionary of the roles defined by the document: the default
+    role and roles created with the "role" directive.  Local names of
+    canonical roles (registered on first use) are left out.
+    """
+    canonical = _role_registry.values()
+    return dict([(name, role_fn) for (name, role_fn) in _roles.items()
+                 if name == '' or role_fn not in canonical])
+
 def set_implicit_options(role_fn):
     """
     Add customization options to role functions, unless explicitly set or
@@ -115,6 +115,7 @@ from docutils.nodes import whitespace_normalize_name
 import docutils.parsers.rst
 from docutils.parsers.rst import directives, languages, tableparser, roles
 from docutils.parsers.rst.languages import en as _fallback_language_module
+from docutils.transforms import Transform
 from docutils.utils import escape2null, unescape, column_width
 from docutils.utils import punctuation_chars, roman, urischemes
 
@@ -142,12 +143,14 @@ class RSTStateMachine(StateMachineWS):
     """
 
     def run(self, input_lines, document, input_offset=0, match_titles=True,
-            inliner=None):
+            inliner=None, skim=False):
         """
         Parse `input_lines` and modify the `document` node in place.
 
         Extend `StateMachineWS.run()`: set up parse-global data and
-        run the StateMachine.
+        run the StateMachine.  If `skim` is true, inline markup in
+        paragraphs, directives and substitution definitions are left for
+        `materialize()` (see `Body.skim_run_directives`).
         """
         self.language = languages.get_language(
             document.settings.language_code)
@@ -161,7 +164,10 @@ class RSTStateMachine(StateMachineWS):
                            title_styles=[],
                            section_level=0,
                            section_bubble_up_kludge=False,
-                           inliner=inliner)
+                           inliner=inliner,
+                           skim=skim,
+                           lazy_inline=getattr(document.settings,
+                                               'lazy_inline', False))
         self.document = document
         self.attach_observer(document.note_source)
         self.reporter = self.memo.reporter
@@ -414,7 +420,21 @@ class RSTState(StateWS):
         else:
             text = data
             literalnext = 0
-        textnodes, messages = self.inline_text(text, lineno)
+        if self.memo.skim:
+            textnodes = [DeferredText(text, text)]
+            textnodes[0].lineno = lineno
+            textnodes[0].memo = self.memo
+            messages = []
+        elif self.memo.lazy_inline and self.inliner.can_defer(text):
+            p = nodes.paragraph(data, '')
+            inliner, memo, parent = self.inliner, self.memo, self.parent
+            p.deferred_children = (
+                lambda: inliner.parse(text, lineno, memo, parent)[0])
+            p.deferred_node_classes = inliner.deferrable_node_classes
+            p.source, p.line = self.state_machine.get_source_and_line(lineno)
+            return [p], literalnext
+        else:
+            textnodes, messages = self.inline_text(text, lineno)
         p = nodes.paragraph(data, '', *textnodes)
         p.source, p.line = self.state_machine.get_source_and_line(lineno)
         return [p] + messages, literalnext
@@ -433,6 +453,110 @@ class RSTState(StateWS):
                                      line=lineno)
 
 
+class DeferredText(nodes.Text):
+
+    """
+    The unparsed text of a paragraph in a skimmed document (see
+    `RSTStateMachine.run()`).  `materialize()` replaces it with the
+    result of `Inliner.parse()`.
+    """
+
+    lineno = None
+    """Absolute line number of the text."""
+
+    memo = None
+    """The memo of the skim parse."""
+
+    def copy(self):
+        node = nodes.Text.copy(self)
+        node.lineno = self.lineno
+        node.memo = self.memo
+        return node
+
+    def materialize(self):
+        element = self.parent
+        textnodes, messages = self.memo.inliner.parse(
+            self.rawsource, self.lineno, self.memo, element.parent)
+        element.replace(self, textnodes)
+        if messages:
+            index = element.parent.index(element) + 1
+            element.parent[index:index] = messages
+
+
+class DeferredBlock(Transform):
+
+    """
+    Parse an explicit markup block (directive or substitution definition)
+    that a skim parse left as a "pending" node.
+
+    The "pending" node's ``deferred`` attribute holds the input lines of
+    the block, their absolute line offset and the memo of the skim parse.
+    """
+
+    default_priority = 100
+
+    def apply(self):
+        pending = self.startnode
+        block, input_offset, memo = pending.deferred
+        memo = Struct(**memo.__dict__)
+        memo.skim = False
+        container = nodes.Element()
+        state_machine = NestedStateMachine(
+            debug=self.document.reporter.debug_flag,
+            state_classes=state_classes, initial_state='Body')
+        state_machine.run(block, input_offset, memo, container)
+        state_machine.unlink()
+        pending.replace_self(container.children)
+
+
+def materialize(node):
+    """
+    Parse the directives, substitution definitions and paragraph text that
+    a skim parse deferred in `node` and its descendants.
+
+    The deferred parts are parsed in document order, and the lists of
+    auto-numbered and auto-symbol footnotes and footnote references are
+    put back into document order, so footnotes are numbered as in a full
+    parse.  Names are registered in a different order, though: section
+    titles and the targets of the skimmed text are registered before
+    names defined in deferred blocks (e.g. the "contents" topic), which
+    may change which element of duplicate implicit names gets the
+    "dupnames" attribute and where the "Duplicate implicit target name"
+    message is placed.  Generated ids may also differ.
+    """
+    def is_deferred(node):
+        return (isinstance(node, DeferredText)
+                or isinstance(node, nodes.pending)
+                and node.transform is DeferredBlock)
+    document = None
+    for deferred in node.traverse(is_deferred):
+        if isinstance(deferred, DeferredText):
+            document = deferred.memo.document
+            deferred.materialize()
+        else:
+            document = deferred.deferred[2].document
+            DeferredBlock(document, deferred).apply()
+    if document is not None:
+        restore_footnote_order(document)
+
+
+def restore_footnote_order(document):
+    """
+    Sort the document's lists of auto-numbered and auto-symbol footnotes
+    and footnote references (registered while parsing) by document order.
+    """
+    order = {}
+    for i, footnote in enumerate(
+        document.traverse((nodes.footnote, nodes.footnote_reference))):
+        order[id(footnote)] = i
+    for name in ('autofootnotes', 'autofootnote_refs', 'symbol_footnotes',
+                 'symbol_footnote_refs'):
+        decorated = [(order.get(id(item), len(order)), i, item)
+                     for i, item in enumerate(getattr(document, name))]
+        decorated.sort()
+        setattr(document, name, [item for (position, i, item) in decorated])
+
+
 def build_regexp(definition, compile=True):
     """
     Build, compile and return a regular expression based on `definition`.
@@ -524,6 +648,79 @@ class Inliner:
             processed += self.implicit_inline(remaining, lineno)
         return processed, messages
 
+    def tokenize(self, text):
+        """
+        Generate (kind, start, end, data) tuples for the inline markup in
+        `text`, in document order, without building nodes.
+
+        The same patterns and validity checks as in `parse()` are applied
+        to the same substrings, but nothing is reported or registered, so
+        neither a document nor a memo is required.  `start` and `end` are
+        offsets into `text`.  `kind` is 'text', a construct name
+        ('emphasis', 'strong', 'literal', 'interpreted', 'target',
+        'substitution_reference', 'footnote_reference',
+        'citation_reference', 'reference', 'anonymous_reference', 'uri',
+        'pep_reference', 'rfc_reference') or 'problematic' for markup
+        that `parse()` would reject with a system message.  `data` is the
+        role name of interpreted text (None for the default role), the
+        normalized name of targets and references, the substitution name,
+        the footnote or citation label, the URI, or the PEP/RFC number.
+
+        Tokens for nested constructs (a substitution reference inside a
+        reference, the target defined by a named embedded link) follow the
+        token of the enclosing construct.  Call `init_customizations()`
+        first to recognize PEP and RFC references.
+
+        Roles are not looked up (this needs the document's language and
+        reporter): interpreted text with an unknown role is an
+        'interpreted' token, although `parse()` reports an error for it.
+        """
+        pattern_search = self.patterns.initial.search
+        dispatch = self.token_dispatch
+        escaped = escape2null(text)
+        remaining = escaped
+        offset = 0                      # position of `remaining` in `text`
+        text_start = 0                  # start of the pending plain text
+        while remaining:
+            match = pattern_search(remaining)
+            if not match:
+                break
+            groups = match.groupdict()
+            method = dispatch[groups['start'] or groups['backquote']
+                              or groups['refend'] or groups['fnend']]
+            before_end, remaining_start, tokens = method(self, match)
+            if tokens:
+                for token in self.implicit_tokens(
+                      escaped[text_start:offset + before_end], text_start):
+                    yield token
+                for kind, start, end, data in tokens:
+                    yield kind, offset + start, offset + end, data
+                text_start = offset + remaining_start
+            remaining = remaining[remaining_start:]
+            offset += remaining_start
+        for token in self.implicit_tokens(escaped[text_start:], text_start):
+            yield token
+
+    deferrable_kinds = ('text', 'emphasis', 'strong', 'literal')
+    """Token kinds that `parse()` turns into nodes without registering them
+    with the document.  (Transforms look for all references, so standalone
+    hyperlinks are not deferred.)"""
+
+    deferrable_node_classes = (nodes.Text, nodes.emphasis, nodes.strong,
+                               nodes.literal)
+    """Classes of the nodes created for `deferrable_kinds`."""
+
+    def can_defer(self, text):
+        """
+        Return true if `parse()` of `text` can be postponed: it would
+        neither register names, ids or references with the document nor
+        report problems.
+        """
+        for token in self.tokenize(text):
+            if token[0] not in self.deferrable_kinds:
+                return False
+        return True
+
     # Inline object recognition
     # -------------------------
     # lookahead and look-behind expressions for inline markup rules
@@ -1014,6 +1211,191 @@ class Inliner:
                     pass
         return [nodes.Text(unescape(text), rawsource=unescape(text, 1))]
 
+    # Token stream recognition (see `tokenize()`)
+    # -------------------------------------------
+    # The ``*_tokens`` methods mirror the node-building methods of the same
+    # name.  They return the end of the text before the construct, the
+    # start of the remaining text and a list of tokens, with offsets
+    # relative to ``match.string``.
+
+    def inline_obj_tokens(self, match, end_pattern, kind):
+        """Return `inline_obj()` positions, tokens, text and end-string."""
+        string = match.string
+        matchstart = match.start('start')
+        matchend = match.end('start')
+        if self.quoted_start(match):
+            return matchend, matchend, [], None, ''
+        endmatch = end_pattern.search(string[matchend:])
+        if endmatch and endmatch.start(1):  # 1 or more chars
+            text = unescape(endmatch.string[:endmatch.start(1)])
+            textend = matchend + endmatch.end(1)
+            return (matchstart, textend, [(kind, matchstart, textend, None)],
+                    text, endmatch.group(1))
+        return (matchstart, matchend,
+                [('problematic', matchstart, matchend, None)], None, '')
+
+    def emphasis_tokens(self, match):
+        return self.inline_obj_tokens(match, self.patterns.emphasis,
+                                      'emphasis')[:3]
+
+    def strong_tokens(self, match):
+        return self.inline_obj_tokens(match, self.patterns.strong,
+                                      'strong')[:3]
+
+    def literal_tokens(self, match):
+        return self.inline_obj_tokens(match, self.patterns.literal,
+                                      'literal')[:3]
+
+    def inline_internal_target_tokens(self, match):
+        before_end, remaining_start, tokens, text, endstring = \
+              self.inline_obj_tokens(match, self.patterns.target, 'target')
+        if text is not None:
+            tokens = [('target', before_end, remaining_start,
+                       normalize_name(text))]
+        return before_end, remaining_start, tokens
+
+    def substitution_reference_tokens(self, match):
+        before_end, remaining_start, tokens, text, endstring = \
+              self.inline_obj_tokens(match, self.patterns.substitution_ref,
+                                     'substitution_reference')
+        if text is not None:
+            tokens = [('substitution_reference', before_end,
+                       remaining_start, whitespace_normalize_name(text))]
+            if endstring[-2:] == '__':
+                tokens.insert(0, ('anonymous_reference', before_end,
+                                  remaining_start, None))
+            elif endstring[-1:] == '_':
+                tokens.insert(0, ('reference', before_end, remaining_start,
+                                  normalize_name(text)))
+        return before_end, remaining_start, tokens
+
+    def interpreted_or_phrase_ref_tokens(self, match):
+        end_pattern = self.patterns.interpreted_or_phrase_ref
+        string = match.string
+        matchstart = match.start('backquote')
+        matchend = match.end('backquote')
+        rolestart = match.start('role')
+        role = match.group('role')
+        if role:
+            role = role[1:-1]
+        elif self.quoted_start(match):
+            return matchend, matchend, []
+        endmatch = end_pattern.search(string[matchend:])
+        if endmatch and endmatch.start(1):  # 1 or more chars
+            textend = matchend + endmatch.end()
+            problematic = [('problematic', rolestart, textend, None)]
+            if endmatch.group('role'):
+                if role:
+                    return rolestart, textend, problematic
+                role = endmatch.group('suffix')[1:-1]
+            if string[textend-1] == '_':
+                if role:
+                    return rolestart, textend, problematic
+                escaped = endmatch.string[:endmatch.start(1)]
+                return matchstart, textend, self.phrase_ref_tokens(
+                    matchstart, textend, escaped,
+                    string[textend-2:textend] == '__')
+            return rolestart, textend, [('interpreted', rolestart, textend,
+                                         role or None)]
+        return matchstart, matchend, [('problematic', matchstart, matchend,
+                                       None)]
+
+    def phrase_ref_tokens(self, start, end, escaped, anonymous):
+        match = self.patterns.embedded_link.search(escaped)
+        if match: # embedded <URI> or <alias_>
+            text = unescape(escaped[:match.start(0)])
+            aliastext = unescape(match.group(2), restore_backslashes=True)
+            if aliastext.endswith('_') and not (aliastext.endswith(r'\_')
+                                        or self.patterns.uri.match(aliastext)):
+                kind = 'reference'
+                alias = normalize_name(aliastext[:-1])
+            else:
+                kind = 'uri'
+                alias = self.adjust_uri(''.join(aliastext.split()))
+                if alias.endswith(r'\_'):
+                    alias = alias[:-2] + '_'
+            tokens = [(kind, start, end, alias)]
+            if not anonymous:
+                tokens.append(('target', start, end,
+                               normalize_name(text or alias)))
+            return tokens
+        if anonymous:
+            return [('anonymous_reference', start, end, None)]
+        return [('reference', start, end, normalize_name(unescape(escaped)))]
+
+    def footnote_reference_tokens(self, match):
+        start = match.start('whole')
+        end = match.end('whole')
+        if match.group('citationlabel'):
+            kind = 'citation_reference'
+        else:
+            kind = 'footnote_reference'
+        return start, end, [(kind, start, end,
+                             normalize_name(match.group('footnotelabel')))]
+
+    def reference_tokens(self, match):
+        start = match.start('whole')
+        end = match.end('whole')
+        return start, end, [('reference', start, end,
+                             normalize_name(match.group('refname')))]
+
+    def anonymous_reference_tokens(self, match):
+        start = match.start('whole')
+        end = match.end('whole')
+        return start, end, [('anonymous_reference', start, end, None)]
+
+    # The ``*_token`` methods validate an implicit markup match like the
+    # method of the same name and return the token's kind and data.
+
+    def standalone_uri_token(self, match):
+        scheme = match.group('scheme')
+        if scheme and scheme.lower() not in urischemes.schemes:
+            raise MarkupMismatch
+        uri = unescape(match.group('whole'), 0)
+        if match.group('email'):
+            uri = 'mailto:' + uri
+        return 'uri', uri
+
+    def pep_reference_token(self, match):
+        text = match.group(0)
+        if text.startswith('pep-'):
+            return 'pep_reference', int(match.group('pepnum1'))
+        elif text.startswith('PEP'):
+            return 'pep_reference', int(match.group('pepnum2'))
+        raise MarkupMismatch
+
+    def rfc_reference_token(self, match):
+        if match.group(0).startswith('RFC'):
+            return 'rfc_reference', int(match.group('rfcnum'))
+        raise MarkupMismatch
+
+    def implicit_tokens(self, text, offset=0):
+        """
+        Return the tokens of `implicit_inline()` for `text`, which starts
+        at `offset`.  Patterns in `self.implicit_dispatch` whose method
+        has no ``<name>_token`` counterpart yield tokens of kind ``<name>``
+        without validation.
+        """
+        if not text:
+            return []
+        for pattern, method in self.implicit_dispatch:
+            match = pattern.search(text)
+            if match:
+                name = method.__name__
+                token_method = getattr(self, name + '_token', None)
+                try:
+                    if token_method:
+                        kind, data = token_method(match)
+                    else:
+                        kind, data = name, None
+                except MarkupMismatch:
+                    continue
+                start, end = match.start(), match.end()
+                return (self.implicit_tokens(text[:start], offset)
+                        + [(kind, offset + start, offset + end, data)]
+                        + self.implicit_tokens(text[end:], offset + end))
+        return [('text', offset, offset + len(text), None)]
+
     dispatch = {'*': emphasis,
                 '**': strong,
                 '`': interpreted_or_phrase_ref,
@@ -1024,6 +1406,16 @@ class Inliner:
                 '_': reference,
                 '__': anonymous_reference}
 
+    token_dispatch = {'*': emphasis_tokens,
+                      '**': strong_tokens,
+                      '`': interpreted_or_phrase_ref_tokens,
+                      '``': literal_tokens,
+                      '_`': inline_internal_target_tokens,
+                      ']_': footnote_reference_tokens,
+                      '|': substitution_reference_tokens,
+                      '_': reference_tokens,
+                      '__': anonymous_reference_tokens}
+
 
 def _loweralpha_to_int(s, _zero=(ord('a')-1)):
     return ord(s) - _zero
@@ -1974,6 +2366,16 @@ class Body(RSTState):
 
     def substitution_def(self, match):
         pattern = self.explicit.patterns.substitution
+        if self.memo.skim:
+            pending, blank_finish = self.deferred_block(match)
+            text = escape2null(
+                ' '.join([line.strip() for line in pending.deferred[0]]))
+            subdefmatch = pattern.match(text[match.end():])
+            if subdefmatch:
+                pending.details['substitution'] = \
+                          nodes.whitespace_normalize_name(
+                              subdefmatch.group('name'))
+            return [pending], blank_finish
         src, srcline = self.state_machine.get_source_and_line()
         block, indent, offset, blank_finish = \
               self.state_machine.get_first_known_indented(match.end(),
@@ -2048,9 +2450,41 @@ class Body(RSTState):
         else:
             return 0
 
+    skim_run_directives = ('include', 'role', 'default-role')
+    """Directives that are run in skim mode: they change how the rest of
+    the document (e.g. section titles) is parsed."""
+
+    def deferred_block(self, match, **details):
+        """
+        Skip the explicit markup block starting with `match`; return a
+        2-tuple: a "pending" node for `DeferredBlock`, and a "blank finish"
+        boolean.
+        """
+        initial_line_offset = self.state_machine.line_offset
+        input_offset = self.state_machine.abs_line_offset()
+        indented, indent, line_offset, blank_finish \
+                  = self.state_machine.get_first_known_indented(match.end(),
+                                                                strip_top=0)
+        block = self.state_machine.input_lines[
+            initial_line_offset : self.state_machine.line_offset + 1]
+        block.disconnect()
+        pending = nodes.pending(DeferredBlock, details, '\n'.join(block))
+        pending.source, pending.line = \
+                  self.state_machine.get_source_and_line(input_offset + 1)
+        pending.deferred = (block, input_offset, self.memo)
+        return (pending,
+                blank_finish or self.state_machine.is_next_line_blank())
+
     def directive(self, match, **option_presets):
         """Returns a 2-tuple: list of nodes, and a "blank finish" boolean."""
         type_name = match.group(1)
+        if self.memo.skim:
+            canonicalname = languages.get_tables(self.memo.language)[0].get(
+                type_name.lower(), (None, True))[0]
+            if canonicalname not in self.skim_run_directives:
+                pending, blank_finish = self.deferred_block(
+                    match, directive=type_name)
+                return [pending], blank_finish
         directive_class, messages = directives.directive(
             type_name, self.memo.language, self.document)
         self.parent += messages
@@ -2104,13 +2538,32 @@ class Body(RSTState):
         directive_instance = directive(
             type_name, arguments, options, content, lineno,
             content_offset, block_text, self, self.state_machine)
-        try:
-            result = directive_instance.run()
-        except docutils.parsers.rst.DirectiveError, error:
-            msg_node = self.reporter.system_message(error.level, error.msg,
-                                                    line=lineno)
-            msg_node += nodes.literal_block(block_text, block_text)
-            result = [msg_node]
+        cache_key = result = None
+        if directive_instance.cacheable:
+            cache_key = directives.result_cache.key(directive_instance)
+            if cache_key is not None:
+                result = directives.result_cache.get(cache_key,
+                                                     directive_instance)
+        if result is None:
+            if cache_key is not None:
+                dependencies = self.document.settings.record_dependencies
+                recorded = dependencies.start_recording()
+                context = directives.result_cache.context(self.document)
+            try:
+                try:
+                    result = directive_instance.run()
+                except docutils.parsers.rst.DirectiveError, error:
+                    msg_node = self.reporter.system_message(error.level,
+                                                            error.msg,
+                                                            line=lineno)
+                    msg_node += nodes.literal_block(block_text, block_text)
+                    result = [msg_node]
+            finally:
+                if cache_key is not None:
+                    dependencies.stop_recording(recorded)
+            if cache_key is not None and isinstance(result, list):
+                directives.result_cache.put(cache_key, directive_instance,
+                                            result, recorded, context)
         assert isinstance(result, list), \
                'Directive "%s" must return a list of nodes.' % type_name
         for i in range(len(result)):
@@ -110,6 +110,7 @@ import sys
 import re
 import types
 import unicodedata
+from bisect import bisect_right
 from docutils import utils
 from docutils.utils.error_reporting import ErrorOutput
 
@@ -595,6 +596,17 @@ class State:
     defaults.
     """
 
+    transition_tables = {}
+    """
+    Initial transitions prepared once per `State` subclass and process:
+    {class: (transition names, {name: transition}, [(name,
+    compiled_pattern, function, next_state_name)])}.  The functions of the
+    last list are transition methods to bind to each new instance.  The
+    entries are shared by all instances (which get copies with their own
+    bound methods).  Clear this mapping after changing the `patterns` or
+    `initial_transitions` of a class in use.
+    """
+
     def __init__(self, state_machine, debug=False):
         """
         Initialize a `State` object; make & add initial transitions.
@@ -617,7 +629,7 @@ class State:
         or other classes.
         """
 
-        self.add_initial_transitions()
+        self.init_transitions()
 
         self.state_machine = state_machine
         """A reference to the controlling `StateMachine` object."""
@@ -642,6 +654,49 @@ class State:
         """Remove circular references to objects no longer required."""
         self.state_machine = None
 
+    def init_transitions(self):
+        """
+        Add the initial transitions, copied from `self.transition_tables` if
+        the class has been instantiated before.
+
+        The transitions are prepared by `self.add_initial_transitions()`.
+        They are reused only if that does not set instance attributes and if
+        no attributes used by it are set on the instance.
+        """
+        cls = self.__class__
+        for name in ('patterns', 'initial_transitions', 'ws_patterns',
+                     'ws_initial_transitions'):
+            if name in self.__dict__:
+                self.add_initial_transitions()
+                return
+        table = self.transition_tables.get(cls)
+        if table is not None:
+            names, transitions, unbound = table
+            self.transition_order = list(names)
+            self.transitions = transitions.copy()
+            for name, pattern, function, next_state in unbound:
+                self.transitions[name] = (pattern, function.__get__(self, cls),
+                                          next_state)
+            return
+        attributes = self.__dict__.keys()
+        self.add_initial_transitions()
+        for name in self.__dict__.keys():
+            if name not in attributes:
+                return
+        transitions = {}
+        unbound = []
+        for name, (pattern, method, next_state) in self.transitions.items():
+            try:
+                bound_here = method.im_self is self
+            except AttributeError:
+                bound_here = False
+            if bound_here:
+                unbound.append((name, pattern, method.im_func, next_state))
+            else:
+                transitions[name] = (pattern, method, next_state)
+        self.transition_tables[cls] = (tuple(self.transition_order),
+                                       transitions, unbound)
+
     def add_initial_transitions(self):
         """Make and add transitions listed in `self.initial_transitions`."""
         if self.initial_transitions:
@@ -1067,6 +1122,205 @@ class SearchStateMachineWS(_SearchOverride, StateMachineWS):
     pass
 
 
+class SourceMap(object):
+
+    """
+    Compact list of (source, offset) pairs, used as `ViewList.items`.
+
+    Consecutive items from the same source with consecutive offsets are
+    stored as one run (source, first offset, length).  Lookup of an item is
+    a binary search over the runs; slicing and concatenation copy runs
+    instead of items.  A `SourceMap` compares equal to the list of its
+    items and supports the list methods used by `ViewList`.
+    """
+
+    def __init__(self, items=None):
+        self.starts = []
+        """Index of the first item of each run."""
+
+        self.runs = []
+        """(source, offset) pair of the first item of each run."""
+
+        self.length = 0
+        """Number of items."""
+
+        if items:
+            if isinstance(items, SourceMap):
+                self._set_runs(items._get_runs())
+            else:
+                for item in items:
+                    self.append(item)
+
+    def add_run(self, source, offset, length):
+        """Append `length` items from `source`, starting at `offset`."""
+        if length <= 0:
+            return
+        if self.runs:
+            last_source, last_offset = self.runs[-1]
+            if (last_source == source and isinstance(offset, int)
+                and isinstance(last_offset, int)
+                and last_offset + self.length - self.starts[-1] == offset):
+                self.length += length
+                return
+        if not isinstance(offset, int):
+            # an offset without successor, e.g. None:
+            for i in range(length):
+                self.starts.append(self.length)
+                self.runs.append((source, offset))
+                self.length += 1
+            return
+        self.starts.append(self.length)
+        self.runs.append((source, offset))
+        self.length += length
+
+    def _get_runs(self, start=0, stop=None):
+        """Return (source, offset, length) runs for items `start:stop`."""
+        if stop is None or stop > self.length:
+            stop = self.length
+        if start >= stop:
+            return []
+        starts = self.starts
+        last = len(starts) - 1
+        i = bisect_right(starts, start) - 1
+        result = []
+        while i <= last and starts[i] < stop:
+            source, offset = self.runs[i]
+            first = max(starts[i], start)
+            if first > starts[i]:
+                offset += first - starts[i]
+            if i < last:
+                end = min(starts[i + 1], stop)
+            else:
+                end = stop
+            result.append((source, offset, end - first))
+            i += 1
+        return result
+
+    def _set_runs(self, runs):
+        self.starts = []
+        self.runs = []
+        self.length = 0
+        for run in runs:
+            self.add_run(*run)
+
+    def _splice(self, start, stop, other=()):
+        """Replace items `start:stop` by the items in `other`."""
+        if not isinstance(other, SourceMap):
+            other = SourceMap(other)
+        self._set_runs(self._get_runs(0, start) + other._get_runs()
+                       + self._get_runs(stop))
+
+    def _index(self, i):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError('SourceMap index out of range')
+        return i
+
+    def _slice_indices(self, i):
+        assert i.step in (None, 1), 'cannot handle slice with stride'
+        start, stop, step = i.indices(self.length)
+        return start, max(start, stop)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, types.SliceType):
+            start, stop = self._slice_indices(i)
+            result = SourceMap()
+            result._set_runs(self._get_runs(start, stop))
+            return result
+        i = self._index(i)
+        run = bisect_right(self.starts, i) - 1
+        source, offset = self.runs[run]
+        if i == self.starts[run]:
+            return source, offset
+        return source, offset + i - self.starts[run]
+
+    def __setitem__(self, i, items):
+        if isinstance(i, types.SliceType):
+            start, stop = self._slice_indices(i)
+            self._splice(start, stop, items)
+        else:
+            i = self._index(i)
+            self._splice(i, i + 1, [items])
+
+    def __delitem__(self, i):
+        if isinstance(i, types.SliceType):
+            start, stop = self._slice_indices(i)
+        else:
+            start = self._index(i)
+            stop = start + 1
+        self._splice(start, stop)
+
+    def __iter__(self):
+        for source, offset, length in self._get_runs():
+            if length == 1:
+                yield source, offset
+            else:
+                for offset in range(offset, offset + length):
+                    yield source, offset
+
+    def __eq__(self, other):
+        if isinstance(other, SourceMap):
+            return self._get_runs() == other._get_runs()
+        return list(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __add__(self, other):
+        result = SourceMap(self)
+        result.extend(other)
+        return result
+
+    def __radd__(self, other):
+        result = SourceMap(other)
+        result.extend(self)
+        return result
+
+    def __mul__(self, n):
+        result = SourceMap()
+        result._set_runs(self._get_runs() * n)
+        return result
+
+    __rmul__ = __mul__
+
+    def __imul__(self, n):
+        self._set_runs(self._get_runs() * n)
+        return self
+
+    def append(self, item):
+        self.add_run(item[0], item[1], 1)
+
+    def extend(self, items):
+        if isinstance(items, SourceMap):
+            for run in items._get_runs():
+                self.add_run(*run)
+        else:
+            for item in items:
+                self.append(item)
+
+    def insert(self, i, item):
+        i = min(max(i + self.length * (i < 0), 0), self.length)
+        self._splice(i, i, [item])
+
+    def pop(self, i=-1):
+        i = self._index(i)
+        item = self[i]
+        self._splice(i, i + 1)
+        return item
+
+    def reverse(self):
+        items = list(self)
+        items.reverse()
+        self._set_runs([(source, offset, 1) for (source, offset) in items])
+
+
 class ViewList:
 
     """
@@ -1092,10 +1346,10 @@ class ViewList:
         self.data = []
         """The actual list of data, flattened from various sources."""
 
-        self.items = []
-        """A list of (source, offset) pairs, same length as `self.data`: the
-        source of each line and the offset of each line from the beginning of
-        its source."""
+        self.items = SourceMap()
+        """A `SourceMap` of (source, offset) pairs, same length as
+        `self.data`: the source of each line and the offset of each line
+        from the beginning of its source."""
 
         self.parent = parent
         """The parent list."""
@@ -1108,10 +1362,12 @@ class ViewList:
             self.items = initlist.items[:]
         elif initlist is not None:
             self.data = list(initlist)
-            if items:
+            if isinstance(items, SourceMap):
                 self.items = items
+            elif items:
+                self.items = SourceMap(items)
             else:
-                self.items = [(source, i) for i in range(len(initlist))]
+                self.items.add_run(source, 0, len(self.data))
         assert len(self.data) == len(self.items), 'data mismatch'
 
     def __str__(self):
@@ -1296,7 +1552,7 @@ class ViewList:
         tmp = zip(self.data, self.items)
         tmp.sort(*args)
         self.data = [entry[0] for entry in tmp]
-        self.items = [entry[1] for entry in tmp]
+        self.items = SourceMap([entry[1] for entry in tmp])
         self.parent = None
 
     def info(self, i):
@@ -1518,7 +1774,11 @@ def string2lines(astring, tab_width=8, convert_whitespace=False,
     """
     if convert_whitespace:
         astring = whitespace.sub(' ', astring)
-    return [s.expandtabs(tab_width).rstrip() for s in astring.splitlines()]
+    lines = astring.splitlines()
+    # Convert in place: only one list of lines is kept in memory.
+    for i, line in enumerate(lines):
+        lines[i] = line.expandtabs(tab_width).rstrip()
+    return lines
 
 def _exception_data():
     """
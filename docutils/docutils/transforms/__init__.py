@@ -24,6 +24,9 @@ choose to perform on the parsed document.
 __docformat__ = 'reStructuredText'
 
 
+import time
+from heapq import heapify, heappop, heappush
+
 from docutils import languages, ApplicationError, TransformSpec
 
 
@@ -70,8 +73,9 @@ class Transformer(TransformSpec):
 
     def __init__(self, document):
         self.transforms = []
-        """List of transforms to apply.  Each item is a 3-tuple:
-        ``(priority string, transform class, pending node or None)``."""
+        """Heap of transforms to apply.  Each item is a 4-tuple:
+        ``(priority key, transform class, pending node or None, keyword
+        arguments)``; see `get_priority_key()`."""
 
         self.unknown_reference_resolvers = []
         """List of hook functions which assist in resolving references"""
@@ -80,10 +84,12 @@ class Transformer(TransformSpec):
         """The `nodes.document` object this Transformer is attached to."""
 
         self.applied = []
-        """Transforms already applied, in order."""
+        """Transforms already applied, in order.  Items are like those of
+        `self.transforms` (with priority keys, not priority strings)."""
 
         self.sorted = 0
-        """Boolean: is `self.tranforms` sorted?"""
+        """Boolean: is `self.transforms` a heap?  Set it to 0 after changing
+        `self.transforms` directly."""
 
         self.components = {}
         """Mapping of component type name to component object.  Set by
@@ -93,6 +99,10 @@ class Transformer(TransformSpec):
         """Internal serial number to keep track of the add order of
         transforms."""
 
+        self.timing_hooks = []
+        """List of functions called after each applied transform, with the
+        transform instance and the time it took (in seconds)."""
+
     def add_transform(self, transform_class, priority=None, **kwargs):
         """
         Store a single transform.  Use `priority` to override the default.
@@ -102,39 +112,55 @@ class Transformer(TransformSpec):
         """
         if priority is None:
             priority = transform_class.default_priority
-        priority_string = self.get_priority_string(priority)
-        self.transforms.append(
-            (priority_string, transform_class, None, kwargs))
-        self.sorted = 0
+        heappush(self.transforms, (self.get_priority_key(priority),
+                                   transform_class, None, kwargs))
 
     def add_transforms(self, transform_list):
         """Store multiple transforms, with default priorities."""
         for transform_class in transform_list:
-            priority_string = self.get_priority_string(
-                transform_class.default_priority)
-            self.transforms.append(
-                (priority_string, transform_class, None, {}))
-        self.sorted = 0
+            heappush(self.transforms,
+                     (self.get_priority_key(transform_class.default_priority),
+                      transform_class, None, {}))
 
     def add_pending(self, pending, priority=None):
         """Store a transform with an associated `pending` node."""
         transform_class = pending.transform
         if priority is None:
             priority = transform_class.default_priority
-        priority_string = self.get_priority_string(priority)
-        self.transforms.append(
-            (priority_string, transform_class, pending, {}))
-        self.sorted = 0
+        heappush(self.transforms, (self.get_priority_key(priority),
+                                   transform_class, pending, {}))
+
+    def get_priority_key(self, priority):
+        """
+        Return a tuple, `priority` combined with `self.serialno`.
+
+        This ensures FIFO order on transforms with identical priority.
+        """
+        self.serialno += 1
+        return (priority, self.serialno)
 
     def get_priority_string(self, priority):
         """
         Return a string, `priority` combined with `self.serialno`.
 
-        This ensures FIFO order on transforms with identical priority.
+        Obsolete: priority keys are tuples (see `get_priority_key()`).
         """
         self.serialno += 1
         return '%03d-%03d' % (priority, self.serialno)
 
+    def convert_priority_strings(self):
+        """
+        Replace priority strings (from `get_priority_string()`) in items
+        appended to `self.transforms` directly by priority keys.  (Strings
+        and tuples do not compare reasonably.)
+        """
+        for i, item in enumerate(self.transforms):
+            if isinstance(item[0], basestring):
+                priority, serialno = item[0].split('-')
+                self.transforms[i] = (((int(priority), int(serialno)),)
+                                      + tuple(item[1:]))
+                self.sorted = 0
+
     def populate_from_components(self, components):
         """
         Store each component's default transforms, with default priorities.
@@ -145,7 +171,6 @@ class Transformer(TransformSpec):
                 continue
             self.add_transforms(component.get_transforms())
             self.components[component.component_type] = component
-        self.sorted = 0
         # Set up all of the reference resolvers for this transformer. Each
         # component of this transformer is able to register its own helper
         # functions to help resolve references.
@@ -160,13 +185,22 @@ class Transformer(TransformSpec):
         """Apply all of the stored transforms, in priority order."""
         self.document.reporter.attach_observer(
             self.document.note_transform_message)
+        self.convert_priority_strings()
         while self.transforms:
             if not self.sorted:
-                # Unsorted initially, and whenever a transform is added.
-                self.transforms.sort()
-                self.transforms.reverse()
+                # `self.transforms` was changed directly.
+                self.convert_priority_strings()
+                heapify(self.transforms)
                 self.sorted = 1
-            priority, transform_class, pending, kwargs = self.transforms.pop()
+            priority, transform_class, pending, kwargs = heappop(
+                self.transforms)
             transform = transform_class(self.document, startnode=pending)
-            transform.apply(**kwargs)
+            if self.timing_hooks:
+                start = time.time()
+                transform.apply(**kwargs)
+                duration = time.time() - start
+                for hook in self.timing_hooks:
+                    hook(transform, duration)
+            else:
+                transform.apply(**kwargs)
             self.applied.append((priority, transform_class, pending, kwargs))
@@ -22,7 +22,7 @@ Transforms related to the front matter of a document or a section
 __docformat__ = 'reStructuredText'
 
 import re
-from docutils import nodes, utils
+from docutils import nodes, utils, languages
 from docutils.transforms import TransformError, Transform
 
 
@@ -398,7 +398,7 @@ class DocInfo(Transform):
     def extract_bibliographic(self, field_list):
         docinfo = nodes.docinfo()
         bibliofields = self.language.bibliographic_fields
-        labels = self.language.labels
+        labels = languages.get_labels(self.language)
         topics = {'dedication': None, 'abstract': None}
         for field in field_list:
             try:
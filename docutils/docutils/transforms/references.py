@@ -114,11 +114,12 @@ class AnonymousHyperlinks(Transform):
     def apply(self):
         anonymous_refs = []
         anonymous_targets = []
-        for node in self.document.traverse(nodes.reference):
-            if node.get('anonymous'):
+        for node in self.document.traverse((nodes.reference, nodes.target)):
+            if not node.get('anonymous'):
+                continue
+            if isinstance(node, nodes.reference):
                 anonymous_refs.append(node)
-        for node in self.document.traverse(nodes.target):
-            if node.get('anonymous'):
+            else:
                 anonymous_targets.append(node)
         if len(anonymous_refs) \
               != len(anonymous_targets):
@@ -350,19 +351,20 @@ class ExternalTargets(Transform):
     default_priority = 640
 
     def apply(self):
-        for target in self.document.traverse(nodes.target):
-            if target.hasattr('refuri'):
-                refuri = target['refuri']
-                for name in target['names']:
-                    reflist = self.document.refnames.get(name, [])
-                    if reflist:
-                        target.note_referenced_by(name=name)
-                    for ref in reflist:
-                        if ref.resolved:
-                            continue
-                        del ref['refname']
-                        ref['refuri'] = refuri
-                        ref.resolved = 1
+        # Look up the referenced names instead of traversing all targets:
+        for name, reflist in self.document.refnames.items():
+            target = self.document.get_target(name)
+            if not (isinstance(target, nodes.target)
+                    and target.hasattr('refuri')):
+                continue
+            target.note_referenced_by(name=name)
+            refuri = target['refuri']
+            for ref in reflist:
+                if ref.resolved:
+                    continue
+                del ref['refname']
+                ref['refuri'] = refuri
+                ref.resolved = 1
 
 
 class InternalTargets(Transform):
@@ -370,11 +372,14 @@ class InternalTargets(Transform):
     default_priority = 660
 
     def apply(self):
-        for target in self.document.traverse(nodes.target):
-            if not target.hasattr('refuri') and not target.hasattr('refid'):
-                self.resolve_reference_ids(target)
-
-    def resolve_reference_ids(self, target):
+        for name in self.document.refnames.keys():
+            target = self.document.get_target(name)
+            if (isinstance(target, nodes.target)
+                and not target.hasattr('refuri')
+                and not target.hasattr('refid')):
+                self.resolve_reference_ids(target, name)
+
+    def resolve_reference_ids(self, target, name=None):
         """
         Given::
 
@@ -390,8 +395,14 @@ class InternalTargets(Transform):
                 <reference refid="id1">
                     direct internal
             <target id="id1" name="direct internal">
+
+        Resolve only the references to `name`, if given.
         """
-        for name in target['names']:
+        if name is None:
+            names = target['names']
+        else:
+            names = [name]
+        for name in names:
             refid = self.document.nameids.get(name)
             reflist = self.document.refnames.get(name, [])
             if reflist:
@@ -838,11 +849,20 @@ class DanglingReferences(Transform):
         visitor = DanglingReferencesVisitor(
             self.document,
             self.document.transformer.unknown_reference_resolvers)
-        self.document.walk(visitor)
+        # Collect references and targets in a single pass:
+        targets = []
+        for node in self.document.traverse((nodes.reference,
+                                            nodes.footnote_reference,
+                                            nodes.citation_reference,
+                                            nodes.target)):
+            if isinstance(node, nodes.target):
+                targets.append(node)
+            else:
+                visitor.dispatch_visit(node)
         # *After* resolving all references, check for unreferenced
         # targets:
-        for target in self.document.traverse(nodes.target):
-            if not target.referenced:
+        for target in targets:
+            if not target.referenced and self.in_document(target):
                 if target.get('anonymous'):
                     # If we have unreferenced anonymous targets, there
                     # is already an error message about anonymous
@@ -862,6 +882,14 @@ class DanglingReferences(Transform):
                     % naming, base_node=target)
 
 
+    def in_document(self, node):
+        """Return True, if `node` was not removed with a dangling reference.
+        """
+        while node.parent is not None:
+            node = node.parent
+        return node is self.document
+
+
 class DanglingReferencesVisitor(nodes.SparseNodeVisitor):
     
     def __init__(self, document, unknown_reference_resolvers):
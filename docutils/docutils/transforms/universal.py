@@ -135,9 +135,17 @@ class FilterMessages(Transform):
     default_priority = 870
 
     def apply(self):
-        for node in self.document.traverse(nodes.system_message):
-            if node['level'] < self.document.reporter.report_level:
-                node.parent.remove(node)
+        self.filter(self.document, self.document.reporter.report_level)
+
+    def filter(self, node, threshold):
+        # Do not look into removed messages (their content is generated
+        # on first access, see `nodes.system_message`).
+        for child in node.children[:]:
+            if (isinstance(child, nodes.system_message)
+                and child['level'] < threshold):
+                node.remove(child)
+            else:
+                self.filter(child, threshold)
 
 
 class TestMessages(Transform):
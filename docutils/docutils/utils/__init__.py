@@ -123,6 +123,10 @@ class Reporter:
         self.max_level = -1
         """The highest level system message generated so far."""
 
+        self.diagnostics = None
+        """A `docutils.utils.diagnostics.DiagnosticsLog` receiving the
+        reported system messages (or None)."""
+
     def set_conditions(self, category, report_level, halt_level,
                        stream=None, debug=False):
         warnings.warn('docutils.utils.Reporter.set_conditions deprecated; '
@@ -182,13 +186,22 @@ class Reporter:
         # assert attributes['source'] is not None, (message, kwargs)
         attributes.setdefault('source', self.source)
 
+        reported = (level >= self.report_level
+                    or self.debug_flag and level == self.DEBUG_LEVEL
+                    or level >= self.halt_level)
+        # The paragraph of unreported messages is only generated if the
+        # message content is used (most are filtered out unseen):
         msg = nodes.system_message(message, level=level,
                                    type=self.levels[level],
+                                   defer=not reported,
                                    *children, **attributes)
-        if self.stream and (level >= self.report_level
-                            or self.debug_flag and level == self.DEBUG_LEVEL
-                            or level >= self.halt_level):
+        if self.stream and reported:
             self.stream.write(msg.astext() + '\n')
+        if self.diagnostics is not None and reported:
+            self.diagnostics.system_message(level, self.levels[level],
+                                            unicode(message),
+                                            attributes.get('source'),
+                                            attributes.get('line'))
         if level >= self.halt_level:
             raise SystemMessage(msg, level)
         if level > self.DEBUG_LEVEL or self.debug_flag:
@@ -414,6 +427,9 @@ def new_reporter(source_path, settings):
         stream=settings.warning_stream, debug=settings.debug,
         encoding=settings.error_encoding,
         error_handler=settings.error_encoding_error_handler)
+    diagnostics = getattr(settings, 'diagnostics_log', None)
+    if diagnostics and not isinstance(diagnostics, basestring):
+        reporter.diagnostics = diagnostics
     return reporter
 
 def new_document(source_path, settings=None):
@@ -518,6 +534,29 @@ def get_stylesheet_list(settings):
     return [find_file_in_dirs(path, settings.stylesheet_dirs)
             for path in stylesheets]
 
+_PIL = []
+
+def get_PIL():
+    """
+    Return the Python Imaging Library (wrapped to provide ``PIL.Image``) or
+    None, if it is not installed.
+
+    PIL is imported on the first call only: it is slow to import and only
+    needed for a few image options.
+    """
+    if not _PIL:
+        try:
+            import PIL.Image
+        except ImportError:
+            try:  # sometimes PIL modules are put in PYTHONPATH's root
+                import Image
+                class PIL(object): pass  # dummy wrapper
+                PIL.Image = Image
+            except ImportError:
+                PIL = None
+        _PIL.append(PIL)
+    return _PIL[0]
+
 def find_file_in_dirs(path, dirs):
     """
     Search for `path` in the list of directories `dirs`.
@@ -722,6 +761,9 @@ class DependencyList(object):
         else:
             self.file = None
 
+    recorders = ()
+    """Lists receiving every added filename (see `start_recording()`)."""
+
     def add(self, *filenames):
         """
         If the dependency `filename` has not already been added,
@@ -729,11 +771,26 @@ class DependencyList(object):
         is not None.
         """
         for filename in filenames:
+            for recorded in self.recorders:
+                recorded.append(filename)
             if not filename in self.list:
                 self.list.append(filename)
                 if self.file is not None:
                     self.file.write(filename+'\n')
 
+    def start_recording(self):
+        """
+        Return a list that receives all filenames added from now on
+        (including already known ones) until `stop_recording()`.
+        """
+        recorded = []
+        self.recorders = self.recorders + (recorded,)
+        return recorded
+
+    def stop_recording(self, recorded):
+        self.recorders = tuple([r for r in self.recorders
+                                if r is not recorded])
+
     def close(self):
         """
         Close the output file.
@@ -7,14 +7,28 @@
 # :Date: $Date$
 # :Copyright: This module has been placed in the public domain.
 
+import os
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 from docutils import ApplicationError
+
+# Pygments takes long to load and is not needed by most documents:
+# check whether it is installed here but import it on first use only
+# (see `import_pygments()`).
 try:
-    import pygments
-    from pygments.lexers import get_lexer_by_name
-    from pygments.formatters.html import _get_ttype_class
-    with_pygments = True
-except (ImportError, SyntaxError): # pygments 2.0.1 fails with Py 3.1 and 3.2
-    with_pygments = False
+    import pkgutil
+    with_pygments = pkgutil.find_loader('pygments') is not None
+except AttributeError: # Python 2.4
+    import imp
+    try:
+        imp.find_module('pygments')
+        with_pygments = True
+    except ImportError:
+        with_pygments = False
+pygments = None
 
 # Filter the following token types from the list of class arguments:
 unstyled_tokens = ['token', # Token (base token type)
@@ -25,6 +39,174 @@ unstyled_tokens = ['token', # Token (base token type)
 class LexerError(ApplicationError): 
     pass
 
+
+def import_pygments():
+    """Import the required Pygments modules and return `pygments`.
+
+    Raise `LexerError` if Pygments is not available.
+    """
+    global pygments, with_pygments
+    if pygments is None:
+        if not with_pygments:
+            raise LexerError('Cannot analyze code. '
+                                    'Pygments package not found.')
+        try:
+            import pygments
+            import pygments.lexers
+            import pygments.token
+            import pygments.util
+            import pygments.formatters.html
+        except (ImportError, SyntaxError): # pygments 2.0.1 fails with Py 3.1 and 3.2
+            pygments = None
+            with_pygments = False
+            raise LexerError('Cannot analyze code. '
+                                    'Pygments package not found.')
+    return pygments
+
+
+class TokenCache(object):
+    """Per-process cache of Pygments lexers and token streams.
+
+    Lexer instances are created once per language (and set of lexer
+    options).  Token streams are stored under a key built from the
+    language, the token name set and the code itself, so identical
+    snippets (install commands, boilerplate) are only lexed once.
+
+    The token streams can be stored to and restored from a file with
+    `save()` and `load()` for incremental builds (see the
+    "syntax_highlight_cache" configuration setting).
+    """
+
+    version = 1
+    """Version of the on-disk format.  Files with a different version
+    are ignored."""
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        """Maximal number of cached token streams (per kind)."""
+        self.lexers = {}
+        """Lexer instances: ``(language, options) -> lexer``."""
+        self.classified = {}
+        """Classified tokens as yielded by `Lexer`:
+        ``(language, tokennames, code) -> [(classes, value), ...]``."""
+        self.raw = {}
+        """Pygments token streams:
+        ``(language, options, code) -> [(tokentype, value), ...]``."""
+        self.loaded = {}
+        """Paths of cache files already merged into this cache."""
+        self.modified = False
+
+    def get_lexer(self, language, **options):
+        """Return a (shared) Pygments lexer for `language`.
+
+        Raise `pygments.util.ClassNotFound` for unknown languages.
+        """
+        key = (language, tuple(sorted(options.items())))
+        try:
+            return self.lexers[key]
+        except KeyError:
+            import_pygments()
+            lexer = pygments.lexers.get_lexer_by_name(language, **options)
+            self.lexers[key] = lexer
+            return lexer
+
+    def lex(self, code, language, **options):
+        """Return the list of Pygments ``(tokentype, value)`` tuples
+        for `code`.
+
+        Usable as argument to `pygments.format()` in place of
+        ``pygments.lex(code, lexer)``.
+        """
+        key = (language, tuple(sorted(options.items())), code)
+        try:
+            return self.raw[key]
+        except KeyError:
+            lexer = self.get_lexer(language, **options)
+            tokens = list(pygments.lex(code, lexer))
+            self._store(self.raw, key, tokens)
+            return tokens
+
+    def get_classified(self, key):
+        """Return the cached classified tokens for `key` or None."""
+        return self.classified.get(key)
+
+    def set_classified(self, key, tokens):
+        self._store(self.classified, key, tokens)
+
+    def _store(self, cache, key, tokens):
+        if len(cache) >= self.maxsize:
+            cache.clear()
+        cache[key] = tokens
+        self.modified = True
+
+    def clear(self):
+        self.lexers.clear()
+        self.classified.clear()
+        self.raw.clear()
+        self.loaded.clear()
+        self.modified = False
+
+    def load(self, path):
+        """Merge the token streams stored in file `path` into the cache.
+
+        Every file is read only once per process.  Missing, unreadable or
+        outdated cache files are silently ignored.
+        """
+        if not with_pygments or path in self.loaded:
+            return
+        self.loaded[path] = True
+        try:
+            import_pygments()
+            cachefile = open(path, 'rb')
+            try:
+                data = pickle.load(cachefile)
+            finally:
+                cachefile.close()
+            if data.get('version') != self.version:
+                return
+            classified = data['classified']
+            raw = data['raw']
+        except Exception:
+            return
+        for key, tokens in classified.items():
+            self.classified.setdefault(key, tokens)
+        for key, tokens in raw.items():
+            if key not in self.raw:
+                self.raw[key] = [(pygments.token.string_to_tokentype(ttype),
+                                  value)
+                                 for (ttype, value) in tokens]
+
+    def save(self, path):
+        """Write the cached token streams to file `path`.
+
+        Do nothing if the cache was not modified since the last save.
+        """
+        if not self.modified:
+            return
+        raw = {}
+        for key, tokens in self.raw.items():
+            raw[key] = [(str(ttype), value) for (ttype, value) in tokens]
+        data = {'version': self.version,
+                'classified': self.classified,
+                'raw': raw}
+        # write to a temporary file first to avoid corrupt cache files
+        # if several processes share the cache
+        tmppath = '%s.%d.tmp' % (path, os.getpid())
+        cachefile = open(tmppath, 'wb')
+        try:
+            pickle.dump(data, cachefile, 2)
+        finally:
+            cachefile.close()
+        if os.path.exists(path) and os.name == 'nt':
+            os.remove(path)
+        os.rename(tmppath, path)
+        self.loaded[path] = True
+        self.modified = False
+
+token_cache = TokenCache()
+"""Process-wide `TokenCache` instance shared by the "code" directive and
+role and the ODF/ODT writer."""
+
 class Lexer(object):
     """Parse `code` lines and yield "classified" tokens.
 
@@ -56,11 +238,9 @@ class Lexer(object):
         # get lexical analyzer for `language`:
         if language in ('', 'text') or tokennames == 'none':
             return
-        if not with_pygments:
-            raise LexerError('Cannot analyze code. '
-                                    'Pygments package not found.')
+        import_pygments()
         try:
-            self.lexer = get_lexer_by_name(self.language)
+            self.lexer = token_cache.get_lexer(self.language)
         except pygments.util.ClassNotFound:
             raise LexerError('Cannot analyze code. '
                 'No Pygments lexer found for "%s".' % language)
@@ -93,12 +273,25 @@ class Lexer(object):
         if self.lexer is None:
             yield ([], self.code)
             return
+        key = (self.language, self.tokennames, self.code)
+        tokens = token_cache.get_classified(key)
+        if tokens is None:
+            tokens = list(self.classify())
+            token_cache.set_classified(key, tokens)
+        for classes, value in tokens:
+            # return a copy: callers may modify the list of classes
+            yield (classes[:], value)
+
+    def classify(self):
+        """Lex self.code and yield "classified" tokens (uncached).
+        """
         tokens = pygments.lex(self.code, self.lexer)
         for tokentype, value in self.merge(tokens):
             if self.tokennames == 'long': # long CSS class args
                 classes = str(tokentype).lower().split('.')
             else: # short CSS class args
-                classes = [_get_ttype_class(tokentype)]
+                classes = [pygments.formatters.html._get_ttype_class(
+                                                                tokentype)]
             classes = [cls for cls in classes if cls not in unstyled_tokens]
             yield (classes, value)
 
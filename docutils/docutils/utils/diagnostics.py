@@ -0,0 +1,181 @@
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Machine-readable diagnostics for bulk processing.
+
+A `DiagnosticsLog` writes one JSON object per line ("JSON lines") for
+
+* every reported system message (type "DEBUG" ... "SEVERE"),
+* the duration of each processing phase of a document (type "PHASE"),
+* each processed document (type "DOCUMENT") and
+* on request, a summary of all documents processed (type "RUN").
+
+Records contain the keys "document", "phase", "type" and, depending on
+the type, "source", "line", "level", "message" and "duration".  Example::
+
+    {"document": "a.txt", "phase": "read", "type": "WARNING", "level": 2,
+     "source": "a.txt", "line": 7, "message": "Title underline too short."}
+    {"document": "a.txt", "phase": "read", "type": "PHASE",
+     "duration": 0.021}
+
+Use the "diagnostics_log" setting (``--diagnostics-log``) to activate it.
+The setting value may be a file name (records are appended) or a
+`DiagnosticsLog` instance shared by several publisher runs, which then
+also collects totals (see `DiagnosticsLog.summary()`).
+"""
+
+import time
+
+try:
+    import json
+except ImportError:                     # Python < 2.6
+    json = None
+
+__docformat__ = 'reStructuredText'
+
+
+def json_string(value):
+    """Return `value` (None, a number or a string) as JSON string."""
+    if value is None:
+        return 'null'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, (int, long)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    if isinstance(value, dict):
+        items = value.items()
+        items.sort()
+        return '{%s}' % ', '.join(['%s: %s' % (json_string(key),
+                                               json_string(val))
+                                   for (key, val) in items])
+    if isinstance(value, (list, tuple)):
+        return '[%s]' % ', '.join([json_string(val) for val in value])
+    if not isinstance(value, unicode):
+        value = str(value).decode('utf-8', 'replace')
+    if json is not None:
+        return json.dumps(value)
+    chars = []
+    for char in value:
+        if char in u'"\\':
+            chars.append(u'\\' + char)
+        elif char < u' ' or char > u'~':
+            chars.append(u'\\u%04x' % ord(char))
+        else:
+            chars.append(char)
+    return str(u'"%s"' % u''.join(chars))
+
+
+class DiagnosticsLog:
+
+    """
+    Sink for structured diagnostics, written as JSON lines.
+    """
+
+    record_keys = ('document', 'phase', 'type', 'level', 'source', 'line',
+                   'message', 'duration')
+    """Order of the keys in the output records (other keys follow)."""
+
+    def __init__(self, destination):
+        """
+        :Parameters:
+            - `destination`: a file name (opened for appending) or a
+              file-like object with a ``write`` method.
+        """
+        if hasattr(destination, 'write'):
+            self.stream = destination
+            self.close_stream = False
+        else:
+            self.stream = open(destination, 'a')
+            self.close_stream = True
+
+        self.document = None
+        """The source path of the document currently being processed."""
+
+        self.phase = None
+        """The current processing phase ("read", "transform", "write")."""
+
+        self.phase_start = None
+
+        self.document_start = None
+
+        self.counts = {}
+        """Number of system messages per type (all documents)."""
+
+        self.durations = []
+        """List of (duration, document) pairs of the processed documents."""
+
+    def write(self, record):
+        """Write `record` (a dictionary) as one line of JSON."""
+        keys = [key for key in self.record_keys if key in record]
+        other = [key for key in record if key not in self.record_keys]
+        other.sort()
+        fields = ['%s: %s' % (json_string(key), json_string(record[key]))
+                  for key in keys + other]
+        self.stream.write('{%s}\n' % ', '.join(fields))
+
+    def system_message(self, level, type, message, source=None, line=None):
+        """Record a reported system message."""
+        self.counts[type] = self.counts.get(type, 0) + 1
+        self.write({'document': self.document, 'phase': self.phase,
+                    'type': type, 'level': level, 'source': source,
+                    'line': line, 'message': message})
+
+    def start_document(self, document):
+        self.document = document
+        self.document_start = time.time()
+        self.phase = None
+
+    def start_phase(self, phase):
+        """End the current phase (if any) and start `phase`."""
+        now = time.time()
+        if self.phase is not None:
+            self.write({'document': self.document, 'phase': self.phase,
+                        'type': 'PHASE',
+                        'duration': now - self.phase_start})
+        self.phase = phase
+        self.phase_start = now
+
+    def end_document(self, max_level=None):
+        """Record the end of the current document."""
+        self.start_phase(None)
+        duration = time.time() - self.document_start
+        self.durations.append((duration, self.document))
+        self.write({'document': self.document, 'phase': None,
+                    'type': 'DOCUMENT', 'level': max_level,
+                    'duration': duration})
+        self.document = None
+
+    def summary(self, slowest=10):
+        """
+        Return a dictionary with totals for all processed documents:
+        the number of documents, the message counts per type, the total
+        duration and the `slowest` documents.
+        """
+        durations = self.durations[:]
+        durations.sort()
+        durations.reverse()
+        total = 0.0
+        for duration, document in durations:
+            total += duration
+        return {'documents': len(durations),
+                'counts': self.counts.copy(),
+                'duration': total,
+                'slowest': [document for (duration, document)
+                            in durations[:slowest]]}
+
+    def write_summary(self):
+        """Write a "RUN" record with the `summary()`."""
+        record = self.summary()
+        record['type'] = 'RUN'
+        self.write(record)
+
+    def close(self):
+        if self.close_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
@@ -8,11 +8,12 @@ This package contains Docutils Writer modules.
 
 __docformat__ = 'reStructuredText'
 
+import copy
 import os.path
 import sys
 
 import docutils
-from docutils import languages, Component
+from docutils import languages, nodes, Component
 from docutils.transforms import universal
 if sys.version_info < (2,5):
     from docutils._compat import __import__
@@ -119,6 +120,141 @@ class UnfilteredWriter(Writer):
         return Component.get_transforms(self)
 
 
+class SectionCache(object):
+
+    """
+    Process-wide cache of the translated output of top-level sections.
+
+    Re-rendering a large document after a local edit only translates the
+    changed sections.  Translators opt in by calling `visit()` at the
+    start of `visit_section()` (skipping the section if it returns True)
+    and `depart()` at the end of `depart_section()` for sections that are
+    children of the document (see the "section_cache" setting of the
+    "html_plain" and "latex2e" writers).  They declare
+
+    - `section_cache_output`: names of the attributes collecting output
+      (lists are extended and dictionaries updated with the cached output
+      of a section), and
+    - `section_cache_state`: names of the attributes a section's output
+      depends on or changes (their values are part of the key and are
+      restored from the cache).
+
+    Names may be dotted paths to attributes of helper objects (e.g.
+    "babel.otherlanguages").  Everything a section's translation changes
+    and the translator reads later (e.g. to write the preamble) must be
+    listed.
+
+    The key consists of the translator class, the settings, the section
+    subtree (including ids and footnote labels), the targets of the
+    reference names used in the section and the translator state.
+
+    Warnings reported while translating a section are not repeated for
+    cached output.  External files (e.g. images) are not checked.
+    """
+
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        """Maximal number of cached sections."""
+        self.fragments = {}
+        """Mapping of cache keys to (output, state) tuples."""
+        self.recording = {}
+        """Mapping of the sections being translated to (key, output
+        positions) tuples."""
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, translator, node):
+        """Return the cache key for translating section `node`."""
+        document = node.document
+        refnames = {}
+        for child in node.traverse(nodes.Element):
+            if 'refname' in child:
+                refnames[child['refname']] = document.nameids.get(
+                    child['refname'])
+        settings = [(name, value)
+                    for (name, value) in translator.settings.__dict__.items()
+                    if isinstance(value, (basestring, int, long, float,
+                                          list, tuple, type(None)))]
+        settings.sort()
+        state = [_get_attribute(translator, name)
+                 for name in translator.section_cache_state]
+        return (translator.__class__, repr(settings), node.structural_hash(),
+                repr(sorted(refnames.items())), repr(state))
+
+    def visit(self, translator, node):
+        """
+        Add the cached output of section `node` to the `translator` and
+        return True, or start recording it and return False.
+        """
+        key = self.key(translator, node)
+        try:
+            output, state = self.fragments[key]
+        except KeyError:
+            self.misses += 1
+            positions = []
+            for name in translator.section_cache_output:
+                collector = _get_attribute(translator, name)
+                if isinstance(collector, dict):
+                    positions.append(collector.copy())
+                else:
+                    positions.append(len(collector))
+            # Key on the node (not its id, which may be reused after an
+            # exception left the entry behind):
+            self.recording[node] = (key, positions)
+            return False
+        self.hits += 1
+        for name, value in zip(translator.section_cache_output, output):
+            collector = _get_attribute(translator, name)
+            if isinstance(collector, dict):
+                collector.update(value)
+            else:
+                collector.extend(value)
+        for name, value in zip(translator.section_cache_state, state):
+            _set_attribute(translator, name, copy.deepcopy(value))
+        return True
+
+    def depart(self, translator, node):
+        """Store the output of section `node` recorded since `visit()`."""
+        try:
+            key, positions = self.recording.pop(node)
+        except KeyError:
+            return
+        output = []
+        for name, start in zip(translator.section_cache_output, positions):
+            collector = _get_attribute(translator, name)
+            if isinstance(collector, dict):
+                output.append(dict([(k, v) for (k, v) in collector.items()
+                                    if k not in start or start[k] != v]))
+            else:
+                output.append(collector[start:])
+        state = [copy.deepcopy(_get_attribute(translator, name))
+                 for name in translator.section_cache_state]
+        if len(self.fragments) >= self.maxsize:
+            self.fragments.clear()
+        self.fragments[key] = (output, state)
+
+    def clear(self):
+        self.fragments.clear()
+        self.recording.clear()
+        self.hits = self.misses = 0
+
+section_cache = SectionCache()
+"""The `SectionCache` shared by the translators of all writers."""
+
+def _get_attribute(obj, name):
+    """Return the attribute `name` (possibly a dotted path) of `obj`."""
+    for part in name.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+def _set_attribute(obj, name, value):
+    """Set the attribute `name` (possibly a dotted path) of `obj`."""
+    if '.' in name:
+        path, name = name.rsplit('.', 1)
+        obj = _get_attribute(obj, path)
+    setattr(obj, name, value)
+
+
 _writer_aliases = {
       'html': 'html4css1',  # may change to html_plain some day
       'html4': 'html4css1',
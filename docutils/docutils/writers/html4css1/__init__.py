@@ -20,22 +20,11 @@ import os
 import os.path
 import time
 import re
-import urllib
-try: # check for the Python Imaging Library
-    import PIL.Image
-except ImportError:
-    try:  # sometimes PIL modules are put in PYTHONPATH's root
-        import Image
-        class PIL(object): pass  # dummy wrapper
-        PIL.Image = Image
-    except ImportError:
-        PIL = None
 import docutils
 from docutils import frontend, nodes, utils, writers, languages, io
 from docutils.utils.error_reporting import SafeString
 from docutils.transforms import writer_aux
-from docutils.utils.math import unichar2tex, pick_math_environment, math2html
-from docutils.utils.math.latex2mathml import parse_latex_math
+from docutils.utils.math import pick_math_environment
 
 class Writer(writers.Writer):
 
@@ -1048,8 +1037,15 @@ class HTMLTranslator(nodes.NodeVisitor):
         if 'height' in node:
             atts['height'] = node['height']
         if 'scale' in node:
-            if (PIL and not ('width' in node and 'height' in node)
+            if (not ('width' in node and 'height' in node)
                 and self.settings.file_insertion_enabled):
+                PIL = utils.get_PIL()
+            else:
+                PIL = None
+            if PIL:
+                # Do not import urllib at the top of the module: it takes
+                # some time to load and is only needed here.
+                import urllib
                 imagepath = urllib.url2pathname(uri)
                 try:
                     img = PIL.Image.open(
@@ -1187,6 +1183,9 @@ class HTMLTranslator(nodes.NodeVisitor):
     def visit_math(self, node, math_env=''):
         # If the method is called from visit_math_block(), math_env != ''.
 
+        # The math conversion modules are large; import them on first use.
+        from docutils.utils.math import unichar2tex, math2html, latex2mathml
+
         # As there is no native HTML math support, we provide alternatives:
         # LaTeX and MathJax math_output modes simply wrap the content,
         # HTML and MathML math_output modes also convert the math_code.
@@ -1238,7 +1237,8 @@ class HTMLTranslator(nodes.NodeVisitor):
             self.doctype = self.doctype_mathml
             self.content_type = self.content_type_mathml
             try:
-                mathml_tree = parse_latex_math(math_code, inline=not(math_env))
+                mathml_tree = latex2mathml.parse_latex_math(math_code,
+                                                    inline=not(math_env))
                 math_code = ''.join(mathml_tree.xml())
             except SyntaxError, err:
                 err_node = self.document.reporter.error(err, base_node=node)
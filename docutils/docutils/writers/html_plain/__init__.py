@@ -31,22 +31,11 @@ import sys
 import os
 import os.path
 import re
-import urllib
-try: # check for the Python Imaging Library
-    import PIL.Image
-except ImportError:
-    try:  # sometimes PIL modules are put in PYTHONPATH's root
-        import Image
-        class PIL(object): pass  # dummy wrapper
-        PIL.Image = Image
-    except ImportError:
-        PIL = None
 import docutils
 from docutils import frontend, nodes, utils, writers, languages, io
 from docutils.utils.error_reporting import SafeString
 from docutils.transforms import writer_aux
-from docutils.utils.math import (unichar2tex, pick_math_environment,
-                                 math2html, latex2mathml, tex2mathml_extern)
+from docutils.utils.math import pick_math_environment
 
 class Writer(writers.Writer):
 
@@ -149,7 +138,15 @@ class Writer(writers.Writer):
          ('Obfuscate email addresses to confuse harvesters while still '
           'keeping email links usable with standards-compliant browsers.',
           ['--cloak-email-addresses'],
-          {'action': 'store_true', 'validator': frontend.validate_boolean}),))
+          {'action': 'store_true', 'validator': frontend.validate_boolean}),
+         ('Cache the output of top-level sections and reuse it for '
+          'unchanged sections when a document is written again in the '
+          'same process.  Default: disabled.',
+          ['--section-cache'],
+          {'action': 'store_true', 'validator': frontend.validate_boolean}),
+         ('Do not cache the output of sections (default).',
+          ['--no-section-cache'],
+          {'dest': 'section_cache', 'action': 'store_false'}),))
 
     settings_defaults = {'output_encoding_error_handler': 'xmlcharrefreplace'}
 
@@ -235,6 +232,12 @@ class HTMLTranslator(nodes.NodeVisitor):
     sollbruchstelle = re.compile(r'.+\W\W.+|[-?].+', re.U) # wrap point inside word
     lang_attribute = 'lang' # name changes to 'xml:lang' in XHTML 1.1
 
+    # Output collectors and state for the section cache
+    # (see `writers.SectionCache`):
+    section_cache_output = ('body', 'head', 'meta')
+    section_cache_state = ('section_level', 'math_output', 'math_header',
+                           'in_footnote_list', 'topic_classes', 'in_sidebar')
+
     def __init__(self, document):
         nodes.NodeVisitor.__init__(self, document)
         self.settings = settings = document.settings
@@ -977,8 +980,15 @@ class HTMLTranslator(nodes.NodeVisitor):
         if 'height' in node:
             atts['height'] = node['height']
         if 'scale' in node:
-            if (PIL and not ('width' in node and 'height' in node)
+            if (not ('width' in node and 'height' in node)
                 and self.settings.file_insertion_enabled):
+                PIL = utils.get_PIL()
+            else:
+                PIL = None
+            if PIL:
+                # Do not import urllib at the top of the module: it takes
+                # some time to load and is only needed here.
+                import urllib
                 imagepath = urllib.url2pathname(uri)
                 try:
                     img = PIL.Image.open(
@@ -1148,6 +1158,10 @@ class HTMLTranslator(nodes.NodeVisitor):
     def visit_math(self, node, math_env=''):
         # If the method is called from visit_math_block(), math_env != ''.
 
+        # The math conversion modules are large; import them on first use.
+        from docutils.utils.math import (unichar2tex, math2html,
+                                         latex2mathml, tex2mathml_extern)
+
         if self.math_output not in self.math_tags:
             self.document.reporter.error(
                 'math-output format "%s" not supported '
@@ -1406,6 +1420,10 @@ class HTMLTranslator(nodes.NodeVisitor):
 
     # TODO: use the new HTML 5 element <section>?
     def visit_section(self, node):
+        if (getattr(self.settings, 'section_cache', False)
+            and isinstance(node.parent, nodes.document)
+            and writers.section_cache.visit(self, node)):
+            raise nodes.SkipNode
         self.section_level += 1
         self.body.append(
             self.starttag(node, 'div', CLASS='section'))
@@ -1413,6 +1431,9 @@ class HTMLTranslator(nodes.NodeVisitor):
     def depart_section(self, node):
         self.section_level -= 1
         self.body.append('</div>\n')
+        if (getattr(self.settings, 'section_cache', False)
+            and isinstance(node.parent, nodes.document)):
+            writers.section_cache.depart(self, node)
 
     # TODO: use the new HTML5 element <aside>? (Also for footnote text)
     def visit_sidebar(self, node):
@@ -205,6 +205,14 @@ class Writer(writers.Writer):
           '"--use-bibtex=mystyle,mydb1,mydb2".',
           ['--use-bibtex'],
           {'default': None, }),
+         ('Cache the output of top-level sections and reuse it for '
+          'unchanged sections when a document is written again in the '
+          'same process.  Default: disabled.',
+          ['--section-cache'],
+          {'action': 'store_true', 'validator': frontend.validate_boolean}),
+         ('Do not cache the output of sections (default).',
+          ['--no-section-cache'],
+          {'dest': 'section_cache', 'action': 'store_false'}),
           ),)
 
     settings_defaults = {'sectnum_depth': 0 # updated by SectNum transform
@@ -1129,6 +1137,14 @@ class LaTeXTranslator(nodes.NodeVisitor):
     literal = False                    # literal text (block or inline)
     alltt = False                      # inside `alltt` environment
 
+    # Output collectors and state for the section cache
+    # (see `writers.SectionCache`):
+    section_cache_output = ('body', 'requirements', 'fallbacks', 'pdfsetup',
+                            '_bibitems', 'babel.otherlanguages')
+    section_cache_state = ('section_level', '_section_number',
+                           '_enumeration_counters', 'has_latex_toc',
+                           'is_toc_list')
+
     def __init__(self, document, babel_class=Babel):
         nodes.NodeVisitor.__init__(self, document)
         # Reporter
@@ -2668,6 +2684,11 @@ class LaTeXTranslator(nodes.NodeVisitor):
         self.depart_docinfo_item(node)
 
     def visit_section(self, node):
+        if (getattr(self.settings, 'section_cache', False)
+            and isinstance(node.parent, nodes.document)
+            and self.out is self.body
+            and writers.section_cache.visit(self, node)):
+            raise nodes.SkipNode
         self.section_level += 1
         # Initialize counter for potential subsections:
         self._section_number.append(0)
@@ -2678,6 +2699,9 @@ class LaTeXTranslator(nodes.NodeVisitor):
         # Remove counter for potential subsections:
         self._section_number.pop()
         self.section_level -= 1
+        if (getattr(self.settings, 'section_cache', False)
+            and isinstance(node.parent, nodes.document)):
+            writers.section_cache.depart(self, node)
 
     def visit_sidebar(self, node):
         self.requirements['color'] = PreambleCmds.color
@@ -17,12 +17,10 @@ import os
 import os.path
 import tempfile
 import zipfile
-from xml.dom import minidom
 import time
 import re
 import StringIO
 import copy
-import urllib2
 import docutils
 from docutils import frontend, nodes, utils, writers, languages
 from docutils.readers import standalone
@@ -53,24 +51,20 @@ except ImportError, e:
 
 #
 # Import pygments and odtwriter pygments formatters if possible.
-try:
-    import pygments
-    import pygments.lexers
-    from pygmentsformatter import OdtPygmentsProgFormatter, \
-        OdtPygmentsLaTeXFormatter
-except (ImportError, SyntaxError), exp:
-    pygments = None
-
-# check for the Python Imaging Library
-try:
-    import PIL.Image
-except ImportError:
-    try:  # sometimes PIL modules are put in PYTHONPATH's root
-        import Image
-        class PIL(object): pass  # dummy wrapper
-        PIL.Image = Image
-    except ImportError:
-        PIL = None
+# This is deferred until the first literal block is highlighted, as
+# loading Pygments takes long.
+_pygments = []
+
+def import_pygments():
+    """Return the `pygments` module or None, if it is not available."""
+    if not _pygments:
+        try:
+            import pygments
+            import pygments.lexers
+        except (ImportError, SyntaxError):
+            pygments = None
+        _pygments.append(pygments)
+    return _pygments[0]
 
 ## import warnings
 ## warnings.warn('importing IPShellEmbed', UserWarning)
@@ -547,9 +541,18 @@ class Writer(writers.Writer):
 
     def translate(self):
         self.settings = self.document.settings
+        cache_path = getattr(self.settings, 'syntax_highlight_cache', None)
+        if (cache_path and self.settings.add_syntax_highlighting
+            and import_pygments()):
+            from docutils.utils.code_analyzer import token_cache
+            token_cache.load(cache_path)
+        else:
+            cache_path = None
         self.visitor = self.translator_class(self.document)
         self.visitor.retrieve_styles(self.EXTENSION)
         self.document.walkabout(self.visitor)
+        if cache_path:
+            token_cache.save(cache_path)
         self.visitor.add_doc_title()
         self.assemble_my_parts()
         self.output = self.parts['whole']
@@ -668,6 +671,7 @@ class Writer(writers.Writer):
             'manifest:full-path': 'meta.xml',
             }, nsdict=MANNSD)
         s1 = ToString(doc)
+        from xml.dom import minidom
         doc = minidom.parseString(s1)
         s1 = doc.toprettyxml('  ')
         return s1
@@ -2078,6 +2082,9 @@ class ODFTranslator(nodes.GenericNodeVisitor):
             filename = os.path.split(source)[1]
             destination = 'Pictures/1%08x%s' % (self.image_count, filename, )
             if source.startswith('http:'):
+                # Do not import urllib2 at the top of the module: it
+                # takes some time to load and is rarely needed.
+                import urllib2
                 try:
                     imgfile = urllib2.urlopen(source)
                     content = imgfile.read()
@@ -2157,6 +2164,7 @@ class ODFTranslator(nodes.GenericNodeVisitor):
         height = self.get_image_width_height(node, 'height')
 
         dpi = (72, 72)
+        PIL = utils.get_PIL()
         if PIL is not None and source in self.image_dict:
             filename, destination = self.image_dict[source]
             imageobj = PIL.Image.open(filename, 'r')
@@ -2434,7 +2442,12 @@ class ODFTranslator(nodes.GenericNodeVisitor):
         return count
 
     def _add_syntax_highlighting(self, insource, language):
-        lexer = pygments.lexers.get_lexer_by_name(language, stripall=True)
+        pygments = import_pygments()
+        from pygmentsformatter import OdtPygmentsProgFormatter, \
+            OdtPygmentsLaTeXFormatter
+        from docutils.utils.code_analyzer import token_cache
+        # Use the shared token cache: repeated snippets are lexed only once.
+        tokens = token_cache.lex(insource, language, stripall=True)
         if language in ('latex', 'tex'):
             fmtr = OdtPygmentsLaTeXFormatter(lambda name, parameters=():
                 self.rststyle(name, parameters),
@@ -2443,7 +2456,7 @@ class ODFTranslator(nodes.GenericNodeVisitor):
             fmtr = OdtPygmentsProgFormatter(lambda name, parameters=():
                 self.rststyle(name, parameters),
                 escape_function=escape_cdata)
-        outsource = pygments.highlight(insource, lexer, fmtr)
+        outsource = pygments.format(tokens, fmtr)
         return outsource
 
     def fill_line(self, line):
@@ -2469,8 +2482,8 @@ class ODFTranslator(nodes.GenericNodeVisitor):
             wrapper1 = '<text:p text:style-name="%s">%%s</text:p>' % (
                 self.rststyle('codeblock'), )
         source = node.astext()
-        if (pygments and
-            self.settings.add_syntax_highlighting
+        if (self.settings.add_syntax_highlighting and
+            import_pygments()
             #and
             #node.get('hilight', False)
             ):
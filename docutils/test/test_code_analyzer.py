@@ -0,0 +1,79 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Test module for utils/code_analyzer.py.
+"""
+
+import os
+import unittest
+import DocutilsTestSupport              # must be imported before docutils
+from docutils.utils import code_analyzer
+from docutils.utils.code_analyzer import Lexer, TokenCache, with_pygments
+
+
+class TokenCacheTests(unittest.TestCase):
+
+    cache_path = os.path.join('functional', 'output', 'token-cache.pickle')
+
+    def setUp(self):
+        self.saved_cache = code_analyzer.token_cache
+        code_analyzer.token_cache = TokenCache()
+
+    def tearDown(self):
+        code_analyzer.token_cache = self.saved_cache
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
+
+    def test_shared_lexer(self):
+        lexer1 = Lexer(u'print 1', 'python', 'short')
+        lexer2 = Lexer(u'print 2', 'python', 'long')
+        self.assertTrue(lexer1.lexer is lexer2.lexer)
+
+    def test_cached_tokens(self):
+        tokens = list(Lexer(u'print 1', 'python', 'short'))
+        cache = code_analyzer.token_cache
+        self.assertEqual(len(cache.classified), 1)
+        self.assertEqual(list(Lexer(u'print 1', 'python', 'short')), tokens)
+        self.assertEqual(len(cache.classified), 1)
+        # the token name set is part of the key:
+        list(Lexer(u'print 1', 'python', 'long'))
+        self.assertEqual(len(cache.classified), 2)
+
+    def test_tokens_are_copies(self):
+        classes, value = list(Lexer(u'print 1', 'python', 'short'))[0]
+        classes.append('modified')
+        classes, value = list(Lexer(u'print 1', 'python', 'short'))[0]
+        self.assertTrue('modified' not in classes)
+
+    def test_maxsize(self):
+        code_analyzer.token_cache.maxsize = 2
+        for code in (u'a = 1', u'b = 2', u'c = 3'):
+            list(Lexer(code, 'python'))
+        self.assertEqual(len(code_analyzer.token_cache.classified), 1)
+
+    def test_save_and_load(self):
+        tokens = list(Lexer(u'print 1', 'python', 'short'))
+        raw = code_analyzer.token_cache.lex(u'x = 1', 'python')
+        code_analyzer.token_cache.save(self.cache_path)
+        cache = TokenCache()
+        cache.load(self.cache_path)
+        key = ('python', 'short', u'print 1')
+        self.assertEqual(cache.get_classified(key), tokens)
+        self.assertEqual(cache.lex(u'x = 1', 'python'), raw)
+        self.assertFalse(cache.modified)
+
+    def test_load_missing_file(self):
+        cache = TokenCache()
+        cache.load(self.cache_path)
+        self.assertEqual(cache.classified, {})
+
+
+if not with_pygments:
+    del TokenCacheTests
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,7 +15,7 @@ import DocutilsTestSupport              # must be imported before docutils
 import docutils.core
 import docutils.utils
 import docutils.io
-from docutils.parsers.rst.directives.images import PIL
+PIL = docutils.utils.get_PIL()
 
 # docutils.utils.DependencyList records POSIX paths,
 # i.e. "/" as a path separator even on Windows (not os.path.join).
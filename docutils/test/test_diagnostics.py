@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Test module for utils/diagnostics.py.
+"""
+
+import os
+import tempfile
+import unittest
+from StringIO import StringIO
+import DocutilsTestSupport              # must be imported before docutils
+from docutils import core
+from docutils.utils.diagnostics import DiagnosticsLog, json_string
+
+
+class DiagnosticsLogTests(unittest.TestCase):
+
+    source = u'Title\n=====\n\nA `dangling`_ reference.\n'
+
+    def setUp(self):
+        self.stream = StringIO()
+        self.log = DiagnosticsLog(self.stream)
+
+    def publish(self, source_path):
+        core.publish_string(self.source, source_path=source_path,
+                            writer_name='null',
+                            settings_overrides={'_disable_config': True,
+                                                'warning_stream': '',
+                                                'diagnostics_log': self.log})
+
+    def records(self):
+        return [line for line in self.stream.getvalue().splitlines()]
+
+    def test_json_string(self):
+        self.assertEqual(json_string(u'a "b"\n\xe4'),
+                         '"a \\"b\\"\\n\\u00e4"')
+        self.assertEqual(json_string({'a': [1, None, True]}),
+                         '{"a": [1, null, true]}')
+
+    def test_publish(self):
+        self.publish('a.txt')
+        records = self.records()
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[1],
+            '{"document": "a.txt", "phase": "transform", "type": "ERROR", '
+            '"level": 3, "source": "a.txt", "line": 4, '
+            '"message": "Unknown target name: \\"dangling\\"."}')
+        self.assertTrue(records[-1].startswith(
+            '{"document": "a.txt", "phase": null, "type": "DOCUMENT", '
+            '"level": 3, "duration": '))
+
+    def test_summary(self):
+        self.publish('a.txt')
+        self.publish('b.txt')
+        summary = self.log.summary()
+        self.assertEqual(summary['documents'], 2)
+        self.assertEqual(summary['counts'], {'ERROR': 2})
+        self.assertEqual(len(summary['slowest']), 2)
+
+    def test_traceback(self):
+        # the log is closed if exceptions are propagated:
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            publisher = core.Publisher(source_class=core.io.StringInput,
+                                       destination_class=core.io.NullOutput)
+            publisher.set_components('standalone', 'restructuredtext', 'null')
+            publisher.get_settings(_disable_config=True, warning_stream='',
+                                   diagnostics_log=path, traceback=True,
+                                   halt_level=3)
+            publisher.set_source(self.source, 'a.txt')
+            self.assertRaises(core.utils.SystemMessage, publisher.publish)
+            self.assertEqual(publisher.settings.diagnostics_log, path)
+            log = open(path)
+            self.assertEqual(len(log.readlines()), 4)
+            log.close()
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
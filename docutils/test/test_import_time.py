@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Check that optional, slow modules are only imported when needed.
+
+Run as a script to get a report of the slowest imports
+(like ``python -X importtime`` in Python >= 3.7).
+"""
+
+import os
+import sys
+import subprocess
+import unittest
+import DocutilsTestSupport              # must be imported before docutils
+import docutils
+
+# Run in a fresh interpreter: record the cumulative time of every first
+# import of a module, then publish a plain document to pseudo-XML.
+script = r"""
+import sys, time
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+timings = []
+_import = builtins.__import__
+
+def timed_import(name, *args, **kwargs):
+    if name in sys.modules:
+        return _import(name, *args, **kwargs)
+    start = time.time()
+    try:
+        return _import(name, *args, **kwargs)
+    finally:
+        timings.append((time.time() - start, name))
+
+builtins.__import__ = timed_import
+start = time.time()
+import docutils.core
+docutils.core.publish_string('Title\n=====\n\nA *plain* document.\n',
+                             writer_name='pseudoxml',
+                             settings_overrides={'_disable_config': True})
+total = time.time() - start
+builtins.__import__ = _import
+sys.stdout.write('total %f\n' % total)
+for seconds, name in timings:
+    sys.stdout.write('%f %s\n' % (seconds, name))
+loaded = [name for name, module in sys.modules.items() if module is not None]
+sys.stdout.write('modules %s\n' % ' '.join(loaded))
+"""
+
+
+def import_report():
+    """Return total time, list of (seconds, name) and loaded modules."""
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(docutils.__file__))
+    process = subprocess.Popen([sys.executable, '-c', script], env=env,
+                               stdout=subprocess.PIPE)
+    output = process.communicate()[0].decode('ascii')
+    timings = []
+    for line in output.splitlines():
+        key, value = line.split(' ', 1)
+        if key == 'total':
+            total = float(value)
+        elif key == 'modules':
+            modules = value.split()
+        else:
+            timings.append((float(key), value))
+    return total, timings, modules
+
+
+class ImportTimeTests(unittest.TestCase):
+
+    optional_modules = ('PIL', 'Image', 'pygments', 'urllib', 'urllib2',
+                        'xml.dom.minidom', 'docutils.utils.math.math2html',
+                        'docutils.utils.math.latex2mathml',
+                        'docutils.utils.math.tex2mathml_extern',
+                        'docutils.utils.math.unichar2tex')
+    """Modules that must not be imported by a plain document."""
+
+    def test_optional_modules(self):
+        # The test process has imported most of these modules already,
+        # so the check needs the `sys.modules` of a fresh interpreter.
+        modules = import_report()[2]
+        for name in self.optional_modules:
+            self.assertFalse(name in modules,
+                             '%s imported for a plain document' % name)
+
+
+if __name__ == '__main__':
+    total, timings, modules = import_report()
+    timings.sort()
+    timings.reverse()
+    print('cumulative time [ms]  module')
+    for seconds, name in timings[:25]:
+        print('%20.1f  %s' % (seconds * 1000, name))
+    print('total: %.1f ms' % (total * 1000))
@@ -8,7 +8,7 @@
 Test module for io.py.
 """
 
-import unittest, sys
+import unittest, sys, os, tempfile
 import DocutilsTestSupport              # must be imported before docutils
 from docutils import io
 from docutils._compat import b, bytes
@@ -49,6 +49,12 @@ class HelperTests(unittest.TestCase):
 
 class InputTests(unittest.TestCase):
 
+    temp_path = None
+
+    def tearDown(self):
+        if self.temp_path is not None:
+            os.remove(self.temp_path)
+
     def test_bom(self):
         input = io.StringInput(source=b('\xef\xbb\xbf foo \xef\xbb\xbf bar'),
                                encoding='utf8')
@@ -100,6 +106,23 @@ print "hello world"
         data = input.readlines()
         self.assertEqual(data, [u'Some include text.\n'])
 
+    def test_newlines(self):
+        # universal newlines, also when reading via a memory map:
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.temp_path = path
+        f = open(path, 'wb')
+        f.write(b('\xef\xbb\xbfCRLF\r\nCR\rLF\n'))
+        f.close()
+        input = io.FileInput(source_path=path)
+        data = input.read()
+        if sys.version_info < (3,0):
+            self.assertEqual(data, u'CRLF\nCR\nLF\n')
+            self.assertEqual(input.successful_encoding, 'utf-8')
+        f = open(path, 'wb')
+        f.close()
+        self.assertEqual(io.FileInput(source_path=path).read(), u'')
+
     def test_heuristics_utf8(self):
         # if no encoding is given, try decoding with utf8:
         input = io.FileInput(source_path='functional/input/cyrillic.txt')
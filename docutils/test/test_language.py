@@ -69,7 +69,7 @@ class LanguageTestSuite(DocutilsTestSupport.CustomTestSuite):
 class LanguageTestCase(DocutilsTestSupport.CustomTestCase):
 
     test_methods = ['test_labels', 'test_bibliographic_fields',
-                    'test_directives', 'test_roles']
+                    'test_directives', 'test_roles', 'test_merged_tables']
     """Names of methods used to test each language."""
 
     def __init__(self, *args, **kwargs):
@@ -195,6 +195,28 @@ class LanguageTestCase(DocutilsTestSupport.CustomTestCase):
                 text = text.encode('raw_unicode_escape')
             self.fail(text)
 
+    def test_merged_tables(self):
+        module = docutils.languages.get_language(self.language, _reporter)
+        labels = docutils.languages.get_labels(module)
+        self.assertEqual(sorted(labels.keys()), sorted(self.ref.labels.keys()))
+        for key, value in module.labels.items():
+            self.assertEqual(labels[key], value)
+        rst_module = docutils.parsers.rst.languages.get_language(
+            self.language)
+        english = docutils.parsers.rst.languages.get_language('en')
+        tables = docutils.parsers.rst.languages.get_tables(rst_module)
+        self.assertTrue(
+            tables is docutils.parsers.rst.languages.get_tables(rst_module))
+        for table, local, fallback in (
+            (tables[0], rst_module.directives, english.directives),
+            (tables[1], rst_module.roles, english.roles)):
+            for name, canonical in local.items():
+                self.assertEqual(table[name], (canonical, False))
+            for name, canonical in fallback.items():
+                if name not in local:
+                    # the flag is reset once the fallback was reported
+                    self.assertEqual(table[name][0], canonical)
+
 languages_to_test = []
 
 def suite():
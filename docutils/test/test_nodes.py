@@ -324,6 +324,56 @@ class ElementTests(unittest.TestCase):
         node = nodes.Element(u'Möhren', nodes.Text(u'Möhren', u'Möhren'))
         self.assertEqual(unicode(node), u'<Element>Möhren</Element>')
 
+    def test_structural_hash(self):
+        def tree(text=u'Möhren', line=None):
+            para = nodes.paragraph('', text, classes=['c'])
+            para.line = line
+            return nodes.section('', nodes.title('', 'Title'), para,
+                                 ids=['s'])
+        section = tree()
+        self.assertEqual(section.structural_hash(),
+                         tree(line=42).structural_hash())
+        self.assertNotEqual(section.structural_hash(),
+                            tree(u'Karotten').structural_hash())
+        # the element class and attributes are significant:
+        self.assertNotEqual(nodes.paragraph('', 'a').structural_hash(),
+                            nodes.title('', 'a').structural_hash())
+        self.assertNotEqual(nodes.paragraph('', 'a').structural_hash(),
+                            nodes.paragraph('', 'a', ids=['a']
+                                           ).structural_hash())
+        # children are not merged:
+        self.assertNotEqual(
+            nodes.paragraph('', '', nodes.Text('ab')).structural_hash(),
+            nodes.paragraph('', '', nodes.Text('a'),
+                            nodes.Text('b')).structural_hash())
+
+    def test_structural_hash_mutation(self):
+        document = utils.new_document('test data')
+        para = nodes.paragraph('', 'text')
+        section = nodes.section('', nodes.title('', 'Title'), para)
+        document += section
+        original = section.structural_hash()
+        para['classes'].append('new')
+        changed = section.structural_hash()
+        self.assertNotEqual(changed, original)
+        document.set_id(para)
+        self.assertNotEqual(section.structural_hash(), changed)
+        para['ids'] = []
+        para['classes'] = []
+        self.assertEqual(section.structural_hash(), original)
+
+    def test_structural_hash_memo(self):
+        para = nodes.paragraph('', 'text')
+        section = nodes.section('', nodes.title('', 'Title'), para)
+        memo = {}
+        digest = section.structural_hash(memo)
+        self.assertEqual(digest, section.structural_hash())
+        self.assertEqual(para.structural_hash(memo), para.structural_hash())
+        # the memo is valid only while the tree is not changed:
+        para['classes'].append('new')
+        self.assertEqual(section.structural_hash(memo), digest)
+        self.assertNotEqual(section.structural_hash({}), digest)
+
 
 class MiscTests(unittest.TestCase):
 
@@ -571,6 +621,11 @@ class MiscTests(unittest.TestCase):
         self.assertEqual(list(e[0].traverse(condition=self.not_in_testlist)),
                                [e[0]])
         self.assertEqual(list(e.traverse(nodes.TextElement)), [e[0][1]])
+        self.assertEqual(list(e.traverse((nodes.TextElement, nodes.Text))),
+                          [e[0][1], e[0][1][0]])
+        self.assertEqual(list(e[0][1].traverse((nodes.Text,), siblings=True,
+                                               include_self=False)),
+                          [e[0][1][0]])
 
     def test_next_node(self):
         e = nodes.Element()
@@ -687,6 +742,16 @@ class MiscFunctionTests(unittest.TestCase):
         document.set_id(element)
         self.assertEqual(element['ids'], ['prefixauto1'])
 
+    def test_get_target(self):
+        document = utils.new_document('test')
+        target = nodes.target(names=['test'])
+        document.note_explicit_target(target)
+        self.assertTrue(document.get_target('test') is target)
+        self.assertEqual(document.get_target('unknown'), None)
+        # Duplicate names cannot be resolved:
+        document.note_explicit_target(nodes.target(names=['test']))
+        self.assertEqual(document.get_target('test'), None)
+
 
 if __name__ == '__main__':
     unittest.main()
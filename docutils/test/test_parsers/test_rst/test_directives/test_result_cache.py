@@ -0,0 +1,133 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Tests for the cache of directive results (`directives.ResultCache`).
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from __init__ import DocutilsTestSupport
+from docutils import frontend, utils
+from docutils.parsers import rst
+from docutils.parsers.rst import directives
+
+
+source = """\
+.. list-table::
+
+   * - a *list* table
+     - cell
+
+Paragraph.
+
+.. list-table::
+
+   * - a *list* table
+     - cell
+
+.. list-table::
+
+   * - a _`target` cell
+     - cell
+"""
+
+
+class ResultCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_cache = directives.result_cache
+        directives.result_cache = directives.ResultCache()
+
+    def tearDown(self):
+        directives.result_cache = self.saved_cache
+
+    def parse(self, input):
+        parser = rst.Parser()
+        settings = frontend.OptionParser(
+            components=(rst.Parser,)).get_default_values()
+        settings.report_level = 5
+        document = utils.new_document('test data', settings)
+        parser.parse(input, document)
+        return document
+
+    def test_hits(self):
+        self.parse(source)
+        cache = directives.result_cache
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        # the result with a target is not stored:
+        self.assertEqual(len(cache.results), 1)
+
+    def lines(self, document):
+        return [(node.source, node.line)
+                for node in document.traverse(directives.nodes.Element)]
+
+    def test_identical_output(self):
+        self.parse(source)
+        cached = self.parse(source)
+        directives.result_cache.clear()
+        directives.result_cache.maxsize = 0
+        uncached = self.parse(source)
+        self.assertEqual(cached.pformat(), uncached.pformat())
+        self.assertEqual(self.lines(cached), self.lines(uncached))
+
+    def test_copies(self):
+        document = self.parse(source)
+        tables = [node for node in document.traverse(directives.nodes.table)]
+        self.assertEqual(len(tables), 3)
+        self.assertTrue(tables[0] is not tables[1])
+
+    def test_role_lookups(self):
+        # Local names of standard roles are registered on first use;
+        # this must not change the cache keys.
+        text = source.replace('a *list* table', 'a :emphasis:`list` table')
+        self.parse(text)
+        self.parse(text)
+        self.assertEqual(directives.result_cache.hits, 3)
+
+    def test_side_effects(self):
+        text = """\
+.. list-table::
+
+   * - .. title:: Nested title
+
+       cell
+"""
+        self.parse(text)
+        document = self.parse(text)
+        self.assertEqual(document['title'], 'Nested title')
+        self.assertEqual(directives.result_cache.hits, 0)
+
+    def test_nested_include(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'snip.txt')
+            text = """\
+.. list-table::
+
+   * - .. include:: %s
+     - cell
+""" % path
+            self.write(path, 'Old text.\n', 1000000000)
+            self.parse(text)
+            self.assertTrue('Old text.' in self.parse(text).astext())
+            self.assertEqual(directives.result_cache.hits, 1)
+            self.write(path, 'New text.\n', 1000000010)
+            self.assertTrue('New text.' in self.parse(text).astext())
+            self.assertEqual(directives.result_cache.hits, 1)
+        finally:
+            shutil.rmtree(directory)
+
+    def write(self, path, text, mtime):
+        f = open(path, 'w')
+        f.write(text)
+        f.close()
+        os.utime(path, (mtime, mtime))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Tests for incremental re-parsing (`docutils.parsers.rst.incremental`).
+"""
+
+import unittest
+from __init__ import DocutilsTestSupport
+from docutils import nodes
+from docutils.parsers.rst.incremental import IncrementalParser
+
+
+source = """\
+Title
+=====
+
+:Author: me
+
+Introduction.
+
+Section 1
+---------
+
+First paragraph
+of section 1.
+
+- item a
+- item b
+
+Last paragraph of section 1.
+
+Section 2
+---------
+
+.. note:: A note.
+
+Paragraph of section 2.
+"""
+
+
+def line_numbers(document):
+    return [(node.__class__.__name__, node.line)
+            for node in document.traverse(nodes.Element)]
+
+
+class IncrementalParserTests(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = IncrementalParser(source_path='test data')
+        self.parser.parse(source)
+
+    def check(self, text):
+        document = self.parser.update(text)
+        expected = IncrementalParser(source_path='test data').parse(text)
+        self.assertEqual(document.pformat(), expected.pformat())
+        self.assertEqual(line_numbers(document), line_numbers(expected))
+        return document
+
+    def test_unchanged(self):
+        document = self.parser.document
+        self.assertTrue(self.parser.update(source) is document)
+        self.assertEqual(self.parser.full_parses, 1)
+        self.assertEqual(self.parser.incremental_updates, 0)
+
+    def test_edit_paragraph(self):
+        text = source.replace('item b', 'item *b*')
+        document = self.parser.document
+        self.assertTrue(self.check(text) is document)
+        self.assertEqual(self.parser.incremental_updates, 1)
+        self.assertEqual(self.parser.full_parses, 1)
+
+    def test_insert_lines(self):
+        text = source.replace('- item b\n', '- item b\n- item c\n\n  more\n')
+        self.check(text)
+        self.assertEqual(self.parser.incremental_updates, 1)
+        # following edits use the updated line numbers:
+        text = text.replace('A note.', 'A *note*.')
+        self.check(text)
+        self.assertEqual(self.parser.incremental_updates, 2)
+        self.assertEqual(self.parser.full_parses, 1)
+
+    def test_new_section(self):
+        text = source.replace('Last paragraph',
+                              'Section 1.1\n```````````\n\nLast paragraph')
+        self.check(text)
+        self.assertEqual(self.parser.incremental_updates, 0)
+        self.assertEqual(self.parser.full_parses, 2)
+
+    def test_new_target(self):
+        text = source.replace('Last paragraph',
+                              '.. _target:\n\nLast paragraph')
+        self.check(text)
+        self.assertEqual(self.parser.full_parses, 2)
+
+    def test_document_start(self):
+        self.check(source.replace(':Author: me', ':Author: you'))
+        self.assertEqual(self.parser.full_parses, 2)
+
+    def test_attribution(self):
+        # The line number of an attribution lies after the block quote
+        # (regression test for an edit found by random testing):
+        text = source.replace('of section 1.\n',
+                              'of section 1.\n\n'
+                              '   A block quote\n   with two lines.\n\n'
+                              '   -- Attribution\n')
+        self.parser.parse(text)
+        document = self.check(text.replace('First paragraph\n',
+                                           'text\nFirst paragraph\n'))
+        self.assertEqual(self.parser.incremental_updates, 1)
+        self.assertEqual(document.traverse(nodes.attribution)[0].line, 22)
+
+    def test_context_directive(self):
+        text = source + '\n.. default-role:: strong\n\n`text`\n'
+        self.parser.parse(text)
+        self.check(text.replace('item b', 'item *b*'))
+        self.assertEqual(self.parser.full_parses, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
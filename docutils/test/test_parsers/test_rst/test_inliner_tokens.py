@@ -0,0 +1,122 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Tests for the token stream of the inline markup parser
+(`docutils.parsers.rst.states.Inliner.tokenize()`).
+"""
+
+import unittest
+from __init__ import DocutilsTestSupport
+from docutils import frontend, nodes, utils
+from docutils.parsers import rst
+from docutils.parsers.rst import states
+
+
+class InlinerTokenTests(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = frontend.OptionParser(
+            components=(rst.Parser,)).get_default_values()
+        self.settings.pep_references = self.settings.rfc_references = True
+        self.inliner = states.Inliner()
+        self.inliner.init_customizations(self.settings)
+
+    def tokens(self, text):
+        return [(kind, text[start:end], data)
+                for kind, start, end, data in self.inliner.tokenize(text)]
+
+    def test_simple(self):
+        self.assertEqual(self.tokens(u'Some *emph*, **strong** ``lit``'), [
+            ('text', u'Some ', None),
+            ('emphasis', u'*emph*', None),
+            ('text', u', ', None),
+            ('strong', u'**strong**', None),
+            ('text', u' ', None),
+            ('literal', u'``lit``', None)])
+
+    def test_interpreted(self):
+        self.assertEqual(self.tokens(u'`a` :role:`b` `c`:sub:'), [
+            ('interpreted', u'`a`', None),
+            ('text', u' ', None),
+            ('interpreted', u':role:`b`', u'role'),
+            ('text', u' ', None),
+            ('interpreted', u'`c`:sub:', u'sub')])
+        # roles are not resolved:
+        self.assertEqual(self.tokens(u'`x`:http://'), [
+            ('interpreted', u'`x`:http:', u'http'),
+            ('text', u'//', None)])
+
+    def test_references(self):
+        self.assertEqual(
+            self.tokens(u'Ref_ `A  Phrase`_ anon__ [1]_ [#note]_ [CIT]_'), [
+            ('reference', u'Ref_', u'ref'),
+            ('text', u' ', None),
+            ('reference', u'`A  Phrase`_', u'a phrase'),
+            ('text', u' ', None),
+            ('anonymous_reference', u'anon__', None),
+            ('text', u' ', None),
+            ('footnote_reference', u'[1]_', u'1'),
+            ('text', u' ', None),
+            ('footnote_reference', u'[#note]_', u'#note'),
+            ('text', u' ', None),
+            ('citation_reference', u'[CIT]_', u'cit')])
+
+    def test_nested(self):
+        self.assertEqual(
+            self.tokens(u'|sub|_ _`Target` `Python <http://python.org>`_'), [
+            ('reference', u'|sub|_', u'sub'),
+            ('substitution_reference', u'|sub|_', u'sub'),
+            ('text', u' ', None),
+            ('target', u'_`Target`', u'target'),
+            ('text', u' ', None),
+            ('uri', u'`Python <http://python.org>`_', u'http://python.org'),
+            ('target', u'`Python <http://python.org>`_', u'python')])
+
+    def test_implicit(self):
+        self.assertEqual(
+            self.tokens(u'See http://a.org, me@b.org, PEP 8 and RFC 2822.'), [
+            ('text', u'See ', None),
+            ('uri', u'http://a.org', u'http://a.org'),
+            ('text', u', ', None),
+            ('uri', u'me@b.org', u'mailto:me@b.org'),
+            ('text', u', ', None),
+            ('pep_reference', u'PEP 8', 8),
+            ('text', u' and ', None),
+            ('rfc_reference', u'RFC 2822', 2822),
+            ('text', u'.', None)])
+
+    def test_unknown_scheme(self):
+        self.assertEqual(self.tokens(u'a foo:bar b'),
+                         [('text', u'a foo:bar b', None)])
+
+    def test_problematic(self):
+        self.assertEqual(self.tokens(u'"*" \\*x\\* *open :a:`b`:c:'), [
+            ('text', u'"*" \\*x\\* ', None),
+            ('problematic', u'*', None),
+            ('text', u'open ', None),
+            ('problematic', u':a:`b`:c:', None)])
+
+    def test_parse_agreement(self):
+        # The tokens partition the text like the nodes of `parse()`.
+        text = (u'*a* ``b`` `c`_ d__ [1]_ |e| _`f` http://g.org `h`:i:'
+                u' PEP 9 "*" *j')
+        self.settings.report_level = 5
+        document = utils.new_document('test data', self.settings)
+        memo = states.Struct(document=document,
+                             reporter=document.reporter,
+                             language=states._fallback_language_module)
+        parsed, messages = self.inliner.parse(text, 1, memo, document)
+        tokens = [token for token in self.inliner.tokenize(text)]
+        self.assertEqual(len(tokens), len(parsed))
+        for node, (kind, start, end, data) in zip(parsed, tokens):
+            if isinstance(node, nodes.Text):
+                self.assertEqual(kind, 'text')
+            else:
+                self.assertEqual(node.rawsource, text[start:end])
+
+
+if __name__ == '__main__':
+    unittest.main()
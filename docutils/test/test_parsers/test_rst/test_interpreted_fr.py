@@ -47,6 +47,18 @@ Simple explicit roles and english fallbacks:
             No role entry for "acronym" in module "docutils.parsers.rst.languages.fr".
             Using English fallback for role "acronym".
 """],
+["""\
+The English fallback is reported once per language and role:
+:acronym:`acronym`.
+""",
+"""\
+<document source="test data">
+    <paragraph>
+        The English fallback is reported once per language and role:
+        <acronym>
+            acronym
+        .
+"""],
 ]
 
 if __name__ == '__main__':
@@ -0,0 +1,81 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Tests for the deferred parsing of inline markup ("lazy_inline" setting).
+"""
+
+import unittest
+from __init__ import DocutilsTestSupport
+from docutils import core, nodes
+
+
+source = """\
+Title
+=====
+
+A *plain* paragraph with ``literal text``.
+
+A paragraph with a reference_.
+
+.. _reference: http://docutils.sourceforge.net
+
+* List item with **strong** text.
+
+* List item with a footnote reference [#]_.
+
+.. [#] A footnote.
+"""
+
+
+class LazyInlineTests(unittest.TestCase):
+
+    def publish(self, text, lazy_inline=True):
+        return core.publish_doctree(
+            text, settings_overrides={'_disable_config': True,
+                                      'report_level': 5,
+                                      'lazy_inline': lazy_inline})
+
+    def deferred(self, document):
+        return [p for p in document.traverse(nodes.paragraph)
+                if p.deferred_children is not None]
+
+    def test_deferred_paragraphs(self):
+        document = self.publish(source)
+        # Paragraphs with references or targets are parsed right away:
+        self.assertEqual([p.rawsource for p in self.deferred(document)],
+                         [u'A *plain* paragraph with ``literal text``.',
+                          u'List item with **strong** text.',
+                          u'A footnote.'])
+
+    def test_registered(self):
+        document = self.publish(source)
+        self.assertEqual(document.nameids['reference'], 'reference')
+        self.assertEqual(len(document.traverse(nodes.footnote_reference)), 1)
+        self.assertEqual(len(document.traverse(nodes.reference)), 1)
+        self.assertEqual(len(self.deferred(document)), 3)
+
+    def test_access(self):
+        document = self.publish(source)
+        paragraph = self.deferred(document)[0]
+        self.assertEqual(len(paragraph), 5)
+        self.assertEqual(paragraph.deferred_children, None)
+        self.assertEqual(paragraph[1].parent, paragraph)
+        self.assertEqual(len(document.traverse(nodes.strong)), 1)
+        self.assertEqual(self.deferred(document), [])
+
+    def test_same_output(self):
+        self.assertEqual(self.publish(source).pformat(),
+                         self.publish(source, lazy_inline=False).pformat())
+
+    def test_problematic(self):
+        # Markup errors are reported during parsing:
+        document = self.publish('An *unclosed start-string.')
+        self.assertEqual(self.deferred(document), [])
+        self.assertEqual(len(document.traverse(nodes.problematic)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
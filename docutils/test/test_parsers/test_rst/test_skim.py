@@ -0,0 +1,163 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Tests for skim parsing (`docutils.parsers.rst.Parser` with ``skim=True``)
+and `docutils.parsers.rst.states.materialize()`.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from __init__ import DocutilsTestSupport
+from docutils import frontend, io, nodes, utils
+from docutils.parsers import rst
+from docutils.parsers.rst import states
+from docutils.transforms import references
+
+
+source = """\
+Title with *emphasis*
+=====================
+
+A paragraph with a reference_ and ``literal text``.
+
+.. _reference: http://docutils.sourceforge.net
+
+Section
+-------
+
+.. note:: A note with *emphasis*
+   and a second line.
+
+.. |sub| replace:: substitution text
+
+- Item with |sub| and _`an inline target`.
+- Second item.
+
+.. image:: picture.png
+   :alt: a picture
+"""
+
+
+class SkimTests(unittest.TestCase):
+
+    def parse(self, text, skim):
+        settings = frontend.OptionParser(
+            components=(rst.Parser,)).get_default_values()
+        settings.report_level = 5
+        document = utils.new_document('test data', settings)
+        rst.Parser(skim=skim).parse(text, document)
+        return document
+
+    def test_block_structure(self):
+        document = self.parse(source, skim=True)
+        self.assertEqual([title.astext()
+                          for title in document.traverse(nodes.title)],
+                         [u'Title with emphasis', u'Section'])
+        self.assertEqual(sorted(document.nameids.keys()),
+                         [u'reference', u'section', u'title with emphasis'])
+        self.assertEqual(document.traverse(nodes.emphasis)[0].astext(),
+                         u'emphasis')   # in the title
+        paragraph = document.traverse(nodes.paragraph)[0]
+        self.assertEqual(len(paragraph), 1)
+        self.assertTrue(isinstance(paragraph[0], states.DeferredText))
+        self.assertEqual(paragraph.astext(), u'A paragraph with a reference_ '
+                         u'and ``literal text``.')
+
+    def test_deferred_blocks(self):
+        document = self.parse(source, skim=True)
+        pending = document.traverse(nodes.pending)
+        self.assertEqual([node.details for node in pending],
+                         [{'directive': u'note'}, {'substitution': u'sub'},
+                          {'directive': u'image'}])
+        self.assertEqual([node.line for node in pending], [11, 14, 19])
+        self.assertEqual(pending[2].rawsource,
+                         u'.. image:: picture.png\n   :alt: a picture')
+
+    def test_materialize(self):
+        document = self.parse(source, skim=True)
+        states.materialize(document)
+        self.assertEqual(document.pformat(),
+                         self.parse(source, skim=False).pformat())
+        self.assertTrue('an inline target' in document.nameids)
+        self.assertTrue('sub' in document.substitution_defs)
+
+    def test_materialize_subtree(self):
+        document = self.parse(source, skim=True)
+        section = document.traverse(nodes.section)[1]
+        states.materialize(section[3])  # the bullet list
+        self.assertEqual(len(document.traverse(states.DeferredText)), 1)
+        self.assertEqual(len(document.traverse(nodes.pending)), 3)
+        self.assertEqual(section[3].pformat(),
+                         self.parse(source, skim=False)
+                         .traverse(nodes.bullet_list)[0].pformat())
+
+    def test_context_directives(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'included.txt')
+            f = open(path, 'w')
+            f.write('Included section\n'
+                    '----------------\n\n'
+                    'Included *text*.\n')
+            f.close()
+            text = ('.. role:: custom(strong)\n\n'
+                    'Title with :custom:`role`\n'
+                    '=========================\n\n'
+                    'Section\n'
+                    '-------\n\n'
+                    '.. include:: %s\n' % path)
+            document = self.parse(text, skim=True)
+            self.assertEqual([title.astext()
+                              for title in document.traverse(nodes.title)],
+                             [u'Title with role', u'Section',
+                              u'Included section'])
+            self.assertEqual(len(document.traverse(nodes.problematic)), 0)
+            states.materialize(document)
+            self.assertEqual(document.pformat(),
+                             self.parse(text, skim=False).pformat())
+        finally:
+            shutil.rmtree(directory)
+
+    def test_footnote_numbering(self):
+        # deferred blocks and paragraphs are parsed in document order:
+        text = ('Para [#]_\n\n'
+                '.. note:: In note [#]_.\n\n'
+                'Para [#]_ [*]_\n\n'
+                '.. [#] one\n.. [#] two\n.. [#] three\n.. [*] symbol\n')
+        numbers = []
+        for skim in (False, True):
+            document = self.parse(text, skim)
+            if skim:
+                states.materialize(document)
+            document.transformer.add_transform(references.Footnotes)
+            document.transformer.apply_transforms()
+            numbers.append([node.astext() for node in
+                            document.traverse(nodes.footnote_reference)])
+        self.assertEqual(numbers[0], [u'1', u'2', u'3', u'*'])
+        self.assertEqual(numbers[1], numbers[0])
+
+    def normalized(self, document):
+        # Names (and hence ids) and messages about duplicate names may
+        # differ, see `states.materialize()`.
+        for message in document.traverse(nodes.system_message):
+            message.parent.remove(message)
+        return re.sub(' (ids|names|dupnames|backrefs|refid)="[^"]*"', '',
+                      document.pformat())
+
+    def test_documentation(self):
+        text = io.FileInput(source_path='../docs/dev/release.txt',
+                            encoding='utf-8').read()
+        document = self.parse(text, skim=True)
+        states.materialize(document)
+        self.assertEqual(self.normalized(document),
+                         self.normalized(self.parse(text, skim=False)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -154,6 +154,23 @@ class SMWSTests(unittest.TestCase):
         self.assertEqual(self.sm.states.keys(), ['MockState'])
         self.assertEqual(len(self.sm.states['MockState'].transitions), 4)
 
+    def test_shared_transition_tables(self):
+        sm2 = statemachine.StateMachineWS([MockState], 'MockState')
+        state1 = self.sm.states['MockState']
+        state2 = sm2.states['MockState']
+        self.assertTrue(MockState in statemachine.State.transition_tables)
+        self.assertEqual(state2.transition_order, state1.transition_order)
+        pattern1, method1, next_state1 = state1.transitions['bullet']
+        pattern2, method2, next_state2 = state2.transitions['bullet']
+        self.assertTrue(pattern2 is pattern1)
+        self.assertTrue(method1.im_self is state1)
+        self.assertTrue(method2.im_self is state2)
+        # changes are local to the instance:
+        state2.remove_transition('bullet')
+        self.assertTrue('bullet' in state1.transitions)
+        self.assertTrue('bullet' in state1.transition_order)
+        sm2.unlink()
+
     def test_get_indented(self):
         self.sm.input_lines = statemachine.StringList(testtext)
         self.sm.line_offset = -1
@@ -37,5 +37,61 @@ class KwargsTestCase(unittest.TestCase):
         self.assertEqual(transform_record[3], {'foo': 42})
 
 
+class OrderTransform(transforms.Transform):
+
+    """Record its application; add a transform with priority 500."""
+
+    def apply(self, order, name, add=None):
+        order.append(name)
+        if add:
+            self.document.transformer.add_transform(
+                OrderTransform, 500, order=order, name=add)
+
+
+class SchedulingTestCase(unittest.TestCase):
+
+    def test_order(self):
+        transformer = utils.new_document('test data').transformer
+        order = []
+        for priority, name, add in ((500, 'c1', None), (100, 'a', 'c3'),
+                                    (500, 'c2', None), (300, 'b', None),
+                                    (900, 'd', None)):
+            transformer.add_transform(OrderTransform, priority, order=order,
+                                      name=name, add=add)
+        transformer.apply_transforms()
+        # FIFO order within a priority, also for transforms added later:
+        self.assertEqual(order, ['a', 'b', 'c1', 'c2', 'c3', 'd'])
+        self.assertEqual([record[0][0] for record in transformer.applied],
+                         [100, 300, 500, 500, 500, 900])
+
+    def test_priority_strings(self):
+        # old-style items appended directly to `transformer.transforms`:
+        transformer = utils.new_document('test data').transformer
+        order = []
+        transformer.add_transform(OrderTransform, 500, order=order,
+                                  name='c')
+        transformer.transforms.append(
+            (transformer.get_priority_string(100), OrderTransform, None,
+             {'order': order, 'name': 'a'}))
+        transformer.sorted = 0
+        transformer.add_transform(OrderTransform, 300, order=order,
+                                  name='b')
+        transformer.apply_transforms()
+        self.assertEqual(order, ['a', 'b', 'c'])
+        self.assertEqual([record[0] for record in transformer.applied],
+                         [(100, 2), (300, 3), (500, 1)])
+
+    def test_timing_hooks(self):
+        transformer = transforms.Transformer(utils.new_document('test data'))
+        timings = []
+        transformer.timing_hooks.append(
+            lambda transform, duration: timings.append((transform, duration)))
+        transformer.add_transform(TestTransform, foo=42)
+        transformer.apply_transforms()
+        self.assertEqual(len(timings), 1)
+        self.assertTrue(isinstance(timings[0][0], TestTransform))
+        self.assertTrue(timings[0][1] >= 0)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -47,6 +47,52 @@ class ReporterTests(unittest.TestCase):
 """)
         self.assertEqual(self.stream.getvalue(), '')
 
+    def test_level1_deferred(self):
+        # the paragraph of unreported messages is generated on demand:
+        sw = self.reporter.system_message(1, 'a reminder',
+                                          nodes.literal_block('', 'text'))
+        self.assertEqual(sw.deferred_message, 'a reminder')
+        sw += nodes.comment('', 'appended')
+        self.assertEqual(len(sw.traverse(nodes.comment)), 1)
+        self.assertEqual(sw.deferred_message, 'a reminder')
+        self.assertEqual(sw.pformat(), """\
+<system_message level="1" source="test data" type="INFO">
+    <paragraph>
+        a reminder
+    <literal_block xml:space="preserve">
+        text
+    <comment xml:space="preserve">
+        appended
+""")
+        self.assertEqual(sw.deferred_message, None)
+        self.assertTrue(sw[0].parent is sw)
+
+    def test_deferred_in_publish(self):
+        # Unreported messages are filtered out without generating their
+        # paragraphs by the standard transforms:
+        from docutils import core
+        from docutils.transforms import universal
+        generated = []
+        original = universal.FilterMessages.__dict__['apply']
+        def apply(transform):
+            document = transform.document
+            generated.extend([msg for msg in (document.parse_messages
+                                              + document.transform_messages)
+                              if msg.deferred_message is None])
+            original(transform)
+        universal.FilterMessages.apply = apply
+        try:
+            output = core.publish_string(
+                'Title\n=====\n\nTitle\n=====\n\n|sub| `target`_\n\n'
+                '.. _target: http://example.org\n.. |sub| replace:: text\n',
+                writer_name='pseudoxml',
+                settings_overrides={'_disable_config': True,
+                                    'report_level': 2})
+        finally:
+            universal.FilterMessages.apply = original
+        self.assertFalse('system_message' in output)
+        self.assertEqual(generated, [])
+
     def test_level2(self):
         sw = self.reporter.system_message(2, 'a warning')
         self.assertEqual(sw.pformat(), """\
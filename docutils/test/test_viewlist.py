@@ -187,6 +187,51 @@ class ViewListTests(unittest.TestCase):
 #         print s.items
 
 
+class SourceMapTests(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [('a', 0), ('a', 1), ('a', 2), ('b', 5), ('b', 6),
+                      ('a', 3), ('c', None)]
+        self.map = statemachine.SourceMap(self.items)
+
+    def test_runs(self):
+        self.assertEqual(len(self.map), len(self.items))
+        self.assertEqual(len(self.map.runs), 4)
+        self.assertEqual(self.map, self.items)
+        self.assertEqual(list(self.map), self.items)
+
+    def test_items(self):
+        for i in range(-len(self.items), len(self.items)):
+            self.assertEqual(self.map[i], self.items[i])
+        self.assertRaises(IndexError, self.map.__getitem__, len(self.items))
+
+    def test_slices(self):
+        for start in range(len(self.items)):
+            for stop in range(start, len(self.items) + 1):
+                self.assertEqual(self.map[start:stop],
+                                 self.items[start:stop])
+        self.assertEqual(self.map[-3:], self.items[-3:])
+
+    def test_list_methods(self):
+        items = self.items[:]
+        map = self.map
+        for method, args in (('insert', (2, ('x', 1))),
+                             ('append', (('a', 4),)),
+                             ('pop', (3,)),
+                             ('pop', ()),
+                             ('extend', ([('b', 1), ('b', 2)],)),
+                             ('__delitem__', (slice(1, 3),)),
+                             ('__setitem__', (slice(0, 2), [('y', 0)])),
+                             ('__delitem__', (0,)),
+                             ('reverse', ())):
+            self.assertEqual(getattr(map, method)(*args),
+                             getattr(items, method)(*args))
+            self.assertEqual(map, items)
+        self.assertEqual(map + items, items + items)
+        self.assertEqual(items + map, items + items)
+        self.assertEqual(map * 2, items * 2)
+
+
 class StringList(unittest.TestCase):
 
     text = """\
@@ -0,0 +1,122 @@
+#! /usr/bin/env python
+
+# $Id$
+# Copyright: This module has been placed in the public domain.
+
+"""
+Tests for the cache of translated sections (`writers.SectionCache`).
+"""
+
+import unittest
+from __init__ import DocutilsTestSupport
+from docutils import core, writers
+
+
+source = """\
+Title
+=====
+
+Section 1
+---------
+
+Paragraph with a footnote [#]_ and a reference to `section 2`_.
+
+.. [#] The footnote.
+
+Subsection
+``````````
+
+1. enumerated
+2. list
+
+Section 2
+---------
+
+.. math:: a^2 + b^2 = c^2
+
+.. sidebar:: Sidebar
+
+   Content.
+
+Section 3
+---------
+
+Last paragraph.
+"""
+
+
+class SectionCacheTests(unittest.TestCase):
+
+    writer_name = 'html_plain'
+
+    def setUp(self):
+        self.saved_cache = writers.section_cache
+        writers.section_cache = writers.SectionCache()
+
+    def tearDown(self):
+        writers.section_cache = self.saved_cache
+
+    def publish(self, text, section_cache=True):
+        return core.publish_string(
+            text, writer_name=self.writer_name,
+            settings_overrides={'_disable_config': True,
+                                'section_cache': section_cache})
+
+    def test_unchanged(self):
+        expected = self.publish(source, section_cache=False)
+        self.assertEqual(self.publish(source), expected)
+        self.assertEqual(writers.section_cache.misses, 3)
+        self.assertEqual(self.publish(source), expected)
+        self.assertEqual(writers.section_cache.hits, 3)
+        self.assertEqual(writers.section_cache.misses, 3)
+
+    def test_changed_section(self):
+        self.publish(source)
+        text = source.replace('Last paragraph', 'Last *paragraph*')
+        self.assertEqual(self.publish(text),
+                         self.publish(text, section_cache=False))
+        self.assertEqual(writers.section_cache.hits, 2)
+        self.assertEqual(writers.section_cache.misses, 4)
+
+    def test_changed_reference_target(self):
+        self.publish(source)
+        # The target of the reference in section 1 gets a new id:
+        text = source.replace('Section 2\n-', '.. _section 2:\n\nSection 2\n-')
+        self.assertEqual(self.publish(text),
+                         self.publish(text, section_cache=False))
+        self.assertEqual(writers.section_cache.hits, 1)
+
+    def test_changed_settings(self):
+        self.publish(source)
+        core.publish_string(source, writer_name=self.writer_name,
+                            settings_overrides={'_disable_config': True,
+                                                'section_cache': True,
+                                                'compact_lists': False})
+        self.assertEqual(writers.section_cache.hits, 0)
+
+
+class LaTeXSectionCacheTests(SectionCacheTests):
+
+    writer_name = 'latex'
+
+    def test_changed_settings(self):
+        self.publish(source)
+        core.publish_string(source, writer_name=self.writer_name,
+                            settings_overrides={'_disable_config': True,
+                                                'section_cache': True,
+                                                'table_style': 'booktabs'})
+        self.assertEqual(writers.section_cache.hits, 0)
+
+    def test_preamble_state(self):
+        # Languages used in a section are set up in the preamble:
+        text = source.replace('Last paragraph.',
+                              '.. class:: language-de\n\nLetzter Absatz.')
+        expected = self.publish(text, section_cache=False)
+        self.assertTrue('\\usepackage[ngerman,english]{babel}' in expected)
+        self.publish(text)
+        self.assertEqual(self.publish(text), expected)
+        self.assertEqual(writers.section_cache.hits, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,6 +30,7 @@ import docutils
 from docutils import ApplicationError
 from docutils import core, frontend, utils
 from docutils.utils.error_reporting import ErrorOutput, ErrorString
+from docutils.utils.diagnostics import DiagnosticsLog
 from docutils.parsers import rst
 from docutils.readers import standalone, pep
 from docutils.writers import html4css1, pep_html
@@ -133,6 +134,10 @@ class Builder:
         itself.  ``self.publishers[''].components`` must contain a superset of
         all components used by individual publishers."""
 
+        self.diagnostics = None
+        """`DiagnosticsLog` shared by all publishers (if requested by the
+        "diagnostics_log" setting)."""
+
         self.setup_publishers()
 
     def setup_publishers(self):
@@ -178,6 +183,8 @@ class Builder:
                 directory)
             settings.update(local_config, publisher.option_parser)
         settings.update(self.settings_spec.__dict__, publisher.option_parser)
+        if self.diagnostics:
+            settings.diagnostics_log = self.diagnostics
         return settings
 
     def run(self, directory=None, recurse=1):
@@ -188,6 +195,9 @@ class Builder:
             self.directories = self.settings_spec._directories
         else:
             self.directories = [os.getcwd()]
+        if self.initial_settings.diagnostics_log:
+            self.diagnostics = DiagnosticsLog(
+                self.initial_settings.diagnostics_log)
         for directory in self.directories:
             for root, dirs, files in os.walk(directory):
                 # os.walk by default this recurses down the tree,
@@ -195,6 +205,11 @@ class Builder:
                 if not recurse:
                     del dirs[:]
                 self.visit(root, files, dirs)
+        if self.diagnostics:
+            # aggregate message counts and durations of all documents:
+            self.diagnostics.write_summary()
+            self.diagnostics.close()
+            self.diagnostics = None
 
     def visit(self, directory, names, subdirectories):
         settings = self.get_settings('', directory)
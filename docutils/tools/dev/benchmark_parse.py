@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+
+# $Id$
+# Copyright: This script has been placed in the public domain.
+
+"""
+Micro-benchmark: parse many tiny reStructuredText documents (like
+docstrings) with one parser.  Setting up the state machine dominates here.
+
+Usage: benchmark_parse.py [number of documents (default 10000)]
+"""
+
+import sys
+import time
+
+from docutils import frontend, utils
+from docutils.parsers import rst
+
+text = """\
+Return the *sum* of `a` and ``b``.
+
+:param a: first summand
+:param b: second summand
+"""
+
+def main(count=10000):
+    parser = rst.Parser()
+    settings = frontend.OptionParser(
+        components=(rst.Parser,)).get_default_values()
+    settings.report_level = 5
+    start = time.time()
+    for i in range(count):
+        parser.parse(text, utils.new_document('<docstring>', settings))
+    duration = time.time() - start
+    print('%d documents in %.2f s (%.3f ms per document)'
+          % (count, duration, duration * 1000.0 / count))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
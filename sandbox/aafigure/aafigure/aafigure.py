@@ -8,6 +8,10 @@ See svg.py and aa.py for output modules, that can render the parsed structure.
 (C) 2006 Chris Liechti <cliechti@gmx.net>
 """
 
+import re
+
+__version__ = '0.2'
+
 NOMINAL_SIZE = 2
 
 CLASS_LINE = 'line'
@@ -120,6 +124,8 @@ class AsciiArtImage:
        The resulting list of shapes is also stored here.
     """
     QUOTATION_CHARACTERS = list('"\'`')
+    QUOTATION_RE = re.compile('[%s]' % re.escape(''.join(QUOTATION_CHARACTERS)))
+    MARK_RE = re.compile('[^ ]')
 
     def __init__(self, text, aspect_ratio=1, textual=False):
         """Take a ASCII art figure and store it, prepare for ``recognize``"""
@@ -129,17 +135,19 @@ class AsciiArtImage:
         # detect size of input image
         self.image = []
         max_x = 0
-        for y, line in enumerate(text.splitlines()):
+        for line in text.splitlines():
             max_x = max(max_x, len(line))
             self.image.append(line)
         self.width = max_x
-        self.height = y+1
+        self.height = len(self.image)
         # make sure it's rectangular
         for y, line in enumerate(self.image):
             if len(line) < max_x:
                 self.image[y] = line + ' '*(max_x-len(line))
-        # initialize other data structures
-        self.classification = [[None]*self.width for y in range(self.height)]
+        # the image and the classification are stored as flat sequences, the
+        # character at x, y has the index y*width + x
+        self.grid = ''.join(self.image)
+        self.classification = [None]*len(self.grid)
         self.shapes = []
         self.nominal_size = NOMINAL_SIZE
 
@@ -153,20 +161,21 @@ class AsciiArtImage:
            functions.
         """
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.image[y][x]
+            return self.grid[y*self.width + x]
         else:
             return ' '
 
     def tag(self, coordinates, classification):
         """Tag coordinates as used, store classification"""
+        width = self.width
         for x, y in coordinates:
-            self.classification[y][x] = classification
+            self.classification[y*width + x] = classification
 
     def cls(self, x, y):
         """get tag at coordinate"""
-        try:
-            return self.classification[y][x]
-        except IndexError:
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.classification[y*self.width + x]
+        else:
             return 'outside'
 
     # Coordinate conversion and shifting
@@ -187,55 +196,35 @@ class AsciiArtImage:
                 #~ if self.classification[y][x] is None:
                     #~ if character.isalnum():
                         #~ self.shapes.extend(self._follow_horizontal_string(x, y))
+        grid = self.grid
+        width = self.width
+        classification = self.classification
+        shapes = self.shapes
         # search for quoted texts
-        for y in range(self.height):
-            for x in range(self.width):
-                #if not yet classified, check for a line
-                character = self.image[y][x]
-                if character in self.QUOTATION_CHARACTERS:
-                    self.shapes.extend(self._follow_horizontal_string(x, y, quoted=True))
+        for match in self.QUOTATION_RE.finditer(grid):
+            y, x = divmod(match.start(), width)
+            shapes.extend(self._follow_horizontal_string(x, y, quoted=True))
+
+        # only the positions of non space characters need to be scanned
+        marks = [match.start() for match in self.MARK_RE.finditer(grid)]
 
         # search for standard shapes
-        for y in range(self.height):
-            for x in range(self.width):
-                #if not yet classified, check for a line
-                character = self.image[y][x]
-                if self.classification[y][x] is None:
-                    if character == '-':
-                        self.shapes.extend(self._follow_horizontal_line(x, y))
-                    elif character == '|':
-                        self.shapes.extend(self._follow_vertical_line(x, y))
-                    elif character == '_':
-                        self.shapes.extend(self._follow_lower_horizontal_line(x, y))
-                    elif character == '~':
-                        self.shapes.extend(self._follow_upper_horizontal_line(x, y))
-                    elif character == '=':
-                        self.shapes.extend(self._follow_horizontal_line(x, y, thick=True))
-                    elif character in '\\/':
-                        self.shapes.extend(self._follow_rounded_edge(x, y))
-                    if character == '+':
-                        self.shapes.extend(self._plus_joiner(x, y))
-                    #~ if character in self.FILL_CHARACTERS \
-                        #~ and ((self.get(x+1,y) == character and self.get(x+2,y) == character) \
-                             #~ or self.get(x,y+1) == character):
-                    elif character in self.FIXED_CHARACTERS:
-                        self.shapes.extend(self.get_fixed_character(character)(x, y))
-                        self.tag([(x,y)], CLASS_FIXED)
-                    elif character in self.FILL_CHARACTERS:
-                        if self.textual:
-                            if self.get(x,y+1) == character:
-                                self.shapes.extend(self._follow_fill(character, x, y))
-                        else:
-                            if (self.get(x+1,y) == character or self.get(x,y+1) == character):
-                                self.shapes.extend(self._follow_fill(character, x, y))
+        shape_functions = {}
+        for character, function_name in self.SHAPE_FUNCTIONS.items():
+            shape_functions[character] = getattr(self, function_name)
+        for index in marks:
+            #if not yet classified, check for a shape starting here
+            if classification[index] is None:
+                function = shape_functions.get(grid[index])
+                if function is not None:
+                    y, x = divmod(index, width)
+                    shapes.extend(function(x, y))
 
         #search for short strings too
-        for y in range(self.height):
-            for x in range(self.width):
-                character = self.image[y][x]
-                if self.classification[y][x] is None:
-                    if character != ' ':
-                        self.shapes.extend(self._follow_horizontal_string(x, y, accept_anything=True))
+        for index in marks:
+            if classification[index] is None:
+                y, x = divmod(index, width)
+                shapes.extend(self._follow_horizontal_string(x, y, accept_anything=True))
 
     # - - - - - - - - - helper function for some shapes - - - - - - - - -
     # use complex numbers as 2D vectors as that means easy transformations like
@@ -527,6 +516,46 @@ class AsciiArtImage:
                 return getattr(self, function_name)
         raise ValueError('no such character')
 
+    # - - - - - - - - - character classes - - - - - - - - -
+
+    def _follow_thick_horizontal_line(self, x, y):
+        return self._follow_horizontal_line(x, y, thick=True)
+
+    def _fixed_character(self, x, y):
+        """a fixed character, it's drawn as is"""
+        shapes = self.get_fixed_character(self.get(x, y))(x, y)
+        self.tag([(x,y)], CLASS_FIXED)
+        return shapes
+
+    def _start_fill(self, x, y):
+        """a fill, if the character is repeated on the right (not in textual
+           mode) or below
+        """
+        character = self.get(x, y)
+        if self.get(x, y+1) == character or \
+                (not self.textual and self.get(x+1, y) == character):
+            return self._follow_fill(character, x, y)
+        return []
+
+    # this table maps the characters that can start a shape to the function
+    # recognizing the shape, so that the scan doesn't have to compare each
+    # character of the image with all the shape characters
+    SHAPE_FUNCTIONS = {
+        '-':    '_follow_horizontal_line',
+        '|':    '_follow_vertical_line',
+        '_':    '_follow_lower_horizontal_line',
+        '~':    '_follow_upper_horizontal_line',
+        '=':    '_follow_thick_horizontal_line',
+        '\\':   '_follow_rounded_edge',
+        '/':    '_follow_rounded_edge',
+        '+':    '_plus_joiner',
+    }
+    for character in FIXED_CHARACTERS:
+        SHAPE_FUNCTIONS[character] = '_fixed_character'
+    for character in FILL_CHARACTERS:
+        SHAPE_FUNCTIONS[character] = '_start_fill'
+    del character
+
     # - - - - - - - - - helper function for shape recognition - - - - - - - - -
 
     def _follow_vertical_line(self, x, y):
@@ -620,8 +649,12 @@ class AsciiArtImage:
 
     def _follow_line(self, x, y, dx=0, dy=0, line_character=None, arrows=True):
         """helper function for all the line functions"""
+        width = self.width
+        height = self.height
+        grid = self.grid
         # follow line in the given direction
-        while 0 <= x < self.width and 0<= y < self.height and self.get(x+dx, y+dy) == line_character:
+        while 0 <= x+dx < width and 0 <= y+dy < height and \
+                grid[(y+dy)*width + x+dx] == line_character:
             x += dx
             y += dy
         if arrows:
@@ -729,14 +762,17 @@ class AsciiArtImage:
             text.append(self.get(x, y))
             self.tag([(x, y)], CLASS_STRING)
             is_first_space = True
-            while 0 <= x+1 < self.width and self.cls(x+1, y) is None:
+            row = y*self.width
+            grid = self.grid
+            classification = self.classification
+            while 0 <= x+1 < self.width and classification[row + x+1] is None:
                 if not quoted:
-                    if self.get(x+1, y) == ' ' and not is_first_space:
+                    if grid[row + x+1] == ' ' and not is_first_space:
                         break
-                    if not accept_anything and not self.get(x+1, y).isalnum():
+                    if not accept_anything and not grid[row + x+1].isalnum():
                         break
                 x += 1
-                character = self.get(x, y)
+                character = grid[row + x]
                 if character == quotation_character:
                     break
                 text.append(character)
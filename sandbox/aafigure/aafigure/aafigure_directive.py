@@ -3,7 +3,16 @@ Implement aafigure directive for docutils.
 """
 
 import os
+import tempfile
 #~ import cStringIO
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
 import aafigure
 
 from docutils import nodes
@@ -12,6 +21,11 @@ from docutils.parsers.rst.directives import register_directive, flag
 DEFAULT_FORMAT = 'svg'
 #~ DEFAULT_FORMAT = 'png'
 
+# rendered figures are stored in this directory (relative to the generated
+# images) and reused as long as the figure text, the options and the aafigure
+# version are the same. set to None to render all figures on every run.
+CACHE_DIRECTORY = 'aafigure-cache'
+
 aafigure_counter = 0
 
 def decode_color(color_string):
@@ -26,6 +40,90 @@ def decode_color(color_string):
     return r, g, b
 
 
+class FigureCache:
+    """Content addressed store of rendered figures. Each entry is a file
+       named after a digest of the figure text, the rendering options (which
+       include the output format) and the aafigure version.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def key(self, text, options):
+        """return the cache key for rendering text with options"""
+        if isinstance(text, unicode):
+            text = text.encode('utf-8')
+        items = options.items()
+        items.sort()
+        return sha1(repr((aafigure.__version__, text, items))).hexdigest()
+
+    def get(self, key):
+        """return a stored entry or None"""
+        try:
+            f = open(os.path.join(self.directory, key), 'rb')
+        except IOError:
+            return None
+        try:
+            try:
+                return pickle.load(f)
+            except Exception:
+                # damaged entry, it is replaced after rendering
+                return None
+        finally:
+            f.close()
+
+    def put(self, key, entry):
+        """store an entry. the file is written under a temporary name and
+           renamed, so that concurrent builds never read partial entries.
+        """
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd, temp_name = tempfile.mkstemp(dir=self.directory)
+        except (IOError, OSError):
+            # the cache is an optimization only
+            return
+        try:
+            f = os.fdopen(fd, 'wb')
+            try:
+                pickle.dump(entry, f, 2)
+            finally:
+                f.close()
+            os.rename(temp_name, os.path.join(self.directory, key))
+        except (IOError, OSError):
+            os.remove(temp_name)
+
+
+def render_figure(text, options, output_name):
+    """render the figure and write it to the file output_name. return the
+       size attributes of SVG images (None for other formats). the image is
+       taken from the cache if possible.
+    """
+    if CACHE_DIRECTORY is not None:
+        cache = FigureCache(os.path.join(os.path.dirname(output_name),
+                                         CACHE_DIRECTORY))
+        key = cache.key(text, options)
+        entry = cache.get(key)
+    else:
+        cache = entry = None
+    if entry is None:
+        # render() adds the defaults to the options
+        (visitor, output) = aafigure.render(text, None, options.copy())
+        size_attrs = None
+        if options['format'] == 'svg':
+            size_attrs = visitor.get_size_attrs()
+        entry = (size_attrs, output.getvalue())
+        if cache is not None:
+            cache.put(key, entry)
+    size_attrs, data = entry
+    output = file(output_name, 'wb')
+    try:
+        output.write(data)
+    finally:
+        output.close()
+    return size_attrs
+
+
 def AAFigureDirective(name, arguments, options, content, lineno,
                   content_offset, block_text, state, state_machine):
     text = '\n'.join(content)
@@ -46,14 +144,16 @@ def AAFigureDirective(name, arguments, options, content, lineno,
         aafigure_counter += 1
 
     output_name = options['name'] + '.' + options['format'].lower()
+    # the name only determines the file name, it's not part of the image
+    render_options = options.copy()
+    del render_options['name']
     try:
-        (visitor, output) = aafigure.render(text, output_name, options)
+        size_attrs = render_figure(text, render_options, output_name)
     except aafigure.UnsupportedFormatError, e:
-        result = [state_machine.reporter.error(str(e),
+        return [state_machine.reporter.error(str(e),
             nodes.literal_block(block_text, block_text),
             line=lineno
         )]
-    output.close()
 
     if options['format'] == 'svg':
         #~ svgout.visit(aaimg, xml_header = False)
@@ -61,7 +161,7 @@ def AAFigureDirective(name, arguments, options, content, lineno,
         attributes = {'format': 'html'}
         #~ # result = [nodes.raw('', '<embed src="%s" %s type="image/svg+xml"/>' % (
         result = [nodes.raw('', '<object type="image/svg+xml" data="%s" %s>'
-                '</object>' % (output_name, visitor.get_size_attrs()),
+                '</object>' % (output_name, size_attrs),
                 **attributes)]
         #~ result = [nodes.raw('', io.getvalue(), **attributes)]
     elif options['format'] == 'pdf':
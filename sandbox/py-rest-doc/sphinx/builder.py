@@ -16,6 +16,8 @@ import time
 import types
 import codecs
 import shutil
+import struct
+import tempfile
 import cPickle as pickle
 import cStringIO as StringIO
 from os import path
@@ -38,8 +40,9 @@ from .highlighting import pygments, get_stylesheet
 from . import roles
 from . import directives
 
-ENV_PICKLE_FILENAME = 'environment.pickle'
+ENV_STORE_DIRNAME = 'environment'
 LAST_BUILD_FILENAME = 'last_build'
+SEARCH_INDEX_FILENAME = 'searchindex.idx'
 
 # Helper objects
 
@@ -142,15 +145,15 @@ class Builder(object):
     # build methods
 
     def load_env(self):
-        """Set up the build environment. Return True if a pickled file could be
-           successfully loaded, False if a new environment had to be created."""
+        """Set up the build environment. Return True if a saved environment could
+           be successfully loaded, False if a new environment had to be created."""
         if self.env:
             return
         if not self.options.freshenv:
             try:
-                self.msg('trying to load pickled env...', nonl=True)
-                self.env = BuildEnvironment.frompickle(
-                    path.join(self.outdir, ENV_PICKLE_FILENAME))
+                self.msg('trying to load saved env...', nonl=True)
+                self.env = BuildEnvironment.fromstore(
+                    path.join(self.outdir, ENV_STORE_DIRNAME))
                 self.msg('done', nobold=True)
             except Exception, err:
                 self.msg('failed: %s' % err, nobold=True)
@@ -199,17 +202,17 @@ class Builder(object):
                 self.msg(purple(filename), nonl=1, nobold=1)
             self.msg()
 
-        # save the environment
-        self.msg('pickling the env...', nonl=True)
-        self.env.topickle(path.join(self.outdir, ENV_PICKLE_FILENAME))
-        self.msg('done', nobold=True)
-
         # global actions
         self.msg('checking consistency...')
         self.env.check_consistency()
         self.msg('creating index...')
         self.env.create_index(self)
 
+        # save the environment (only the records of changed files)
+        self.msg('saving the env...', nonl=True)
+        self.env.tostore(path.join(self.outdir, ENV_STORE_DIRNAME))
+        self.msg('done', nobold=True)
+
         self.prepare_writing()
 
         if filenames:
@@ -292,6 +295,14 @@ class StandaloneHTMLBuilder(Builder):
         if not self.options.nosearchindex:
             from .search import IndexBuilder
             self.indexer = IndexBuilder()
+            # update the index of the last build
+            indexfile = path.join(self.outdir, SEARCH_INDEX_FILENAME)
+            if path.isfile(indexfile):
+                try:
+                    self.indexer.load(indexfile)
+                except (IOError, ValueError, EOFError, struct.error,
+                        pickle.PickleError):
+                    self.indexer = IndexBuilder()
         else:
             self.indexer = None
         self.docwriter = HTMLWriter(self.config)
@@ -475,13 +486,31 @@ class StandaloneHTMLBuilder(Builder):
             if path.getmtime(path.join(self.srcdir, filename)) > targetmtime:
                 yield filename
 
+    def get_index_name(self, filename):
+        return self.get_target_uri(filename)[:-5] # strip '.html'
+
     def index_file(self, filename, doctree, title):
-        # only index pages with title
-        if self.indexer is not None and title:
-            category = get_category(filename)
-            if category is not None:
-                self.indexer.feed(self.get_target_uri(filename)[:-5], # strip '.html'
-                                  category, title, doctree)
+        if self.indexer is None:
+            return
+        # only index pages with title and category
+        category = get_category(filename)
+        if title and category is not None:
+            self.indexer.feed(self.get_index_name(filename),
+                              category, title, doctree)
+        else:
+            self.indexer.remove(self.get_index_name(filename))
+
+    def dump_search_index(self):
+        # drop removed files and keep the compact index for the next update
+        self.indexer.prune(self.get_index_name(filename)
+                           for filename in self.env.all_files)
+        # the web application may have the old index mapped into memory:
+        # write a new file and rename it instead of truncating the old one
+        handle, tmpname = tempfile.mkstemp(dir=self.outdir)
+        with os.fdopen(handle, 'wb') as f:
+            self.indexer.dump(f, 'compact')
+        os.chmod(tmpname, 0644)
+        os.rename(tmpname, path.join(self.outdir, SEARCH_INDEX_FILENAME))
 
     def handle_file(self, filename, context, templatename='page'):
         ctx = self.globalcontext.copy()
@@ -502,6 +531,7 @@ class StandaloneHTMLBuilder(Builder):
     def handle_finish(self):
         if self.indexer is not None:
             self.msg('dumping search index...')
+            self.dump_search_index()
             f = open(path.join(self.outdir, 'searchindex.json'), 'w')
             self.indexer.dump(f, 'json')
             f.close()
@@ -542,12 +572,12 @@ class WebHTMLBuilder(StandaloneHTMLBuilder):
             return source_filename[:-9] # up to /
         return source_filename[:-4] + '/'
 
-    def index_file(self, filename, doctree, title):
-        # only index pages with title and category
-        if self.indexer is not None and title:
-            category = get_category(filename)
-            if category is not None:
-                self.indexer.feed(filename, category, title, doctree)
+    def get_index_name(self, filename):
+        return filename
+
+    def prepare_writing(self):
+        StandaloneHTMLBuilder.prepare_writing(self)
+        self.written_files = []
 
     def handle_file(self, filename, context, templatename='page'):
         outfilename = path.join(self.outdir, filename[:-4] + '.fpickle')
@@ -555,6 +585,7 @@ class WebHTMLBuilder(StandaloneHTMLBuilder):
         context.pop('pathto', None) # can't be pickled
         with file(outfilename, 'wb') as fp:
             pickle.dump(context, fp, 2)
+        self.written_files.append(filename)
 
         # if there is a source file, copy the source file for the "show source" link
         if context.get('sourcename'):
@@ -570,12 +601,12 @@ class WebHTMLBuilder(StandaloneHTMLBuilder):
 
         if self.indexer is not None:
             self.msg('dumping search index...')
-            f = open(path.join(self.outdir, 'searchindex.pickle'), 'w')
-            self.indexer.dump(f, 'pickle')
-            f.close()
-        # touch 'last build' file, used by the web application to determine
-        # when to reload its environment and clear the cache
-        open(path.join(self.outdir, LAST_BUILD_FILENAME), 'w').close()
+            self.dump_search_index()
+        # write the 'last build' file, used by the web application to determine
+        # when to reload its environment; it lists the written files, whose
+        # cached pages are outdated
+        with file(path.join(self.outdir, LAST_BUILD_FILENAME), 'w') as fp:
+            fp.write(''.join(filename + '\n' for filename in self.written_files))
         # copy configuration file if not present
         if not path.isfile(path.join(self.outdir, 'webconf.py')):
             shutil.copyfile(path.join(path.dirname(__file__), 'web', 'webconf.py'),
@@ -12,17 +12,24 @@ from __future__ import with_statement
 
 import re
 import os
+import copy
 import time
 import heapq
 import hashlib
+import urllib
 import difflib
+import binascii
 import itertools
+import tempfile
 import cPickle as pickle
 from os import path
+from array import array
 from string import uppercase
+from UserDict import DictMixin
+from collections import defaultdict
 
 from docutils import nodes
-from docutils.io import FileInput
+from docutils.io import FileInput, StringInput
 from docutils.core import publish_doctree
 from docutils.utils import Reporter
 from docutils.readers import standalone
@@ -45,7 +52,15 @@ default_settings = {
 
 # This is increased every time a new environment attribute is added
 # to properly invalidate pickle files.
-ENV_VERSION = 9
+ENV_VERSION = 11
+
+# Inventories keyed by source file name.
+file_inventories = ('all_files', 'metadata', 'titles', 'tocs',
+                    'toc_num_entries', 'filemodules', 'indexentries')
+
+# Inventories whose values start with (or are) the source file name.
+target_inventories = ('descrefs', 'modules', 'labels', 'toctree_relations',
+                      'tokens')
 
 
 def walk_depth(node, depth, maxdepth):
@@ -124,6 +139,194 @@ class MyContentsFilter(ContentsFilter):
         raise nodes.SkipNode
 
 
+def dotted_suffixes(name):
+    """Utility: Yield the lower case dotted suffixes of a name."""
+    parts = name.lower().split('.')
+    for idx in xrange(0, len(parts)):
+        yield '.'.join(parts[idx:])
+
+
+def char_tokens(string):
+    """
+    Utility: Return the characters of a string as (character, occurrence)
+    pairs, so that two strings share as many tokens as characters.
+    """
+    seen = defaultdict(int)
+    tokens = []
+    for char in string:
+        seen[char] += 1
+        tokens.append((char, seen[char]))
+    return tokens
+
+
+def bitmask(numbers, size):
+    """Utility: Return a long with the bits `numbers` set."""
+    bits = array('B', [0]) * ((size + 7) // 8)
+    for number in numbers:
+        bits[-1 - (number >> 3)] |= 1 << (number & 7)
+    if not bits:
+        return 0L
+    return long(binascii.hexlify(bits.tostring()), 16)
+
+
+def bit_numbers(mask, _nonzero=re.compile('[^0]')):
+    """Utility: Return the numbers of the bits set in a long."""
+    digits = '%x' % mask
+    numbers = []
+    for match in _nonzero.finditer(digits):
+        value = int(match.group(), 16)
+        base = (len(digits) - 1 - match.start()) * 4
+        for bit in xrange(4):
+            if value >> bit & 1:
+                numbers.append(base + bit)
+    return numbers
+
+
+class KeywordIndex(object):
+    """
+    Index of the dotted suffixes of module and description names, used to
+    shortlist the candidates of fuzzy keyword lookups.
+
+    A suffix can only reach a `difflib` ratio of `cutoff` if its
+    `quick_ratio()` (two times the number of common characters divided by
+    the total length) does.  The index keeps a bit mask of the suffixes
+    per character token (see `char_tokens`) and per length; the common
+    characters of all suffixes are counted at once by adding the masks of
+    the keyword's tokens in bit slices.
+    """
+
+    def __init__(self, entries):
+        # list of (type, filename, title, description)
+        self.entries = entries
+        # distinct suffixes and the entries they belong to
+        self.suffixes = []
+        self.suffix_entries = []
+        numbers = {}
+        tokens = defaultdict(list)
+        lengths = defaultdict(list)
+        for entry_number, entry in enumerate(entries):
+            for suffix in dotted_suffixes(entry[2]):
+                number = numbers.get(suffix)
+                if number is None:
+                    number = numbers[suffix] = len(self.suffixes)
+                    self.suffixes.append(suffix)
+                    self.suffix_entries.append([])
+                    for token in char_tokens(suffix):
+                        tokens[token].append(number)
+                    lengths[len(suffix)].append(number)
+                self.suffix_entries[number].append(entry_number)
+        size = len(self.suffixes)
+        self.all = (1L << size) - 1
+        # token -> mask of the suffixes containing it
+        self.tokens = dict((token, bitmask(suffixes, size))
+                           for token, suffixes in tokens.iteritems())
+        # length -> mask of the suffixes of that length
+        self.lengths = dict((length, bitmask(suffixes, size))
+                            for length, suffixes in lengths.iteritems())
+
+    def candidates(self, keyword, cutoff):
+        """
+        Return the numbers of the suffixes whose quick ratio with `keyword`
+        reaches `cutoff` (a superset of those whose ratio does).
+        """
+        length = len(keyword)
+        if not length:
+            return range(len(self.suffixes))
+        # count the common characters: slices[i] has bit i of the counts
+        slices = []
+        for token in char_tokens(keyword):
+            carry = self.tokens.get(token, 0)
+            for i in xrange(len(slices)):
+                if not carry:
+                    break
+                slices[i], carry = slices[i] ^ carry, slices[i] & carry
+            if carry:
+                slices.append(carry)
+        result = 0
+        for suffix_length, mask in self.lengths.iteritems():
+            # common characters needed, computed like difflib does
+            total = length + suffix_length
+            needed = 0
+            while 2.0 * needed / total < cutoff:
+                needed += 1
+            if needed > min(length, suffix_length):
+                continue
+            if needed >> len(slices):
+                continue
+            # mask of the counts >= needed
+            greater, equal = 0, self.all
+            for i in xrange(len(slices) - 1, -1, -1):
+                if needed >> i & 1:
+                    equal &= slices[i]
+                else:
+                    greater |= equal & slices[i]
+                    equal &= self.all ^ slices[i]
+            result |= (greater | equal) & mask
+        return bit_numbers(result)
+
+
+class CopyOnWriteDict(DictMixin):
+    """
+    A dictionary on top of `base` that keeps all changes to itself.
+    Values of `base` returned by `setdefault` are copied first, since the
+    environment changes the lists and sets it gets from there.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.changed = {}
+        self.removed = set()
+
+    def __getitem__(self, key):
+        try:
+            return self.changed[key]
+        except KeyError:
+            if key in self.removed:
+                raise
+            return self.base[key]
+
+    def __setitem__(self, key, value):
+        self.changed[key] = value
+        self.removed.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.changed.pop(key, None)
+        if key in self.base:
+            self.removed.add(key)
+
+    def __contains__(self, key):
+        return key in self.changed or (key in self.base and
+                                       key not in self.removed)
+
+    def __iter__(self):
+        for key in self.changed:
+            yield key
+        for key in self.base:
+            if key not in self.changed and key not in self.removed:
+                yield key
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        return [key for key in self]
+
+    def iteritems(self):
+        for key in self:
+            yield key, self[key]
+
+    def setdefault(self, key, default=None):
+        if key in self.changed:
+            return self.changed[key]
+        if key in self.base and key not in self.removed:
+            value = self[key] = copy.copy(self.base[key])
+        else:
+            value = self[key] = default
+        return value
+
+
 class BuildEnvironment:
     """
     The environment in which the ReST files are translated.
@@ -137,6 +340,12 @@ class BuildEnvironment:
 
     # --------- ENVIRONMENT PERSISTENCE ----------------------------------------
 
+    def __getstate__(self):
+        # the keyword index is created again when needed
+        state = self.__dict__.copy()
+        state['keyword_index'] = None
+        return state
+
     @staticmethod
     def frompickle(filename):
         with open(filename, 'rb') as picklefile:
@@ -154,6 +363,181 @@ class BuildEnvironment:
         # reset stream
         self.set_warning_stream(wstream)
 
+    # The environment can also be saved as a store: a directory with one
+    # record per source file (holding all inventory entries of the file)
+    # and a pickle of the rest, so that an update only rewrites the records
+    # of the files read anew and readers can reload just those records.
+
+    @staticmethod
+    def _load_store_global(dirname):
+        with open(path.join(dirname, 'global.pickle'), 'rb') as picklefile:
+            env = pickle.load(picklefile)
+        if env.version != ENV_VERSION:
+            raise IOError('env version not current')
+        return env
+
+    @staticmethod
+    def _store_record_name(dirname, filename):
+        return path.join(dirname, 'files', urllib.quote(filename, '') + '.pickle')
+
+    def _load_store_record(self, dirname, filename):
+        with open(self._store_record_name(dirname, filename), 'rb') as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def fromstore(dirname):
+        env = BuildEnvironment._load_store_global(dirname)
+        for filename in env.store_serials:
+            env.add_file_record(filename,
+                                env._load_store_record(dirname, filename))
+        return env
+
+    def tostore(self, dirname):
+        """
+        Save the environment in the store `dirname`. Only the records of
+        files read or removed since the last save are written, unless the
+        store doesn't exist yet.
+        """
+        recorddir = path.join(dirname, 'files')
+        if not path.isdir(recorddir):
+            os.makedirs(recorddir)
+        write_all = not path.isfile(path.join(dirname, 'global.pickle'))
+        if write_all:
+            to_write = set(self.all_files)
+            self.store_serials = {}
+        else:
+            to_write = self.dirty_files & set(self.all_files)
+        self.store_serial += 1
+        for filename in self.dirty_files - set(self.all_files):
+            self.store_serials.pop(filename, None)
+            try:
+                os.unlink(self._store_record_name(dirname, filename))
+            except OSError:
+                pass
+        for filename, record in self.get_file_records(to_write).iteritems():
+            self._write_atomically(self._store_record_name(dirname, filename),
+                                   record)
+            self.store_serials[filename] = self.store_serial
+        if write_all:
+            # remove records left over from another environment
+            current = set(path.basename(self._store_record_name(dirname, fn))
+                          for fn in self.all_files)
+            for name in os.listdir(recorddir):
+                if name not in current:
+                    os.unlink(path.join(recorddir, name))
+        self.dirty_files = set()
+
+        # pickle the rest of the environment
+        saved = {}
+        for name in file_inventories + target_inventories + (
+            'files_to_rebuild', 'versionchanges'):
+            saved[name] = getattr(self, name)
+            setattr(self, name, {})
+        wstream = self.warning_stream
+        self.set_warning_stream(None)
+        try:
+            self._write_atomically(path.join(dirname, 'global.pickle'), self)
+        finally:
+            self.__dict__.update(saved)
+            self.set_warning_stream(wstream)
+
+    def _write_atomically(self, filename, obj):
+        # readers of the store never see half-written files
+        handle, tmpname = tempfile.mkstemp(dir=path.dirname(filename))
+        with os.fdopen(handle, 'wb') as f:
+            pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+        os.chmod(tmpname, 0644)
+        os.rename(tmpname, filename)
+
+    def updated_from_store(self, dirname):
+        """
+        Return a copy of the environment updated to the current state of the
+        store `dirname` and the set of source files whose record changed.
+        Only changed records are loaded; the environment itself is left
+        alone, so it can be replaced by the copy while it is still in use.
+        """
+        env = self._load_store_global(dirname)
+        changed = set(filename for filename, serial
+                      in env.store_serials.iteritems()
+                      if self.store_serials.get(filename) != serial)
+        changed.update(set(self.store_serials) - set(env.store_serials))
+        for name in file_inventories + target_inventories:
+            setattr(env, name, getattr(self, name).copy())
+        env.files_to_rebuild = dict((filename, set(files)) for filename, files
+                                    in self.files_to_rebuild.iteritems())
+        env.versionchanges = dict((version, changes[:]) for version, changes
+                                  in self.versionchanges.iteritems())
+        for filename in changed:
+            env.clear_file(filename)
+            if filename in env.store_serials:
+                env.add_file_record(filename,
+                                    env._load_store_record(dirname, filename))
+        env.dirty_files = set()
+        return env, changed
+
+    def overlay(self):
+        """
+        Return an environment for reading single files (e.g. previews of
+        edits) that leaves this one alone: its inventories are copy-on-write
+        views of the inventories of this environment.
+        """
+        env = copy.copy(self)
+        for name in file_inventories + target_inventories + (
+            'files_to_rebuild', 'versionchanges'):
+            setattr(env, name, CopyOnWriteDict(getattr(self, name)))
+        env.settings = self.settings.copy()
+        env.settings['env'] = env
+        env.dirty_files = set()
+        return env
+
+    def get_file_records(self, filenames):
+        """
+        Return a dictionary of the inventory records of `filenames`, see
+        `add_file_record`.
+        """
+        records = {}
+        for filename in filenames:
+            records[filename] = dict(
+                entries=dict((name, getattr(self, name)[filename])
+                             for name in file_inventories
+                             if filename in getattr(self, name)),
+                targets=dict((name, {}) for name in target_inventories),
+                includes=[],
+                versionchanges=[])
+        for name in target_inventories:
+            for key, value in getattr(self, name).iteritems():
+                if name == 'tokens':
+                    record = records.get(value)
+                else:
+                    record = records.get(value[0])
+                if record is not None:
+                    record['targets'][name][key] = value
+        for includefile, files in self.files_to_rebuild.iteritems():
+            for filename in files:
+                if filename in records:
+                    records[filename]['includes'].append(includefile)
+        for version, changes in self.versionchanges.iteritems():
+            for change in changes:
+                if change[1] in records:
+                    records[change[1]]['versionchanges'].append(
+                        (version, change))
+        return records
+
+    def add_file_record(self, filename, record):
+        """
+        Add the inventory entries of `filename` from a record created by
+        `get_file_records` (use `clear_file` first to replace them).
+        """
+        self.keyword_index = None
+        for name, value in record['entries'].iteritems():
+            getattr(self, name)[filename] = value
+        for name, targets in record['targets'].iteritems():
+            getattr(self, name).update(targets)
+        for includefile in record['includes']:
+            self.files_to_rebuild.setdefault(includefile, set()).add(filename)
+        for version, change in record['versionchanges']:
+            self.versionchanges.setdefault(version, []).append(change)
+
     # --------- ENVIRONMENT INITIALIZATION -------------------------------------
 
     def __init__(self, srcdir, doctreedir):
@@ -175,6 +559,14 @@ class BuildEnvironment:
         # this is to invalidate old pickles
         self.version = ENV_VERSION
 
+        # Fuzzy keyword lookup index, created when needed
+        self.keyword_index = None
+
+        # Sharded store state
+        self.store_serial = 0       # incremented every time the store is saved
+        self.store_serials = {}     # filename -> serial of its record in the store
+        self.dirty_files = set()    # files read or removed since the store was saved
+
         # Build times -- to determine changed files
         # Also use this as an inventory of all existing and built filenames.
         self.all_files = {}         # filename -> (mtime, md5) at the time of build
@@ -220,12 +612,21 @@ class BuildEnvironment:
     def clear_file(self, filename):
         """Remove all traces of a source file in the inventory."""
         if filename in self.all_files:
+            self.dirty_files.add(filename)
+            self.keyword_index = None
             self.all_files.pop(filename, None)
             self.metadata.pop(filename, None)
             self.titles.pop(filename, None)
             self.tocs.pop(filename, None)
             self.toc_num_entries.pop(filename, None)
-            self.files_to_rebuild.pop(filename, None)
+            # relations noted by the toctrees of this file
+            for includefile, relations in self.toctree_relations.items():
+                if relations[0] == filename:
+                    del self.toctree_relations[includefile]
+            # (sets and lists are replaced, not changed, for overlays)
+            for includefile, files in self.files_to_rebuild.items():
+                if filename in files:
+                    self.files_to_rebuild[includefile] = files - set([filename])
 
             for fullname, (fn, _) in self.descrefs.items():
                 if fn == filename:
@@ -243,7 +644,8 @@ class BuildEnvironment:
             self.indexentries.pop(filename, None)
             for version, changes in self.versionchanges.items():
                 new = [change for change in changes if change[1] != filename]
-                changes[:] = new
+                if len(new) != len(changes):
+                    self.versionchanges[version] = new
 
     def get_outdated_files(self, config):
         """
@@ -309,9 +711,11 @@ class BuildEnvironment:
 
     # --------- SINGLE FILE BUILDING -------------------------------------------
 
-    def read_file(self, filename, src_path=None, save_parsed=True):
+    def read_file(self, filename, src_path=None, save_parsed=True,
+                  source=None):
         """Parse a file and add/update inventory entries for the doctree.
-        If srcpath is given, read from a different source file."""
+        If srcpath is given, read from a different source file; if source
+        is given, parse that string instead."""
         # remove all inventory entries for that file
         self.clear_file(filename)
 
@@ -319,18 +723,30 @@ class BuildEnvironment:
             src_path = path.join(self.srcdir, filename)
 
         self.filename = filename
-        doctree = publish_doctree(None, src_path, FileInput,
-                                  settings_overrides=self.settings,
-                                  reader=MyStandaloneReader())
+        if source is None:
+            doctree = publish_doctree(None, src_path, FileInput,
+                                      settings_overrides=self.settings,
+                                      reader=MyStandaloneReader())
+        else:
+            doctree = publish_doctree(source, src_path, StringInput,
+                                      settings_overrides=self.settings,
+                                      reader=MyStandaloneReader())
         self.process_metadata(filename, doctree)
         self.create_title_from(filename, doctree)
         self.note_labels_from(filename, doctree)
         self.build_toc_from(filename, doctree)
 
         # calculate the MD5 of the file at time of build
-        with file(src_path, 'rb') as f:
-            md5 = hashlib.md5(f.read()).digest()
-        self.all_files[filename] = (path.getmtime(src_path), md5)
+        if source is None:
+            with file(src_path, 'rb') as f:
+                md5 = hashlib.md5(f.read()).digest()
+            self.all_files[filename] = (path.getmtime(src_path), md5)
+        else:
+            if isinstance(source, unicode):
+                source = source.encode('utf-8')
+            self.all_files[filename] = (time.time(),
+                                        hashlib.md5(source).digest())
+        self.dirty_files.add(filename)
 
         # make it picklable
         doctree.reporter = None
@@ -480,9 +896,11 @@ class BuildEnvironment:
                   ('WARNING: duplicate canonical description name %s, ' % fullname +
                    'in %s and %s' % (self.descrefs[fullname][0], self.filename))
         self.descrefs[fullname] = (self.filename, desctype)
+        self.keyword_index = None
 
     def note_module(self, modname, synopsis, platform):
         self.modules[modname] = (self.filename, synopsis, platform)
+        self.keyword_index = None
         self.filemodules.setdefault(self.filename, []).append(modname)
 
     def note_token(self, tokenname):
@@ -799,34 +1217,30 @@ class BuildEnvironment:
         if avoid_fuzzy:
             return
 
-        # find fuzzy matches
-        s = difflib.SequenceMatcher()
-        s.set_seq2(keyword.lower())
-
-        def possibilities():
-            for title, (fn, desc, _) in self.modules.iteritems():
-                yield ('module', fn, 'module-'+title, desc)
-            for title, (fn, desctype) in self.descrefs.iteritems():
-                yield (desctype, fn, title, '')
-
-        def dotsearch(string):
-            parts = string.lower().split('.')
-            for idx in xrange(0, len(parts)):
-                yield '.'.join(parts[idx:])
-
-        result = []
-        for type, filename, title, desc in possibilities():
-            best_res = 0
-            for part in dotsearch(title):
-                s.set_seq1(part)
-                if s.real_quick_ratio() >= cutoff and \
-                   s.quick_ratio() >= cutoff and \
-                   s.ratio() >= cutoff and \
-                   s.ratio() > best_res:
-                    best_res = s.ratio()
-            if best_res:
-                result.append((best_res, type, filename, title, desc))
+        # find fuzzy matches, scoring only the names the index shortlists
+        if self.keyword_index is None:
+            entries = [('module', fn, 'module-'+title, desc)
+                       for title, (fn, desc, _) in self.modules.iteritems()]
+            entries.extend((desctype, fn, title, '')
+                           for title, (fn, desctype) in self.descrefs.iteritems())
+            self.keyword_index = KeywordIndex(entries)
+        index = self.keyword_index
 
+        s = difflib.SequenceMatcher()
+        keyword = keyword.lower()
+        s.set_seq2(keyword)
+
+        best_res = {}
+        for number in index.candidates(keyword, cutoff):
+            s.set_seq1(index.suffixes[number])
+            ratio = s.ratio()
+            if ratio >= cutoff:
+                for entry_number in index.suffix_entries[number]:
+                    if ratio > best_res.get(entry_number, 0):
+                        best_res[entry_number] = ratio
+
+        result = [(ratio,) + index.entries[entry_number]
+                  for entry_number, ratio in best_res.iteritems()]
         return heapq.nlargest(n, result)
 
     def get_real_filename(self, filename):
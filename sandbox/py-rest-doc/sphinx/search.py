@@ -5,12 +5,29 @@
 
     Create a search index for offline search.
 
+    Besides the JSON and pickle dumps of the index (used by the offline
+    search), the index can be written in a compact binary format: a
+    pickled header with the file names, titles, categories and the term
+    directory, followed by the posting lists.  Each posting list holds
+    the sorted file ids (delta encoded) and the term frequencies as
+    variable-length integers; the posting lists are only decoded when a
+    term is queried, so the file can be used through a memory map.
+
     :copyright: 2007 by Armin Ronacher.
     :license: Python license.
 """
+from __future__ import with_statement
+
 import re
-import pickle
+import mmap
+import math
+import struct
+import cPickle as pickle
 
+from array import array
+from bisect import bisect_left
+from itertools import izip
+from operator import itemgetter
 from collections import defaultdict
 from docutils.nodes import Text, NodeVisitor
 from .stemmer import PorterStemmer
@@ -19,6 +36,8 @@ from .json import dump_json
 
 word_re = re.compile(r'\w+(?u)')
 
+COMPACT_MAGIC = 'SPXIDX01'
+
 
 class Stemmer(PorterStemmer):
     """
@@ -44,10 +63,68 @@ class WordCollector(NodeVisitor):
             self.found_words.extend(word_re.findall(node.astext()))
 
 
+def encode_numbers(numbers, buffer):
+    """Append `numbers` to the byte array `buffer` as varints."""
+    for number in numbers:
+        while number >= 0x80:
+            buffer.append(number & 0x7f | 0x80)
+            number >>= 7
+        buffer.append(number)
+
+
+def decode_numbers(data):
+    """Decode a string of varints as written by `encode_numbers`."""
+    numbers = []
+    number = shift = 0
+    for char in data:
+        byte = ord(char)
+        number |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            numbers.append(number)
+            number = shift = 0
+    return numbers
+
+
+def intersect(lists):
+    """
+    Intersect sorted lists of integers. The shortest list is probed
+    against the others by galloping (exponential search followed by
+    a binary search), so long posting lists are mostly skipped.
+    """
+    lists = sorted(lists, key=len)
+    if not lists:
+        return []
+    result = lists[0]
+    for other in lists[1:]:
+        matches = []
+        lo = 0
+        end = len(other)
+        for item in result:
+            bound = 1
+            while lo + bound < end and other[lo + bound] < item:
+                bound *= 2
+            lo = bisect_left(other, item, lo, min(lo + bound + 1, end))
+            if lo == end:
+                break
+            if other[lo] == item:
+                matches.append(item)
+                lo += 1
+        result = matches
+        if not result:
+            break
+    return result
+
+
 class IndexBuilder(object):
     """
     Helper class that creates a searchindex based on the doctrees
     passed to the `feed` method.
+
+    An index written in the compact format can be loaded again; feeding
+    a file that is already indexed replaces its entries, so only changed
+    files have to be fed for an update.
     """
     formats = {
         'json':     dump_json,
@@ -56,67 +133,227 @@ class IndexBuilder(object):
 
     def __init__(self):
         self._filenames = {}
+        # term -> {file id: term frequency}
         self._mapping = {}
         self._titles = {}
         self._categories = {}
+        # file id -> terms of the file, needed to remove a file
+        self._file_terms = {}
+        self._next_id = 0
         self._stemmer = Stemmer()
+        self._stems = {}
+
+    def load(self, filename):
+        """Load an index written with ``dump(stream, 'compact')``."""
+        index = CompactIndex.load(filename)
+        self.__init__()
+        self._filenames = dict((name, fid) for fid, name
+                               in enumerate(index.filenames))
+        self._titles = dict(enumerate(index.titles))
+        self._categories = dict((category, set(ids)) for category, ids
+                                in index.areas.iteritems())
+        file_terms = defaultdict(list)
+        for term in index.terms:
+            ids, counts = index.postings(term)
+            self._mapping[term] = dict(izip(ids, counts))
+            for fid in ids:
+                file_terms[fid].append(term)
+        self._file_terms = dict(file_terms)
+        self._next_id = len(index.filenames)
 
     def dump(self, stream, format):
         """Dump the freezed index to a stream."""
-        stream.write(self.formats[format](self.freeze()))
+        if format == 'compact':
+            self.dump_compact(stream)
+        else:
+            stream.write(self.formats[format](self.freeze()))
+
+    def _numbering(self):
+        """
+        Return the indexed file names and a mapping of the file ids
+        to consecutive numbers (removed files leave gaps in the ids).
+        """
+        order = sorted(self._filenames.items(), key=itemgetter(1))
+        return order, dict((fid, number) for number, (name, fid)
+                           in enumerate(order))
 
     def freeze(self):
         """
-        Create a useable data structure. You can pass this output
-        to the `SearchFrontend` to search the index.
+        Create a useable data structure. This is the format of the
+        JSON and pickle dumps used by the offline search.
         """
+        order, numbers = self._numbering()
         return [
-            [k for k, v in sorted(self._filenames.items(),
-                                  key=lambda x: x[1])],
-            dict(item for item in sorted(self._categories.items(),
-                                         key=lambda x: x[0])),
-            [v for k, v in sorted(self._titles.items(),
-                                  key=lambda x: x[0])],
-            dict(item for item in sorted(self._mapping.items(),
-                                         key=lambda x: x[0])),
+            [name for name, fid in order],
+            dict((category, sorted(numbers[fid] for fid in ids))
+                 for category, ids in sorted(self._categories.items())
+                 if ids),
+            [self._titles[fid] for name, fid in order],
+            dict((term, sorted(numbers[fid] for fid in postings))
+                 for term, postings in sorted(self._mapping.items())),
         ]
 
+    def dump_compact(self, stream):
+        """
+        Write the index in the compact format that can be read with
+        `CompactIndex`.
+        """
+        order, numbers = self._numbering()
+        postings = array('B')
+        terms = {}
+        for term in sorted(self._mapping):
+            entries = sorted((numbers[fid], count) for fid, count
+                             in self._mapping[term].iteritems())
+            values = []
+            last = 0
+            for fid, count in entries:
+                values.append(fid - last)
+                values.append(count)
+                last = fid
+            start = len(postings)
+            encode_numbers(values, postings)
+            terms[term] = (start, len(postings) - start)
+        header = pickle.dumps((
+            [name for name, fid in order],
+            [self._titles[fid] for name, fid in order],
+            dict((category, sorted(numbers[fid] for fid in ids))
+                 for category, ids in self._categories.iteritems() if ids),
+            terms,
+        ), 2)
+        stream.write(COMPACT_MAGIC)
+        stream.write(struct.pack('<I', len(header)))
+        stream.write(header)
+        stream.write(postings.tostring())
+
+    def stem(self, word):
+        """Return the (cached) stem of a lower case `word`."""
+        try:
+            return self._stems[word]
+        except KeyError:
+            stem = self._stems[word] = self._stemmer.stem(word)
+            return stem
+
     def feed(self, filename, category, title, doctree):
         """Feed a doctree to the index."""
-        file_id = self._filenames.setdefault(filename, len(self._filenames))
+        self.remove(filename)
+        file_id = self._filenames[filename] = self._next_id
+        self._next_id += 1
         self._titles[file_id] = title
         visitor = WordCollector(doctree)
         doctree.walk(visitor)
         self._categories.setdefault(category, set()).add(file_id)
+        counts = defaultdict(int)
         for word in word_re.findall(title) + visitor.found_words:
-            self._mapping.setdefault(self._stemmer.stem(word.lower()),
-                                     set()).add(file_id)
+            counts[self.stem(word.lower())] += 1
+        for term, count in counts.iteritems():
+            self._mapping.setdefault(term, {})[file_id] = count
+        self._file_terms[file_id] = counts.keys()
+
+    def remove(self, filename):
+        """Remove a file from the index (if it is indexed)."""
+        file_id = self._filenames.pop(filename, None)
+        if file_id is None:
+            return
+        del self._titles[file_id]
+        for ids in self._categories.itervalues():
+            ids.discard(file_id)
+        for term in self._file_terms.pop(file_id, ()):
+            postings = self._mapping[term]
+            del postings[file_id]
+            if not postings:
+                del self._mapping[term]
+
+    def prune(self, filenames):
+        """Remove all files that are not in `filenames` from the index."""
+        filenames = set(filenames)
+        for filename in self._filenames.keys():
+            if filename not in filenames:
+                self.remove(filename)
+
+
+class CompactIndex(object):
+    """
+    Read access to an index in the compact format. `data` is a string
+    or a memory map with the contents of the index file.
+    """
+
+    def __init__(self, data):
+        if data[:len(COMPACT_MAGIC)] != COMPACT_MAGIC:
+            raise ValueError('not a compact search index')
+        start = len(COMPACT_MAGIC) + 4
+        length, = struct.unpack('<I', data[len(COMPACT_MAGIC):start])
+        self.filenames, self.titles, self.areas, self.terms = \
+            pickle.loads(data[start:start + length])
+        self._data = data
+        self._offset = start + length
+
+    @classmethod
+    def load(cls, filename):
+        """Map the index file `filename` into memory."""
+        with open(filename, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data)
+
+    def postings(self, term):
+        """Return the sorted file ids and the frequencies of `term`."""
+        try:
+            start, length = self.terms[term]
+        except KeyError:
+            return [], []
+        start += self._offset
+        values = decode_numbers(self._data[start:start + length])
+        ids = []
+        fid = 0
+        for delta in values[::2]:
+            fid += delta
+            ids.append(fid)
+        return ids, values[1::2]
 
 
 class SearchFrontend(object):
     """
     This class acts as a frontend for the search index. It can search
-    a searchindex as provided by `IndexBuilder`.
+    a `CompactIndex` as written by `IndexBuilder`.
     """
 
     def __init__(self, index):
-        self.filenames, self.areas, self.titles, self.words = index
+        self.index = index
+        self.filenames = index.filenames
+        self.titles = index.titles
+        self.areas = index.areas
         self._stemmer = Stemmer()
 
     def query(self, required, excluded, areas):
-        file_map = defaultdict(set)
-        for word in required:
-            if word not in self.words:
-                break
-            for fid in self.words[word]:
-                file_map[fid].add(word)
-
-        return sorted(((self.filenames[fid], self.titles[fid])
-            for fid, words in file_map.iteritems()
-            if len(words) == len(required) and
-               any(fid in self.areas.get(area, ()) for area in areas) and not
-               any(fid in self.words.get(word, ()) for word in excluded)
-        ), key=lambda x: x[1].lower())
+        """
+        Return the (filename, title) pairs of the files containing all
+        `required` and none of the `excluded` terms in one of the `areas`,
+        best matches first. Files are ranked by the frequencies of the
+        required terms, weighted by the rarity of the terms (tf-idf).
+        """
+        postings = [self.index.postings(word) for word in required]
+        matches = intersect([ids for ids, counts in postings])
+        if not matches:
+            return []
+        allowed = set()
+        for area in areas:
+            allowed.update(self.areas.get(area, ()))
+        for word in excluded:
+            allowed.difference_update(self.index.postings(word)[0])
+
+        total = float(len(self.filenames))
+        weighted = [(ids, counts, math.log(1 + total / len(ids)))
+                    for ids, counts in postings]
+        results = []
+        for fid in matches:
+            if fid not in allowed:
+                continue
+            score = 0.0
+            for ids, counts, idf in weighted:
+                score += (1 + math.log(counts[bisect_left(ids, fid)])) * idf
+            results.append((-score, self.titles[fid].lower(), fid))
+        results.sort()
+        return [(self.filenames[fid], self.titles[fid])
+                for score, title, fid in results]
 
     def search(self, searchstring, areas):
         required = set()
@@ -21,9 +21,11 @@ class AdminPanel(object):
 
     def __init__(self, app):
         self.app = app
-        self.env = app.env
         self.userdb = app.userdb
 
+    # the application replaces its environment after a rebuild
+    env = property(lambda self: self.app.env)
+
     def dispatch(self, req, page):
         """
         Dispatch the requests for the current user in the admin panel.
@@ -55,6 +57,10 @@ class AdminPanel(object):
         elif page.split('/')[0] == 'moderate_comments':
             return self.do_moderate_comments(req, page[18:])
 
+        # response cache statistics
+        elif page == 'cache':
+            return self.do_cache(req)
+
         # missing page
         elif page != '':
             raise NotFound()
@@ -216,9 +222,13 @@ class AdminPanel(object):
             elif req.form.get('confirmed'):
                 for comment_id in to_delete:
                     try:
-                        Comment.get(comment_id).delete()
+                        comment = Comment.get(comment_id)
                     except ValueError:
                         pass
+                    else:
+                        comment.delete()
+                        self.app.cache.invalidate('comments:' +
+                                                  comment.associated_page)
                 return RedirectResponse(req.path)
             elif req.form.get('aborted'):
                 return RedirectResponse(req.path)
@@ -241,7 +251,8 @@ class AdminPanel(object):
                         c.title = req.form.get('title', '')
                         c.comment_body = req.form.get('comment_body', '')
                         c.save()
-                        self.app.cache.pop(edit_detail.associated_page, None)
+                        self.app.cache.invalidate('comments:' +
+                                                  edit_detail.associated_page)
                     return RedirectResponse(req.path)
 
         return Response(render_template(req, 'admin/moderate_comments.html', {
@@ -256,3 +267,17 @@ class AdminPanel(object):
             'ask_confirmation': req.method == 'POST' and to_delete,
             'edit_detail':      edit_detail
         }))
+
+    def do_cache(self, req):
+        """
+        Show the hit and miss counters of the response cache.
+        """
+        if req.method == 'POST':
+            if req.form.get('clear'):
+                self.app.cache.clear()
+            return RedirectResponse(req.path)
+        stats = self.app.cache.stats()
+        return Response(render_template(req, 'admin/cache.html', {
+            'stats':        stats,
+            'hit_ratio':    '%.1f%%' % (stats['hit_ratio'] * 100)
+        }))
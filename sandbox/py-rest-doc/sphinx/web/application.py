@@ -11,14 +11,11 @@
 """
 from __future__ import with_statement
 
-import os
 import re
-import copy
 import time
 import heapq
 import math
 import difflib
-import tempfile
 import threading
 import cPickle as pickle
 import cStringIO as StringIO
@@ -27,9 +24,10 @@ from itertools import groupby
 from collections import defaultdict
 
 from .feed import Feed
+from .cache import ResponseCache
 from .mail import Email
 from .util import render_template, render_simple_template, get_target_uri, \
-     blackhole_dict, striptags
+     striptags, WorkerPool
 from .admin import AdminPanel
 from .userdb import UserDatabase
 from .oldurls import handle_html_url
@@ -39,9 +37,11 @@ from .wsgiutil import Request, Response, RedirectResponse, \
      JSONResponse, SharedDataMiddleware, NotFound, get_base_uri
 
 from ..util import relative_uri, shorten_result
-from ..search import SearchFrontend
+from ..search import SearchFrontend, CompactIndex
 from ..writer import HTMLWriter
-from ..builder import LAST_BUILD_FILENAME, ENV_PICKLE_FILENAME
+from ..builder import LAST_BUILD_FILENAME, ENV_STORE_DIRNAME, \
+     SEARCH_INDEX_FILENAME
+from ..environment import BuildEnvironment
 
 from docutils.io import StringOutput
 from docutils.utils import Reporter
@@ -94,6 +94,10 @@ NoCache = object()
 def cached(inner):
     """
     Response caching system.
+
+    The generator yields a cache id (or a tuple of the cache id and the
+    dependency tags of the entry, see `ResponseCache`) and then, on a
+    cache miss, the response text.
     """
     def caching_function(self, *args, **kwds):
         gen = inner(self, *args, **kwds)
@@ -106,12 +110,15 @@ def cached(inner):
                 return response
             else:
                 return Response(response)
-        try:
-            text = self.cache[cache_id]
+        tags = ()
+        if isinstance(cache_id, tuple):
+            cache_id, tags = cache_id
+        text = self.cache.get(cache_id)
+        if text is not None:
             gen.close()
-        except KeyError:
+        else:
             text = gen.next()
-            self.cache[cache_id] = text
+            self.cache.set(cache_id, text, tags)
         return Response(text)
     return caching_function
 
@@ -122,14 +129,19 @@ class DocumentationApplication(object):
     """
 
     def __init__(self, config):
-        self.cache = blackhole_dict() if config['debug'] else {}
+        self.cache = ResponseCache(0 if config['debug'] else
+                                   config.get('cache_size', 32 * 1024 * 1024))
         self.freqmodules = defaultdict(int)
         self.last_most_frequent = []
         self.generated_stylesheets = {}
         self.config = config
         self.data_root = config['data_root_path']
+        self.preview_settings = None
+        self.preview_pool = WorkerPool(config.get('preview_workers', 2),
+                                       config.get('preview_queue_size', 8))
         self.buildfile = path.join(self.data_root, LAST_BUILD_FILENAME)
         self.buildmtime = -1
+        self.env = None
         self.load_env(0)
         self.db_con = connect(path.join(self.data_root, 'sphinx.db'))
         self.antispam = AntiSpam(path.join(self.data_root, 'bad_content'))
@@ -143,19 +155,73 @@ class DocumentationApplication(object):
             if self.buildmtime == new_mtime:
                 # happens if another thread already reloaded the env
                 return
-            print "* Loading the environment..."
-            with file(path.join(self.data_root, ENV_PICKLE_FILENAME)) as f:
-                self.env = pickle.load(f)
+            store = path.join(self.data_root, ENV_STORE_DIRNAME)
+            if self.env is None:
+                print "* Loading the environment..."
+                self.env = BuildEnvironment.fromstore(store)
+            else:
+                print "* Updating the environment..."
+                # the old environment stays usable for running requests
+                self.env = self.env.updated_from_store(store)[0]
             with file(path.join(self.data_root, 'globalcontext.pickle')) as f:
                 self.globalcontext = pickle.load(f)
-            with file(path.join(self.data_root, 'searchindex.pickle')) as f:
-                self.search_frontend = SearchFrontend(pickle.load(f))
+            self.search_frontend = SearchFrontend(CompactIndex.load(
+                path.join(self.data_root, SEARCH_INDEX_FILENAME)))
             self.buildmtime = path.getmtime(self.buildfile)
-            self.cache.clear()
+            with file(self.buildfile) as f:
+                self.invalidate_pages(f.read().splitlines())
+            self.prewarm_cache()
         finally:
             env_lock.release()
 
 
+    def invalidate_pages(self, page_ids):
+        """
+        Remove the cached renderings of the given pages and of the
+        special pages, which can depend on every page. Without a list of
+        pages the whole cache is cleared.
+        """
+        if not page_ids:
+            self.cache.clear()
+            return
+        for page_id in page_ids:
+            self.cache.invalidate('page:' + page_id)
+        self.cache.invalidate('build')
+
+
+    def prewarm_cache(self):
+        """
+        Render the pages of the most frequently viewed modules (as many as
+        the "cache_prewarm" setting says) that are not cached.
+        """
+        count = self.config.get('cache_prewarm', 0)
+        if not count:
+            return
+        page_ids = []
+        for modname, hits in heapq.nlargest(count, self.freqmodules.iteritems(),
+                                            lambda x: x[1]):
+            entry = self.env.modules.get(modname)
+            if entry is not None and entry[0] not in page_ids:
+                page_ids.append(entry[0])
+        for page_id in page_ids:
+            url = get_target_uri(page_id)
+            req = Request({
+                'REQUEST_METHOD':   'GET',
+                'PATH_INFO':        '/' + url,
+                'SERVER_NAME':      'localhost',
+                'SERVER_PORT':      '80',
+                'wsgi.url_scheme':  'http',
+                'wsgi.input':       StringIO.StringIO(),
+            })
+            try:
+                self.get_page(req, url.rstrip('/'))
+            except NotFound:
+                continue
+            # don't count this as a view
+            for modname in self.env.filemodules.get(page_id, ()):
+                self.freqmodules[modname] -= 1
+
+
     def search(self, req):
         """
         Search the database. Currently just a keyword based search.
@@ -200,19 +266,26 @@ class DocumentationApplication(object):
     def _generate_preview(self, page_id, contents):
         """
         Generate a preview for suggested changes.
-        """
-        handle, pathname = tempfile.mkstemp()
-        os.write(handle, contents.encode('utf-8'))
-        os.close(handle)
 
+        The text is parsed in an overlay of the environment, so that the
+        environment itself stays untouched.
+        """
         warning_stream = StringIO.StringIO()
-        env2 = copy.deepcopy(self.env)
+        env = self.env
+        settings = self.preview_settings
+        if settings is None or settings.env is not env:
+            # created again after the environment is replaced
+            settings = self.preview_settings = OptionParser(
+                defaults=env.settings,
+                components=(HTMLWriter(env.config),)).get_default_values()
+        env2 = env.overlay()
+        env2.set_warning_stream(warning_stream)
         destination = StringOutput(encoding='utf-8')
         writer = HTMLWriter(env2.config)
-        doctree = env2.read_file(page_id, pathname, save_parsed=False)
+        doctree = env2.read_file(page_id, save_parsed=False, source=contents)
         doctree = env2.get_and_resolve_doctree(page_id, MockBuilder(), doctree)
-        doctree.settings = OptionParser(defaults=env2.settings,
-                                        components=(writer,)).get_default_values()
+        doctree.settings = settings.copy()
+        doctree.settings.env = env2
         doctree.reporter = Reporter(page_id, 2, 4, stream=warning_stream)
         output = writer.write(doctree, destination)
         writer.assemble_parts()
@@ -248,7 +321,12 @@ class DocumentationApplication(object):
             form_error = 'Your text contains blocked URLs or words.'
         else:
             if req.form.get('preview'):
-                rendered = self._generate_preview(page_id, contents)
+                try:
+                    rendered = self.preview_pool.run(self._generate_preview,
+                                                     page_id, contents)
+                except WorkerPool.Busy:
+                    form_error = 'Too many previews are being generated, ' \
+                                 'please try again later.'
 
             else:
                 asctime = time.asctime()
@@ -357,7 +435,7 @@ class DocumentationApplication(object):
         else:
             if most_frequent != self.last_most_frequent:
                 self.cache.pop('@modindex', None)
-            yield '@modindex'
+            yield '@modindex', ('build',)
 
         filename = path.join(self.data_root, 'modindex.fpickle')
         with open(filename, 'rb') as f:
@@ -419,8 +497,7 @@ class DocumentationApplication(object):
                                  '(must have at least 20 characters).'
                 else:
                     # '|none' can stay since it doesn't include comments
-                    self.cache.pop(page_id + '|inline', None)
-                    self.cache.pop(page_id + '|bottom', None)
+                    self.cache.invalidate('comments:' + page_id)
                     comment = Comment(page_id, target,
                                       title, author, author_mail,
                                       comment_body)
@@ -525,7 +602,10 @@ class DocumentationApplication(object):
             yield NoCache
         else:
             # there must be different cache entries per comment mode
-            yield page_id + '|' + commentmode
+            tags = ['page:' + page_id]
+            if commentmode and commentmode != 'none':
+                tags.append('comments:' + page_id)
+            yield page_id + '|' + commentmode, tags
 
         # cache miss; load the page and render it
         filename = path.join(self.data_root, page_id[:-3] + 'fpickle')
@@ -542,7 +622,7 @@ class DocumentationApplication(object):
 
     @cached
     def get_special_page(self, req, name):
-        yield '@'+name
+        yield '@'+name, ('build',)
         filename = path.join(self.data_root, name + '.fpickle')
         with open(filename, 'rb') as f:
             context = pickle.load(f)
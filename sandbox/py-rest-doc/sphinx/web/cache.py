@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+    sphinx.web.cache
+    ~~~~~~~~~~~~~~~~
+
+    A size-bounded LRU cache for rendered responses.
+
+    :copyright: 2007 by Georg Brandl.
+    :license: Python license.
+"""
+from __future__ import with_statement
+
+import threading
+from collections import defaultdict
+
+
+class ResponseCache(object):
+    """
+    Stores rendered pages up to a total size of `max_size` bytes and
+    evicts the least recently used entries first.  Each entry can carry
+    dependency tags (e.g. ``'page:lib/os.rst'``); `invalidate` drops all
+    entries with a given tag.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self._lock = threading.Lock()
+        # cache id -> [previous link, next link, cache id, text, size, tags]
+        self._entries = {}
+        # root of the circular list of links, most recently used last
+        self._root = root = []
+        root[:] = [root, root, None, None, 0, ()]
+        self._tagged = defaultdict(set)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, cache_id):
+        return cache_id in self._entries
+
+    def get(self, cache_id):
+        """Return the cached text or None and count the hit or miss."""
+        with self._lock:
+            link = self._entries.get(cache_id)
+            if link is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # move to the most recently used end
+            prev, next = link[0], link[1]
+            prev[1] = next
+            next[0] = prev
+            last = self._root[0]
+            last[1] = self._root[0] = link
+            link[0] = last
+            link[1] = self._root
+            return link[3]
+
+    def set(self, cache_id, text, tags=()):
+        """Store `text`; it is dropped again if it can never fit."""
+        if isinstance(text, unicode):
+            size = len(text.encode('utf-8'))
+        else:
+            size = len(text)
+        with self._lock:
+            self._remove(cache_id)
+            if size > self.max_size:
+                return
+            last = self._root[0]
+            link = [last, self._root, cache_id, text, size, tuple(tags)]
+            last[1] = self._root[0] = self._entries[cache_id] = link
+            self.size += size
+            for tag in link[5]:
+                self._tagged[tag].add(cache_id)
+            while self.size > self.max_size:
+                self._remove(self._root[1][2])
+                self.evictions += 1
+
+    def _remove(self, cache_id):
+        link = self._entries.pop(cache_id, None)
+        if link is None:
+            return False
+        link[0][1] = link[1]
+        link[1][0] = link[0]
+        self.size -= link[4]
+        for tag in link[5]:
+            ids = self._tagged[tag]
+            ids.discard(cache_id)
+            if not ids:
+                del self._tagged[tag]
+        return True
+
+    def pop(self, cache_id, default=None):
+        with self._lock:
+            self._remove(cache_id)
+        return default
+
+    def invalidate(self, tag):
+        """Remove all entries tagged with `tag`; return their number."""
+        with self._lock:
+            ids = list(self._tagged.get(tag, ()))
+            for cache_id in ids:
+                self._remove(cache_id)
+            return len(ids)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+            self._root[:] = [self._root, self._root, None, None, 0, ()]
+            self.size = 0
+
+    def stats(self):
+        """Return a dictionary with the counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            'entries':      len(self._entries),
+            'size':         self.size,
+            'max_size':     self.max_size,
+            'hits':         self.hits,
+            'misses':       self.misses,
+            'evictions':    self.evictions,
+            'hit_ratio':    lookups and float(self.hits) / lookups or 0.0,
+        }
@@ -11,6 +11,9 @@
 from __future__ import with_statement
 
 import re
+import sys
+import Queue
+import threading
 from os import path
 
 from ..util import relative_uri
@@ -98,3 +101,48 @@ class lazy_property(object):
 class blackhole_dict(dict):
     def __setitem__(self, key, value):
         pass
+
+
+class WorkerPool(object):
+    """
+    A fixed number of worker threads running submitted functions. At
+    most `max_pending` calls wait for a worker; further submissions are
+    rejected, so that slow jobs can't tie up all request threads.
+    """
+
+    class Busy(Exception):
+        """Raised by `run` if too many calls are pending."""
+
+    def __init__(self, workers, max_pending):
+        self.queue = Queue.Queue(max_pending)
+        for i in xrange(workers):
+            thread = threading.Thread(target=self._work)
+            thread.setDaemon(True)
+            thread.start()
+
+    def _work(self):
+        while True:
+            func, args, result, done = self.queue.get()
+            try:
+                result.append(func(*args))
+            except:
+                result.append(sys.exc_info())
+                result.append(None)
+            done.set()
+
+    def run(self, func, *args):
+        """
+        Call `func` in a worker thread and return its result, re-raising
+        its exception. Raise `WorkerPool.Busy` if the queue is full.
+        """
+        result = []
+        done = threading.Event()
+        try:
+            self.queue.put_nowait((func, args, result, done))
+        except Queue.Full:
+            raise self.Busy()
+        done.wait()
+        if len(result) > 1:
+            exc_type, exc_value, tb = result[0]
+            raise exc_type, exc_value, tb
+        return result[0]
@@ -12,3 +12,15 @@ patch_mail_from = 'patches@localhost'
 patch_mail_to = 'docs@localhost'
 patch_mail_smtp = 'localhost'
 
+
+# Size of the cache for rendered pages (in bytes).
+cache_size = 32 * 1024 * 1024
+
+# Number of pages of the most frequently viewed modules to render into the
+# cache again after a rebuild (0: none).
+cache_prewarm = 0
+
+# Number of threads generating previews of suggested changes, and the
+# number of preview requests that may wait for one of them.
+preview_workers = 2
+preview_queue_size = 8
@@ -72,6 +72,22 @@ following keys:
 
 The callback must return a tuple or list of Unicode strings: the header and
 the footer.  Any of the two can be an empty string.
+
+Parallel and Incremental Conversion
+-----------------------------------
+
+The chunks (except the root chunk) are converted in a pool of worker
+processes (see the ``--chunker-processes`` option) if the
+``multiprocessing`` module is available.  Each worker receives a pickled
+copy of the chunk's section (plus the document decoration) and the URIs of
+the IDs it refers to in other chunks, so the writer class must be
+importable by the workers.
+
+A manifest (see the ``--chunker-manifest`` option) records a digest of each
+chunk: the section subtree, the URIs of its external references, the
+navigation data and the settings.  Chunks whose digest did not change since
+the previous run (and whose file still exists) are not converted again.
+The navigation callback must therefore depend on its argument only.
 """
 
 
@@ -82,6 +98,15 @@ import os
 import re
 import sys
 from types import *
+try:
+    from hashlib import md5
+except ImportError:
+    from md5 import new as md5
+try:
+    import multiprocessing
+except ImportError:
+    # multiprocessing is new in Python 2.6; convert chunks sequentially.
+    multiprocessing = None
 
 import docutils
 from docutils import io, frontend, languages, nodes, utils, writers
@@ -212,6 +237,76 @@ def validate_basename(setting, value, option_parser, config_parser=None,
                          '(or whitespace-only) string')
     return stripped
 
+def new_subdocument(settings, decoration, section, title):
+    """Create and return a new document node containing the `decoration`
+    (unless it is None) and the `section` node.  Both nodes must be detached
+    copies.  The document title is set to `title`.
+    """
+    doctree = utils.new_document(settings._source, settings)
+    if decoration is not None:
+        doctree += decoration
+    doctree += section
+    if len(section) and isinstance(section[0], nodes.title):
+        # XXX: Skip generated section number?  (Should be configurable.)
+        doctree['title'] = title
+    return doctree
+
+def translate_subdocument(writer_class, doctree, external_ids):
+    """Convert `doctree` with a new instance of `writer_class`, and return
+    the document parts.
+    """
+    writer = writer_class()
+    writer.set_external_ids(external_ids)
+    writer.write(doctree, io.NullOutput())
+    writer.assemble_parts()
+    return writer.parts
+
+def read_manifest(path):
+    """Return the mapping of quoted chunk filenames to digests stored in the
+    manifest file `path` (an empty mapping if the file does not exist).
+    """
+    manifest = {}
+    try:
+        f = open(path)
+    except IOError:
+        return manifest
+    try:
+        for line in f:
+            digest, filename = line.rstrip('\n').split(' ', 1)
+            manifest[filename] = digest
+    finally:
+        f.close()
+    return manifest
+
+def write_manifest(path, digests):
+    """Write the mapping of quoted chunk filenames to digests to the manifest
+    file `path`.
+    """
+    items = digests.items()
+    items.sort()
+    f = open(path, 'w')
+    try:
+        for filename, digest in items:
+            f.write('%s %s\n' % (digest, filename))
+    finally:
+        f.close()
+
+# Writer class and settings of a worker process (set by `_init_worker()`).
+_worker_state = None
+
+def _init_worker(writer_class, settings):
+    global _worker_state
+    _worker_state = (writer_class, settings)
+
+def _convert_in_worker(task):
+    """Convert a chunk (see `HTMLChunker.serialize_chunks()`) in a worker
+    process and return the document parts.
+    """
+    writer_class, settings = _worker_state
+    decoration, section, title, external_ids = task
+    doctree = new_subdocument(settings, decoration, section, title)
+    return translate_subdocument(writer_class, doctree, external_ids)
+
 
 class ChunkerError(Exception):
     """Base class for exceptions thrown by the chunker."""
@@ -281,6 +376,21 @@ class ChunkedHTMLWriter(writers.Writer):
           ['--chunker-no-progress'],
           {'dest': 'chunker_progress', 'default': 0, 'action': 'store_false',
            'validator': frontend.validate_boolean}),
+         ('The number of worker processes converting the chunks.  Use 0 for '
+          'one process per CPU, 1 to convert the chunks in the main process.  '
+          'The default is 0.',
+          ['--chunker-processes'],
+          {'default': 0, 'metavar': '<num>',
+           'validator': frontend.validate_nonnegative_int}),
+         ('Specify the file (relative to the destination directory) that '
+          'records a digest of each chunk.  Chunks that did not change since '
+          'the previous run are not written again.  The default is the root '
+          'filename with ".manifest" appended.',
+          ['--chunker-manifest'],
+          {'metavar': '<file>'}),
+         ('Do not use a manifest; always write all chunks.',
+          ['--chunker-no-manifest'],
+          {'dest': 'chunker_manifest', 'action': 'store_const', 'const': ''}),
     ),)
 
     def __init__(self, writer_class=None, nav_callback=None):
@@ -329,22 +439,53 @@ class ChunkedHTMLWriter(writers.Writer):
         number_of_chunks = len(chunks)
         self.output = chunker.convert_chunk(chunks[0])
         output = destination.write(self.output)
-
-        for c in chunks:
-            destpath = os.path.join(destdir, c.filename)
-            if settings.chunker_progress and root_filename:
-                n = ('%%%dd' % len(str(number_of_chunks))) % (c.number + 1)
-                print 'Writing chunk %s of %d: %s'\
-                      % (n, number_of_chunks, destpath)
-            if not c.is_root():
-                out = chunker.convert_chunk(c)
-                f = io.FileOutput(destination=None,
-                        destination_path=destpath,
-                        encoding=settings.output_encoding,
-                        error_handler=settings.output_encoding_error_handler)
-                f.write(out)
-                f.close()
-
+        progress = settings.chunker_progress and root_filename
+
+        def progress_message(c):
+            n = ('%%%dd' % len(str(number_of_chunks))) % (c.number + 1)
+            print 'Writing chunk %s of %d: %s'\
+                  % (n, number_of_chunks, os.path.join(destdir, c.filename))
+
+        def write_chunk(c, out):
+            if progress:
+                progress_message(c)
+            f = io.FileOutput(destination=None,
+                    destination_path=os.path.join(destdir, c.filename),
+                    encoding=settings.output_encoding,
+                    error_handler=settings.output_encoding_error_handler)
+            f.write(out)
+            f.close()
+
+        if progress:
+            progress_message(chunks[0])
+        chunks = chunks[1:]
+        if not chunks:
+            return output
+
+        manifest_path = None
+        if settings.chunker_manifest != '':
+            manifest_path = os.path.join(
+                destdir, settings.chunker_manifest or
+                         root_filename + '.manifest')
+            manifest = read_manifest(manifest_path)
+            digests = {}
+            changed = []
+            hashes = {}                 # the tree does not change here
+            for c in chunks:
+                digest = chunker.chunk_digest(c, hashes)
+                digests[c.quoted_filename] = digest
+                if (manifest.get(c.quoted_filename) != digest or not
+                    os.path.exists(os.path.join(destdir, c.filename))):
+                    changed.append(c)
+            if progress and len(changed) < len(chunks):
+                print 'Skipping %d unchanged chunk(s)' % (len(chunks) -
+                                                           len(changed))
+            chunks = changed
+
+        chunker.convert_chunks(chunks, write_chunk,
+                               settings.chunker_processes)
+        if manifest_path:
+            write_manifest(manifest_path, digests)
         return output
 
     def translate(self):
@@ -397,12 +538,19 @@ class HTMLChunker:
         self.relocate_meta_nodes()
 
         # The chunks are detached now, so we can build a mapping of IDs to
-        # chunks -- each ID points to the chunk it appears in.
+        # chunks -- each ID points to the chunk it appears in -- and to URIs
+        # ('filename#id' or just 'filename' for the chunk node itself).
         self.ids = {}
+        self.uris = {}
         for chunk in self.chunktree.walk():
             for node in chunk.node.traverse(nodes.Element):
                 for i in node.get('ids', []):
                     self.ids[i] = chunk
+                    if node is chunk.node:
+                        self.uris[i] = chunk.quoted_filename
+                    else:
+                        self.uris[i] = '%s#%s' % (chunk.quoted_filename, i)
+        self.decoration = self.copy_decoration()
 
         return self.chunktree.walk()
 
@@ -523,12 +671,82 @@ class HTMLChunker:
 
     def convert_chunk(self, chunk):
         """Convert the chunk to HTML and return the HTML output."""
-        doctree = self.create_subdocument(chunk)
-        writer = self.writer_class()
-        writer.set_external_ids(self.collect_external_ids(chunk))
-        writer.write(doctree, io.NullOutput())
-        writer.assemble_parts()
-        return self.assemble_html_output(chunk, writer.parts)
+        parts = translate_subdocument(self.writer_class,
+                                      self.create_subdocument(chunk),
+                                      self.collect_external_ids(chunk))
+        return self.assemble_html_output(chunk, parts)
+
+    def convert_chunks(self, chunks, callback, processes=1):
+        """Convert `chunks` (not including the root chunk, which must be
+        converted first) to HTML, and call ``callback(chunk, output)`` for
+        each of them, in order.
+
+        The chunks are converted by `processes` worker processes (0 means one
+        per CPU) if the ``multiprocessing`` module is available.
+        """
+        if multiprocessing is None or len(chunks) < 2:
+            processes = 1
+        elif not processes:
+            processes = multiprocessing.cpu_count()
+        if processes == 1:
+            for chunk in chunks:
+                callback(chunk, self.convert_chunk(chunk))
+            return
+
+        pool = multiprocessing.Pool(min(processes, len(chunks)), _init_worker,
+                                    (self.writer_class, self.settings))
+        try:
+            results = pool.imap(_convert_in_worker,
+                                self.serialize_chunks(chunks))
+            for chunk in chunks:
+                callback(chunk, self.assemble_html_output(chunk,
+                                                          results.next()))
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        pool.join()
+
+    def serialize_chunks(self, chunks):
+        """Generate the worker tasks for `chunks`: the decoration and section
+        copies, the title and the external IDs of each chunk.
+        """
+        for chunk in chunks:
+            decoration = None
+            if self.decoration is not None:
+                decoration = self.decoration.deepcopy()
+            yield (decoration, chunk.node.deepcopy(), chunk.get_title(),
+                   self.collect_external_ids(chunk))
+
+    def chunk_digest(self, chunk, hashes=None):
+        """Return a digest of everything the HTML output of `chunk` depends
+        on.  The root chunk must be converted first.  `hashes` is passed to
+        `structural_hash()` (use one dictionary for all chunks).
+        """
+        settings = [(name, value)
+                    for (name, value) in self.settings.__dict__.items()
+                    if isinstance(value, (basestring, int, long, float,
+                                          list, tuple, type(None)))
+                    and name not in ('chunker_progress', 'chunker_processes')]
+        settings.sort()
+        external_ids = self.collect_external_ids(chunk).items()
+        external_ids.sort()
+        nav_vars = self.get_navigation_vars(chunk).items()
+        nav_vars.sort()
+        digest = md5()
+        for item in ('%s.%s' % (self.writer_class.__module__,
+                                self.writer_class.__name__),
+                     settings,
+                     self.decoration and
+                     self.decoration.structural_hash(hashes),
+                     chunk.node.structural_hash(hashes),
+                     chunk.get_title(),
+                     external_ids,
+                     nav_vars,
+                     self.nav_callback(self.get_navigation_vars(chunk)),
+                     self.root_meta):
+            digest.update(repr(item))
+        return digest.hexdigest()
 
     def collect_external_ids(self, chunk):
         """Resolve external references in the chunk, and return a mapping of
@@ -536,20 +754,31 @@ class HTMLChunker:
         """
         external_ids = {}
         for node in chunk.node.traverse(nodes.Element):
-            ids = node.get('backrefs', [])
+            ids = node.get('backrefs', [])[:]
             if node.hasattr('refid'):
                 ids.append(node['refid'])
             for refid in ids:
-                refchunk = self.ids[refid]
-                if refchunk is not chunk:
-                    if self.document.ids[refid] in self.ischunk:
-                        uri = refchunk.quoted_filename
-                    else:
-                        uri = '%s#%s' % (refchunk.quoted_filename, refid)
-                    external_ids[refid] = uri
+                if self.ids[refid] is not chunk:
+                    external_ids[refid] = self.uris[refid]
 
         return external_ids
 
+    def copy_decoration(self):
+        """Return a copy of the document decoration (header and footer), or
+        None if the document has none.
+        """
+        root_decor = self.document.decoration
+        if not root_decor or not len(root_decor):
+            return None
+        decor = nodes.decoration()
+        # Note: We can't use root_decor.get_{header,footer}(), because they
+        # create the header/footer if it is missing.  We don't want that.
+        if isinstance(root_decor[0], nodes.header):
+            decor += nodes.header('', *[n.deepcopy() for n in root_decor[0]])
+        if isinstance(root_decor[-1], nodes.footer):
+            decor += nodes.footer('', *[n.deepcopy() for n in root_decor[-1]])
+        return decor
+
     def create_subdocument(self, chunk):
         """If `chunk` wraps a section node, create and return a new document
         node with the section added, otherwise return the root node.
@@ -557,39 +786,15 @@ class HTMLChunker:
         if isinstance(chunk.node, nodes.document):
             return chunk.node
 
-        # Create a new document.
-        doctree = utils.new_document(self.settings._source,
-                                     self.document.settings)
-
-        # Add the decoration (head and footer).
-        if self.document.decoration and len(self.document.decoration):
-            root_decor = self.document.decoration
-            decor = doctree.get_decoration()
-            # Note: We can't use root_decor.get_{header,footer}(), because
-            # they create the header/footer if it is missing.  We don't want
-            # that.
-            if isinstance(root_decor[0], nodes.header):
-                header = decor.get_header()
-                for n in root_decor[0]:
-                    header.append(n.deepcopy())
-            if isinstance(root_decor[-1], nodes.footer):
-                footer = decor.get_footer()
-                for n in root_decor[-1]:
-                    footer.append(n.deepcopy())
-
         ## Copy <meta> nodes.
         #for meta, dummy in self.meta_nodes:
         #    doctree.append(meta.deepcopy())
 
-        # Now add the copy of the section, and set the document node's title
-        # from the section title.
-        doctree += chunk.node.deepcopy()
-        if isinstance(doctree[-1][0], nodes.title):
-            n = doctree[-1][0]
-            # XXX: Skip generated section number?  (Should be configurable.)
-            doctree['title'] = chunk.get_title()
-
-        return doctree
+        decoration = None
+        if self.decoration is not None:
+            decoration = self.decoration.deepcopy()
+        return new_subdocument(self.settings, decoration,
+                               chunk.node.deepcopy(), chunk.get_title())
 
     def assemble_html_output(self, chunk, parts):
         """Assemble and return the HTML output for `chunk` from the HTML
@@ -685,6 +890,16 @@ class HTMLChunker:
         return u''.join(out)
 
     def create_navigation(self, chunk, parts):
+        header, footer = self.nav_callback(self.get_navigation_vars(chunk))
+        if type(header) is not unicode:
+            raise ChunkerError('Bad navigation header: not a Unicode string')
+        if type(footer) is not unicode:
+            raise ChunkerError('Bad navigation footer: not a Unicode string')
+        
+        return header, footer
+
+    def get_navigation_vars(self, chunk):
+        """Return the dictionary passed to the navigation callback."""
         vars = dict([(v, u'') for v in [
             'next', 'next_title_raw',
             'prev', 'prev_title_raw',
@@ -708,13 +923,7 @@ class HTMLChunker:
         for name in ('next_title', 'prev_title', 'parent_title', 'root_title'):
             vars[name] = attval(vars['%s_raw' % name])
 
-        header, footer = self.nav_callback(vars)
-        if type(header) is not unicode:
-            raise ChunkerError('Bad navigation header: not a Unicode string')
-        if type(footer) is not unicode:
-            raise ChunkerError('Bad navigation footer: not a Unicode string')
-        
-        return header, footer
+        return vars
 
 
 class NodeWrapper:
@@ -357,55 +357,32 @@ class Text2Words(Transform):
     """Transforms a `Text` node into a sequence of `Word`/`White`."""
 
     def apply(self):
-        self.document.walk(Text2WordsVisitor(self.document))
-
-class Text2WordsVisitor(nodes.SparseNodeVisitor):
-
-    def visit_Text(self, text):
-        words = Word.splitText(text)
-        if not words:
-            # An empty text
-            words = [ White(''), ]
-        text.parent.replace(text, words)
+        for element in self.document.traverse(nodes.Element):
+            # Backwards so the indexes of remaining texts stay valid
+            for i in xrange(len(element) - 1, -1, -1):
+                if isinstance(element[i], nodes.Text):
+                    words = Word.splitText(element[i])
+                    if not words:
+                        # An empty text
+                        words = [ White(''), ]
+                    element[i:i + 1] = words
 
 class Words2Text(Transform):
     """Transforms a sequence of `Word`/`White` into a `Text` node."""
 
     def apply(self):
-        self.document.walk(Words2TextVisitor(self.document))
-
-class Words2TextVisitor(nodes.SparseNodeVisitor):
-
-    def visit_Text(self, text):
-        parent = text.parent
-        # Find this node and the first node of the sequence it belongs to
-        first = None
-        for i in range(len(parent)):
-            if not isinstance(parent[i], nodes.Text):
-                first = None
-            elif first is None:
-                first = i
-            # ``parent.index(text)`` uses value equality - can not be
-            # used here to find `text`
-            if id(parent[i]) == id(text):
-                end = i + 1
-                break
-        else:
-            raise IndexError("Can not find %r in its parent" % ( text, ))
-
-        if (len(parent) > end
-            and isinstance(parent[end], nodes.Text)):
-            # The visitor processes following children even if they are
-            # deleted - so work for last node of a sequence
-            return
-
-        texts = nodes.Text(reduce(lambda s, node: s + node.astext(),
-                                 parent[first:end], ""))
-        parent[first:end] = ( texts, )
-
-    visit_White = visit_Text
-
-    visit_Word = visit_Text
+        for element in self.document.traverse(nodes.Element):
+            # Backwards so the indexes of remaining texts stay valid
+            end = None
+            for i in xrange(len(element), -1, -1):
+                if i and isinstance(element[i - 1], nodes.Text):
+                    if end is None:
+                        end = i
+                elif end is not None:
+                    element[i:end] = ( nodes.Text(
+                        "".join([ text.astext()
+                                  for text in element[i:end] ])), )
+                    end = None
 
 class Generated2Inline(Transform):
     """Transforms a `generated` node into an `inline` node."""
@@ -429,6 +406,10 @@ class DocutilsDispatcher(HashableNodeImpl):
 
     reporter = None
 
+    structural_hashes = None
+    """Memo for `Node.structural_hash()` while the trees are compared
+    (and not changed)."""
+
     def __init__(self, reporter):
         super(self.__class__, self).__init__(nodes.Node)
         self.reporter = reporter
@@ -444,6 +425,9 @@ class DocutilsDispatcher(HashableNodeImpl):
         except AttributeError:
             name = pat % ( 'UNKNOWN', )
             method = getattr(self, name)
+        if not self.reporter.debug_flag:
+            # Formatting the arguments is expensive
+            return method(node, *args)
         self.reporter.debug("*** %s(%s)"
                             % ( name, ", ".join([ arg.__class__.__name__
                                                   for arg
@@ -522,6 +506,12 @@ class DocutilsDispatcher(HashableNodeImpl):
     def getChildren_UNKNOWN(self, node):
         return node.children
 
+    def identityKey(self, node):
+        """Return the class and the structural hash of `node`. Nodes with
+        the same structure are equal in any case."""
+        return ( node.__class__,
+                 node.structural_hash(self.structural_hashes), )
+
     ###########################################################################
     ###########################################################################
     # Merging
@@ -698,7 +688,8 @@ class DocutilsDispatcher(HashableNodeImpl):
 
     def rootEq_section(self, node, other):
         """Compare sections by their names or normally."""
-        if node.document.settings.compare_sections_by_names:
+        # Default is the default of the command line option
+        if getattr(node.document.settings, 'compare_sections_by_names', True):
             return self.getSectionName(node) == self.getSectionName(other)
         return True
 
@@ -965,7 +956,10 @@ def buildDocument(oldTree, newTree, settings):
         or not isinstance(newTree, docutils.nodes.document)):
         raise TypeError("Roots of trees must be documents")
     return new_document(u"%s => %s"
-                        % ( settings._old_source, settings._new_source, ),
+                        % ( getattr(settings, '_old_source',
+                                    oldTree.get('source')),
+                            getattr(settings, '_new_source',
+                                    newTree.get('source')), ),
                         settings)
 
 def buildTree(dispatcher, diffRoot, opcodes, oldRoot, newRoot):
@@ -1089,16 +1083,20 @@ def cleanOpcodes(opcodes, dispatcher, oldList, newList):
                 opcode.setCommand(Opcode.Replace)
                 opcodes[i] = opcode.asTuple()
 
-def createDiff(pub, oldTree, newTree):
-    """Create and return a diff document from `oldTree` to `newTree`."""
-    realDebug = pub.settings.debug
-    pub.settings.debug = pub.settings.dump_rstdiff
-    reporter = new_reporter("RSTDIFF", pub.settings)
-    pub.settings.debug = realDebug
+def createDiff(settings, oldTree, newTree):
+    """Create and return a diff document from `oldTree` to `newTree`. The
+    texts in the trees must be split into words already."""
+    dumpRstdiff = getattr(settings, 'dump_rstdiff', None)
+    realDebug = settings.debug
+    settings.debug = dumpRstdiff
+    reporter = new_reporter("RSTDIFF", settings)
+    settings.debug = realDebug
     dispatcher = DocutilsDispatcher(reporter)
+    dispatcher.structural_hashes = {}
     opcodes = doDiff(dispatcher, oldTree, newTree)
+    dispatcher.structural_hashes = None
 
-    if pub.settings.dump_rstdiff:
+    if dumpRstdiff:
         reporter.debug(oldTree.asdom().toprettyxml())
         reporter.debug(newTree.asdom().toprettyxml())
         reporter.debug(pformat(opcodes, 2, 40, None))
@@ -1106,7 +1104,7 @@ def createDiff(pub, oldTree, newTree):
 
     cleanOpcodes(opcodes, dispatcher, [ oldTree ], [ newTree ])
 
-    if pub.settings.dump_rstdiff:
+    if dumpRstdiff:
         reporter.debug(pformat(opcodes, 2, 40, None))
 
     if len(opcodes) != 1:
@@ -1118,7 +1116,7 @@ def createDiff(pub, oldTree, newTree):
         raise TypeError("Don't know how to merge top level opcode of type %r"
                         % ( opcode.getCommand(), ))
 
-    diffDoc = buildDocument(oldTree, newTree, pub.settings)
+    diffDoc = buildDocument(oldTree, newTree, settings)
     if opcode.getCommand() == Opcode.Equal:
         # TODO Equality should be reported somehow
         diffDoc.extend([ child.deepcopy()
@@ -1127,6 +1125,27 @@ def createDiff(pub, oldTree, newTree):
         buildTree(dispatcher, diffDoc, opcode.getSubOpcodes(), oldTree, newTree)
     return diffDoc
 
+def diffDocuments(oldTree, newTree, settings=None):
+    """Return a document with the annotated differences from the document
+    `oldTree` to the document `newTree`.
+
+    This is the library interface of `rstdiff`. `settings` are the
+    runtime settings for the result (default: those of `newTree`). Texts
+    in `oldTree` and `newTree` are split into words in place.
+
+    Unchanged parts of the documents are found by comparing hashes of
+    whole subtrees first so only changed parts are compared in detail.
+    The time needed is roughly proportional to the size of the documents
+    if the changes are small."""
+    if settings is None:
+        settings = newTree.settings
+    Text2Words(oldTree).apply()
+    Text2Words(newTree).apply()
+    diffDoc = createDiff(settings, oldTree, newTree)
+    Words2Text(diffDoc).apply()
+    Generated2Inline(diffDoc).apply()
+    return diffDoc
+
 if __name__ == '__main__':
     pub = processCommandLine()
 
@@ -1136,12 +1155,7 @@ if __name__ == '__main__':
     newTree = readTree(pub, pub.settings._new_source)
     useOptions(pub.settings, bothOption)
 
-    Text2Words(oldTree).apply()
-    Text2Words(newTree).apply()
-
-    diffDoc = createDiff(pub, oldTree, newTree)
-    Words2Text(diffDoc).apply()
-    Generated2Inline(diffDoc).apply()
+    diffDoc = diffDocuments(oldTree, newTree, pub.settings)
 
     pub.writer.write(diffDoc, pub.destination)
     pub.writer.assemble_parts()
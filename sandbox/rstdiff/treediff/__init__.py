@@ -17,6 +17,7 @@
 # Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA
 # 02111-1307, USA.
 
+from bisect import bisect_left
 from difflib import SequenceMatcher
 
 __docformat__ = 'reStructuredText'
@@ -105,9 +106,18 @@ class HashableNodeImpl(HashableImpl):
     _rootOnly = False
     """Stack for `_rootOnly`"""
     __rootOnlies = [ ]
+    """Cached hashes by `_rootOnly` and node id. Valid as long as the
+    trees are not changed; see `clearHashCache`."""
+    __hashCache = None
 
     def __init__(self, cls):
         HashableImpl.__init__(self, cls)
+        self.clearHashCache()
+
+    def clearHashCache(self):
+        """Forget all cached hashes. Must be called when a tree compared
+        before is changed."""
+        self.__hashCache = { True: { }, False: { } }
 
     def pushRootOnly(self, newRootOnly):
         """Set `newRootOnly` as new `rootOnly` value. If ``True`` then only
@@ -122,16 +132,26 @@ class HashableNodeImpl(HashableImpl):
     def impl__hash__(self, node):
         """Returns the hash for node `node`. Subclasses may override this but
         overriding `rootHash` and `childrenHash` may make more sense."""
-        rootHash = self.rootHash(node)
-        if self._rootOnly:
-            return rootHash
-        else:
-            return rootHash + self.childrenHash(node)
+        cache = self.__hashCache[self._rootOnly]
+        try:
+            return cache[id(node)][1]
+        except KeyError:
+            pass
+        result = self.rootHash(node)
+        if not self._rootOnly:
+            result += self.childrenHash(node)
+        # Keep a reference to `node` so its id is not reused
+        cache[id(node)] = ( node, result, )
+        return result
 
     def impl__eq__(self, node, other):
         """Returns equality between `node` and an `other` node. Subclasses may
         override this but overriding `rootEq` and `childrenEq` may
         make more sense."""
+        if not self._rootOnly:
+            key = self.identityKey(node)
+            if key is not None and key == self.identityKey(other):
+                return True
         if not self.rootEq(node, other):
             return False
         if self._rootOnly:
@@ -189,6 +209,14 @@ class HashableNodeImpl(HashableImpl):
         this."""
         raise NotImplementedError()        
 
+    def identityKey(self, node):
+        """Return a key for `node` including its children such that nodes
+        with equal keys are deeply equal (e.g. a hash of the whole
+        subtree). Nodes with different keys may still be equal. Used to
+        anchor unchanged parts of the trees cheaply. Return ``None`` if
+        there is no such key; this is the default."""
+        return None
+
 ###############################################################################
 # Tree matcher
 
@@ -251,6 +279,7 @@ is only a 'replace' of one tree by the other.
                 return rootOpcodes
         finally:
             self.hashableNodeImpl.popRootOnly()
+            self.hashableNodeImpl.clearHashCache()
 
     def _resolveRootEqual(self, aElem, bElem):
         """Considers children of `aElem` and `bElem` which have equal roots.
@@ -259,12 +288,129 @@ is only a 'replace' of one tree by the other.
         b = self.hashableNodeImpl.getChildren(bElem)
         self.hashableNodeImpl.pushRootOnly(False)
         try:
-            sm = SequenceMatcher(self.isJunk, a, b)
-            nestedOpcodes = sm.get_opcodes()
+            nestedOpcodes = self._anchoredOpcodes(a, b)
             return self._resolveDeepReplace(nestedOpcodes, a, b)
         finally:
             self.hashableNodeImpl.popRootOnly()
 
+    def _anchoredOpcodes(self, a, b):
+        """Return flat opcodes turning the list `a` into the list `b`.
+
+Elements with equal identity keys (see `HashableNodeImpl.identityKey`)
+are matched first: the common head and tail and then the elements
+occurring exactly once in each list (keeping the longest sequence of
+them in the same order). Only the spans between these anchors are
+aligned by `difflib.SequenceMatcher`, which is expensive for long
+lists. Without identity keys all of `a` and `b` is aligned by
+`SequenceMatcher`."""
+        identityKey = self.hashableNodeImpl.identityKey
+        aKeys = [ identityKey(node) for node in a ]
+        bKeys = [ identityKey(node) for node in b ]
+        if None in aKeys or None in bKeys:
+            return SequenceMatcher(self.isJunk, a, b).get_opcodes()
+
+        result = [ ]
+        aPos = bPos = 0
+        for ( aIdx, bIdx, ) in self._anchors(a, aKeys, bKeys) + [
+            ( len(a), len(b), ), ]:
+            # Extend the surrounding anchors like `SequenceMatcher` does
+            while (aPos < aIdx and bPos < bIdx
+                   and aKeys[aPos] == bKeys[bPos]):
+                self._addOpcode(result, 'equal', aPos, aPos + 1,
+                                bPos, bPos + 1)
+                ( aPos, bPos, ) = ( aPos + 1, bPos + 1, )
+            ( aGapEnd, bGapEnd, ) = ( aIdx, bIdx, )
+            while (aPos < aGapEnd and bPos < bGapEnd
+                   and aKeys[aGapEnd - 1] == bKeys[bGapEnd - 1]):
+                ( aGapEnd, bGapEnd, ) = ( aGapEnd - 1, bGapEnd - 1, )
+            if aPos < aGapEnd and bPos < bGapEnd:
+                sm = SequenceMatcher(self.isJunk, a[aPos:aGapEnd],
+                                     b[bPos:bGapEnd])
+                for ( opcode, aBeg, aEnd,
+                      bBeg, bEnd, ) in sm.get_opcodes():
+                    self._addOpcode(result, opcode, aPos + aBeg, aPos + aEnd,
+                                    bPos + bBeg, bPos + bEnd)
+            elif aPos < aGapEnd:
+                self._addOpcode(result, 'delete', aPos, aGapEnd, bPos, bPos)
+            elif bPos < bGapEnd:
+                self._addOpcode(result, 'insert', aPos, aPos, bPos, bGapEnd)
+            if aGapEnd < aIdx:
+                self._addOpcode(result, 'equal', aGapEnd, aIdx,
+                                bGapEnd, bIdx)
+            if aIdx < len(a):
+                self._addOpcode(result, 'equal', aIdx, aIdx + 1,
+                                bIdx, bIdx + 1)
+            ( aPos, bPos, ) = ( aIdx + 1, bIdx + 1, )
+        if not result:
+            # Like `SequenceMatcher` for two empty lists
+            result.append(( 'equal', 0, 0, 0, 0, ))
+        return result
+
+    def _anchors(self, a, aKeys, bKeys):
+        """Return a list of index pairs of equal elements in increasing
+        order in both lists. `aKeys` and `bKeys` are the identity keys
+        of the two lists; `a` is the first list."""
+        size = min(len(aKeys), len(bKeys))
+        head = 0
+        while head < size and aKeys[head] == bKeys[head]:
+            head += 1
+        tail = 0
+        while (tail < size - head
+               and aKeys[-tail - 1] == bKeys[-tail - 1]):
+            tail += 1
+        aEnd = len(aKeys) - tail
+        bEnd = len(bKeys) - tail
+
+        # Non-junk elements occurring once in the middle of each list
+        counts = { }
+        for i in xrange(head, aEnd):
+            if self.isJunk and self.isJunk(a[i]):
+                continue
+            ( aCount, bCount, bIdx, ) = counts.get(aKeys[i], ( 0, 0, None, ))
+            counts[aKeys[i]] = ( aCount + 1, bCount, bIdx, )
+        for j in xrange(head, bEnd):
+            if bKeys[j] in counts:
+                ( aCount, bCount, bIdx, ) = counts[bKeys[j]]
+                counts[bKeys[j]] = ( aCount, bCount + 1, j, )
+        unique = [ ( i, counts[aKeys[i]][2], ) for i in xrange(head, aEnd)
+                   if counts.get(aKeys[i], ( 0, 0, ))[:2] == ( 1, 1, ) ]
+
+        # Longest subsequence of `unique` increasing in the second list
+        tops = [ ]
+        topIdxs = [ ]
+        previous = [ ]
+        for k in xrange(len(unique)):
+            pos = bisect_left(tops, unique[k][1])
+            if pos == len(tops):
+                tops.append(unique[k][1])
+                topIdxs.append(k)
+            else:
+                tops[pos] = unique[k][1]
+                topIdxs[pos] = k
+            if pos:
+                previous.append(topIdxs[pos - 1])
+            else:
+                previous.append(None)
+        middle = [ ]
+        if topIdxs:
+            k = topIdxs[-1]
+            while k is not None:
+                middle.append(unique[k])
+                k = previous[k]
+            middle.reverse()
+
+        return ([ ( i, i, ) for i in xrange(head) ] + middle
+                + [ ( aEnd + i, bEnd + i, ) for i in xrange(tail) ])
+
+    def _addOpcode(self, opcodes, opcode, aBeg, aEnd, bBeg, bEnd):
+        """Append an opcode to `opcodes` merging it with the last one if
+        both are equal."""
+        if opcodes and opcode == 'equal' and opcodes[-1][0] == 'equal':
+            opcodes[-1] = ( 'equal', opcodes[-1][1], aEnd,
+                            opcodes[-1][3], bEnd, )
+        else:
+            opcodes.append(( opcode, aBeg, aEnd, bBeg, bEnd, ))
+
     def _resolveDeepReplace(self, opcodes, a, b):
         """Resolves ``replace`` elements in `opcodes` pertaining to `a` and
         `b`. Returns opcodes including nested elements for these cases."""